@@ -1,11 +1,11 @@
 import os
+import sys
 import numpy as np
 import pandas as pd
 import tensorflow as tf
 from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau
 from tensorflow.keras.models import Sequential, load_model
 from tensorflow.keras.layers import Dense, Dropout, Input
-from tensorflow.keras.utils import to_categorical
 from tensorflow.keras.regularizers import l2
 from tensorflow.keras.optimizers import Adam
 from sklearn.preprocessing import LabelEncoder, StandardScaler
@@ -13,37 +13,36 @@ from sklearn.model_selection import train_test_split
 import joblib
 from PyQt5.QtWidgets import QApplication, QFileDialog
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Commun"))
+from chargement import charger
+from caracteristiques import Caracteristiques
+from flux_tf import flux_ann
+from jeu_donnees import BRUT, compiler
+from reseau_numpy import FICHIER as FICHIER_NUMPY, exporter
+from service_prediction import EntreeANN, ServiceIndisponible, predire, service_disponible
+from quantification import FICHIER_ANN as FICHIER_INT8, quantifier, representatif_ann
+
+TAILLE_LOT = 16
+
 def choisir_fichier():
     app = QApplication([])
     fichier, _ = QFileDialog.getOpenFileName(None, "Choisir un fichier CSV", "", "CSV Files (*.csv)")
     return fichier
 
-def traiter_csv(chemin_fichier):
-    df = pd.read_csv(chemin_fichier, header=None, dtype=str)
-    df = df.dropna(how="all")
-    df = df.apply(pd.to_numeric, errors='coerce')
-    vecteur = df.to_numpy().flatten()
-    vecteur = np.nan_to_num(vecteur, nan=0.0)
-    return vecteur
-
-def charger_donnees(repertoire):
-    X, y = [], []
-    for dossier_lettre in os.listdir(repertoire):
-        chemin_dossier = os.path.join(repertoire, dossier_lettre)
-        if os.path.isdir(chemin_dossier):
-            for fichier in os.listdir(chemin_dossier):
-                if fichier.endswith('.csv'):
-                    chemin_fichier = os.path.join(chemin_dossier, fichier)
-                    vecteur = traiter_csv(chemin_fichier)
-                    X.append(vecteur)
-                    y.append(dossier_lettre)
-    if not X:
+def traiter_csv(chemin_fichier, extraction=None):
+    # Canaux actifs du geste rééchantillonnés sur un nombre fixe de pas (voir Commun/caracteristiques.py)
+    return (extraction or Caracteristiques()).vecteur(charger(chemin_fichier))
+
+def ouvrir_donnees(repertoire, workers=None, extraction=None):
+    # Jeu compilé des caractéristiques (Lettres.caracteristiques.jeu.npy) : seuls les CSV nouveaux ou modifiés
+    # sont relus, sur `workers` processus ; X (exemples x caractéristiques) est une vue sur le jeu projeté
+    extraction = extraction or Caracteristiques()
+    jeu = compiler(repertoire, workers=workers, extraction=extraction)
+    if not len(jeu):
         raise ValueError("Aucune donnée valide trouvée dans le dossier.")
-    taille_max = max(len(vecteur) for vecteur in X)
-    print(f"Taille maximale détectée : {taille_max}")
-    X = [np.pad(vecteur, (0, taille_max - len(vecteur)), mode='constant') for vecteur in X]
-    joblib.dump(taille_max, os.path.join(os.getcwd(), 'taille_max.pkl'))
-    return np.array(X, dtype=np.float32), np.array(y)
+    if jeu.disposition != BRUT:
+        raise ValueError(f"Le dossier {repertoire} contient des fichiers nettoyés, l'ANN attend les CSV bruts.")
+    return jeu.donnees.reshape(len(jeu), extraction.taille), jeu.lettres
 
 # Fonction pour exporter l'historique d'entraînement vers Excel
 def exporter_resultats_excel(historique):
@@ -63,26 +62,34 @@ def exporter_resultats_excel(historique):
     print("Résultats d'entraînement exportés vers 'resultats_entrainement.xlsx'")
 
 def entrainer_modele():
-    X, y = charger_donnees("Lettres")
+    extraction = Caracteristiques()
+    X, lettres = ouvrir_donnees("Lettres", extraction=extraction)
     label_encoder = LabelEncoder()
-    y = label_encoder.fit_transform(y)
-    y = to_categorical(y)
+    y = label_encoder.fit_transform(lettres)
+    nb_classes = len(label_encoder.classes_)
     joblib.dump(label_encoder, os.path.join(os.getcwd(), 'label_encoder.pkl'))
+    # Réglages des caractéristiques du modèle : predire_lettre les applique dès que ce fichier existe
+    joblib.dump(extraction, os.path.join(os.getcwd(), 'caracteristiques.pkl'))
     
+    # Normalisation apprise par lots sur tout le jeu (sans le charger en entier), appliquée ensuite dans le flux
     scaler = StandardScaler()
-    X = scaler.fit_transform(X)
+    for debut in range(0, len(X), 256):
+        scaler.partial_fit(X[debut:debut + 256])
     joblib.dump(scaler, os.path.join(os.getcwd(), 'scaler.pkl'))
     
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    # Même découpage qu'avec les tableaux (il ne dépend que du nombre d'exemples), fait sur les indices
+    indices_train, indices_test = train_test_split(np.arange(len(X)), test_size=0.2, random_state=42)
+    flux_train = flux_ann(X, indices_train, y, scaler.mean_, scaler.scale_, nb_classes, TAILLE_LOT)
+    flux_test = flux_ann(X, indices_test, y, scaler.mean_, scaler.scale_, nb_classes, TAILLE_LOT, melanger=False)
     
     modele = Sequential([
-        Input(shape=(X_train.shape[1],)),
+        Input(shape=(X.shape[1],)),
         Dense(256, activation='relu'),
         Dropout(0.2),
         Dense(128, activation='relu', kernel_regularizer=l2(0.001)),
         Dropout(0.2),
         Dense(64, activation='relu'),
-        Dense(y_train.shape[1], activation='softmax')
+        Dense(nb_classes, activation='softmax')
     ])
 
     modele.compile(optimizer=Adam(learning_rate=0.0005), loss='categorical_crossentropy', metrics=['accuracy'])
@@ -91,20 +98,25 @@ def entrainer_modele():
     reduce_lr = ReduceLROnPlateau(monitor='val_loss', factor=0.5, patience=3, min_lr=1e-6)
     
     history = modele.fit(
-        X_train, y_train,
+        flux_train,
         epochs=50,
-        batch_size=16,
-        validation_data=(X_test, y_test),
+        validation_data=flux_test,
         callbacks=[early_stopping, reduce_lr]
     )
     
     # Export des résultats
     exporter_resultats_excel(history.history)
 
-    loss, acc = modele.evaluate(X_test, y_test)
+    loss, acc = modele.evaluate(flux_test)
     print(f"Précision du modèle : {acc*100:.2f}%")
     
     modele.save('modele_lettres.keras')
+    # Même modèle en .npz (poids, scaler, classes, caractéristiques) pour prédire sans TensorFlow
+    exporter(modele, scaler, label_encoder.classes_, FICHIER_NUMPY, extraction=extraction)
+    if os.path.exists(FICHIER_INT8):
+        # Modèle quantifié de l'ancien modèle : recréé pour le nouveau (sinon il est refusé à la prédiction)
+        quantifier(modele, representatif_ann(os.getcwd(), "Lettres"), FICHIER_INT8, source='modele_lettres.keras')
+        print(f"Modèle quantifié recréé : {FICHIER_INT8}")
     print("Modèle ANN entraîné et sauvegardé avec succès !")
 
 
@@ -141,18 +153,31 @@ def predire_lettre():
     if not fichier_csv:
         print("Aucun fichier sélectionné.")
         return
-    vecteur = traiter_csv(fichier_csv)
-    taille_max = joblib.load('taille_max.pkl')
-    vecteur = np.pad(vecteur, (0, max(0, taille_max - len(vecteur))), mode='constant')
-    modele = load_model('modele_lettres.keras')
-    scaler = joblib.load('scaler.pkl')
-    label_encoder = joblib.load('label_encoder.pkl')
-    vecteur_normalise = scaler.transform([vecteur])
-    prediction = modele.predict(vecteur_normalise)
-    print (f"Prédiction : {prediction}")
-    
-    classe_predite = np.argmax(prediction)
-    lettre_predite = label_encoder.inverse_transform([classe_predite])[0]
+    resultat = None
+    if service_disponible("ann"):
+        # Service de prédiction lancé (Commun/service_prediction.py) : modèle déjà chargé
+        try:
+            resultat = predire("ann", fichier=fichier_csv)
+        except ServiceIndisponible as e:
+            print(f"⚠️ {e} : prédiction locale")
+    if resultat is not None:
+        prediction, lettre_predite = np.array([resultat["probabilites"]]), resultat["lettre"]
+        print (f"Prédiction : {prediction}")
+    else:
+        if os.path.exists('caracteristiques.pkl'):
+            vecteur = traiter_csv(fichier_csv, joblib.load('caracteristiques.pkl'))
+        else:
+            # Modèle entraîné avant caracteristiques.pkl : fichier à plat, complété jusqu'à taille_max
+            vecteur = EntreeANN(None, joblib.load('taille_max.pkl'))(charger(fichier_csv))
+        modele = load_model('modele_lettres.keras')
+        scaler = joblib.load('scaler.pkl')
+        label_encoder = joblib.load('label_encoder.pkl')
+        vecteur_normalise = scaler.transform([vecteur])
+        prediction = modele.predict(vecteur_normalise)
+        print (f"Prédiction : {prediction}")
+
+        classe_predite = np.argmax(prediction)
+        lettre_predite = label_encoder.inverse_transform([classe_predite])[0]
     exporter_prediction_excel(fichier_csv, prediction, lettre_predite)
     print(f"Lettre prédite : {lettre_predite}")
 
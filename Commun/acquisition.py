@@ -0,0 +1,88 @@
+"""Boucle d'acquisition partagée par le prototype et l'outil de prise de données, avec sa condition d'arrêt.
+
+La fin de session est décidée en mémoire, trame par trame : nombre de trames atteint, durée écoulée
+ou fin d'activité (le signal revient au calme après un geste). Plus besoin de surveiller la taille
+du fichier, qui dépendait de la largeur du texte écrit et du retard du thread d'écriture.
+La session s'arrête exactement sur la trame qui remplit la condition. Les trames déjà écrites avant la boucle
+(ligne de base mesurée par demarrer_session) comptent dans le nombre de trames et dans le bilan.
+"""
+import time
+
+from segmentation import SegmenteurGestes
+
+NB_TRAMES_SESSION = 275  # Longueur des enregistrements de ANN/Lettres (≈ l'ancienne limite de 38 Ko)
+
+
+class ConditionArret:
+    """Fin de session sur un nombre de trames, une durée (s) ou la fin d'activité ; la première atteinte l'emporte.
+
+    activite=True : arrêt à la fin du premier geste détecté par SegmenteurGestes (ligne de base mesurée
+    sur les premières trames) ; `options` est transmis au segmenteur (seuils, trames calmes...).
+    """
+
+    def __init__(self, nb_trames=None, duree=None, activite=False, **options):
+        self.nb_trames = nb_trames
+        self.duree = duree
+        self.activite = activite
+        self.options = options
+        self.demarrer()
+
+    def demarrer(self, trames_initiales=0):
+        self.debut = time.monotonic()
+        self.fin = None
+        self.initiales = trames_initiales  # Trames déjà écrites dans le fichier avant la boucle
+        self.trames = trames_initiales
+        self.raison = None
+        self.segmenteur = SegmenteurGestes(**self.options) if self.activite else None
+
+    @property
+    def atteinte(self):
+        if self.raison is None and self.duree is not None and time.monotonic() - self.debut >= self.duree:
+            self._arreter("durée")
+        return self.raison is not None
+
+    def _arreter(self, raison):
+        self.raison = raison
+        self.fin = time.monotonic()
+
+    def ajouter(self, trames):
+        """Compte un bloc de trames ; renvoie le nombre de trames du bloc à garder (moins si la condition tombe dedans)."""
+        if self.raison is not None:
+            return 0
+        garder = len(trames)
+        raison = None
+        if self.nb_trames is not None and self.trames + garder >= self.nb_trames:
+            garder = self.nb_trames - self.trames
+            raison = "trames"
+        if self.activite and garder and self.segmenteur.ajouter(trames[:garder], 0):
+            garder, raison = self.segmenteur.positions[0], "activité"
+        self.trames += garder
+        if raison is not None:
+            self._arreter(raison)
+        return garder
+
+    def bilan(self):
+        """Longueur de la session en trames et en ms, et raison de l'arrêt."""
+        fin = self.fin if self.fin is not None else time.monotonic()
+        return {"trames": self.trames, "initiales": self.initiales, "duree_ms": (fin - self.debut) * 1000,
+                "raison": self.raison}
+
+
+def acquerir(lecteur, condition, traiter, trames_initiales=0):
+    """Lit le port jusqu'à la condition d'arrêt ; traiter(trames, reponses) reçoit chaque bloc. Renvoie le bilan.
+
+    trames_initiales : trames déjà écrites (ligne de base de demarrer_session), comptées dans la session.
+    """
+    condition.demarrer(trames_initiales)
+    while not condition.atteinte:
+        trames, reponses = lecteur.lire()
+        trames = trames[:condition.ajouter(trames)]
+        if len(trames) or reponses:
+            traiter(trames, reponses)
+    return condition.bilan()
+
+
+def resume_session(bilan):
+    """Texte d'une ligne décrivant la longueur de la session."""
+    initiales = f"dont {bilan['initiales']} de ligne de base, " if bilan.get("initiales") else ""
+    return f"📏 Session de {bilan['trames']} trames en {bilan['duree_ms']:.0f} ms ({initiales}arrêt : {bilan['raison']})"
@@ -0,0 +1,274 @@
+"""Calibration du capteur pilotée par les réponses, partagée par l'interface, le prototype et l'outil de prise de données.
+
+Chaque commande connaît sa réponse : une ligne de calibration (16 valeurs) pour K, "ADC GAIN VALUE = n"
+pour Gx et "CAPA THRESHOLD = n" pour Cx. On passe à la commande suivante dès que la réponse arrive,
+au lieu d'attendre une pause fixe ; sans réponse dans le délai, la commande est renvoyée.
+La durée mesurée de l'échange est renvoyée pour suivre le gain par rapport aux anciennes pauses.
+
+Pour les sessions qui s'enchaînent, CacheCalibration garde les dernières réponses et la ligne de base
+mesurée juste après : tant que les premières trames d'une nouvelle session restent proches de cette
+ligne de base, on ne recalibre pas et les réponses en cache sont réécrites en tête du fichier.
+"""
+import queue
+import time
+
+import numpy as np
+
+from trames import CALIBRATION, GAIN, SEUIL, canaux_actifs
+
+COMMANDES_CALIBRATION = ("K", "GD", "CC")
+DELAIS = {CALIBRATION: 2.0, GAIN: 0.5, SEUIL: 0.5}  # Attente maximale de chaque réponse (s), par tentative
+TENTATIVES = 3
+PAS = 0.002  # Période de scrutation du port (s)
+SILENCE = 0.06  # Sans octet reçu pendant 3 périodes de trame, le capteur est considéré arrêté
+TOLERANCE_DERIVE = 15  # Écart maximal (unités ADC) de la ligne de base pour réutiliser une calibration (bruit ~3)
+NB_TRAMES_BASE = 5  # Trames moyennées pour la ligne de base (100 ms à 50 trames/s)
+
+
+def reponse_attendue(commande):
+    """Nature de la réponse attendue pour une commande (None si la commande n'a pas de réponse : R, S...)."""
+    commande = commande.strip().upper()
+    if commande == "K":
+        return CALIBRATION
+    if commande[:1] == "G":
+        return GAIN
+    if commande[:1] == "C":
+        return SEUIL
+    return None
+
+
+class Calibration:
+    """Envoie des commandes et attend la réponse de chacune, avec un délai maximal et des renvois.
+
+    Avec un LecteurSerie, le port est lu directement (aucun autre thread ne doit le lire pendant l'échange).
+    Sans lecteur, les réponses sont transmises par le thread de lecture existant via recevoir().
+    """
+
+    def __init__(self, ser, lecteur=None, tentatives=TENTATIVES, delais=None):
+        self.ser = ser
+        self.lecteur = lecteur
+        self.tentatives = tentatives
+        self.delais = dict(DELAIS, **(delais or {}))
+        self.file = queue.Queue()
+        self.trames_ignorees = 0
+        self.reponses_ignorees = 0
+        self.derniere = None  # (texte, horodatage monotone en ns, tentatives, durée en ms) de la dernière réponse
+
+    def recevoir(self, reponses, timestamp=None):
+        """Transmet les réponses (indice, nature, texte) lues par le thread de lecture (mode sans lecteur)."""
+        t = time.monotonic_ns() if timestamp is None else timestamp
+        for _, nature, texte in reponses:
+            self.file.put((nature, texte, t))
+
+    def _purger(self):
+        while True:
+            try:
+                self.file.get_nowait()
+            except queue.Empty:
+                return
+
+    def _lire(self, delai):
+        """Réponses [(nature, texte, t)] arrivées dans la limite de `delai` secondes (liste vide sinon)."""
+        if self.lecteur is None:
+            try:
+                return [self.file.get(timeout=delai)]
+            except queue.Empty:
+                return []
+        if not self.ser.in_waiting:
+            time.sleep(min(PAS, delai))
+            return []
+        trames, reponses = self.lecteur.lire()
+        self.trames_ignorees += len(trames)
+        t = time.monotonic_ns()
+        return [(nature, texte, t) for _, nature, texte in reponses]
+
+    def envoyer(self, commande):
+        """Envoie une commande et renvoie le texte de sa réponse dès réception (None sans réponse après les renvois)."""
+        nature = reponse_attendue(commande)
+        self.derniere = None
+        if self.lecteur is None:
+            self._purger()  # Réponses restées d'un échange précédent
+        debut = time.perf_counter()
+        for tentative in range(1, self.tentatives + 1):
+            self.ser.write(f"{commande}\n".encode())
+            if nature is None:
+                return None
+            limite = time.perf_counter() + self.delais[nature]
+            reste = limite - time.perf_counter()
+            while reste > 0:
+                for nature_lue, texte, t in self._lire(reste):
+                    if nature_lue == nature:
+                        self.derniere = (texte, t, tentative, (time.perf_counter() - debut) * 1000)
+                        return texte
+                    self.reponses_ignorees += 1
+                reste = limite - time.perf_counter()
+        return None
+
+    def executer(self, commandes=COMMANDES_CALIBRATION, demarrer=True, enregistreur=None):
+        """Enchaîne les commandes de calibration puis, si demandé, démarre la mesure (R).
+
+        Les réponses sont transmises à l'enregistreur (horodatage monotone de leur réception).
+        Renvoie un résumé : réponses, tentatives et durées par commande, durée totale en ms.
+        """
+        resultat = {"reponses": {}, "tentatives": {}, "durees_ms": {}, "manquantes": []}
+        debut = time.perf_counter()
+        for commande in commandes:
+            texte = self.envoyer(commande)
+            if texte is None:
+                resultat["manquantes"].append(commande)
+                continue
+            _, t, tentatives, duree_ms = self.derniere
+            resultat["reponses"][commande] = texte
+            resultat["tentatives"][commande] = tentatives
+            resultat["durees_ms"][commande] = duree_ms
+            if enregistreur is not None:
+                enregistreur.ajouter_trame(t, texte)
+        if demarrer:
+            self.ser.write(b"R\n")
+        resultat["duree_ms"] = (time.perf_counter() - debut) * 1000
+        resultat["complete"] = not resultat["manquantes"]
+        resultat["trames_ignorees"] = self.trames_ignorees
+        return resultat
+
+
+def resume_calibration(resultat):
+    """Texte d'une ligne résumant la durée de l'échange et les réponses manquantes."""
+    if resultat.get("reutilisee"):
+        return f"♻️ Calibration réutilisée (dérive {resultat['derive']:.1f}, vérifiée en {resultat['duree_ms']:.0f} ms)"
+    details = ", ".join(f"{commande} {duree:.0f} ms" for commande, duree in resultat["durees_ms"].items())
+    texte = f"⏱️ Calibration en {resultat['duree_ms']:.0f} ms ({details})"
+    if resultat["manquantes"]:
+        texte += f" ⚠️ sans réponse : {', '.join(resultat['manquantes'])}"
+    return texte
+
+
+def arreter_flux(ser, lecteur=None, silence=SILENCE, delai=2.0):
+    """Envoie S et ignore les données jusqu'à ce que le capteur se taise ; renvoie le nombre d'octets ignorés.
+
+    Remplace la pause fixe après S : on rend la main dès `silence` secondes sans octet reçu (au plus `delai`).
+    """
+    ser.write(b"S\n")
+    ignores = 0
+    debut = dernier = time.perf_counter()
+    while True:
+        maintenant = time.perf_counter()
+        if maintenant - dernier >= silence or maintenant - debut >= delai:
+            break
+        en_attente = ser.in_waiting
+        if en_attente:
+            ignores += len(ser.read(en_attente))
+            dernier = time.perf_counter()
+        else:
+            time.sleep(PAS)
+    if lecteur is not None:
+        return ignores + lecteur.vider()  # Vide aussi la ligne incomplète gardée par le lecteur
+    ser.reset_input_buffer()
+    return ignores
+
+
+def ligne_de_base(trames):
+    """Moyenne des valeurs analogiques (16 canaux) d'un bloc de trames."""
+    return trames["analogique"].mean(axis=0)
+
+
+def lire_trames(lecteur, nb_trames, delai=1.0):
+    """Lit au moins `nb_trames` trames (dans la limite de `delai` s) ; renvoie les lots [(horodatage, trames copiées)]."""
+    lots = []
+    recues = 0
+    limite = time.perf_counter() + delai
+    while recues < nb_trames and time.perf_counter() < limite:
+        trames, _ = lecteur.lire()
+        if len(trames):
+            lots.append((time.monotonic_ns(), trames.copy()))  # trames est une vue du tampon de l'analyseur
+            recues += len(trames)
+    return lots
+
+
+class CacheCalibration:
+    """Dernières réponses de calibration et ligne de base mesurée juste après, pour les sessions qui s'enchaînent.
+
+    La calibration est réutilisée tant que la ligne de base d'une nouvelle session reste à moins de `tolerance`
+    (unités ADC, sur le canal le plus éloigné) de celle mémorisée. sessions_max impose une recalibration
+    périodique ; tolerance=None désactive la réutilisation.
+    """
+
+    def __init__(self, tolerance=TOLERANCE_DERIVE, sessions_max=None, nb_trames=NB_TRAMES_BASE):
+        self.tolerance = tolerance
+        self.sessions_max = sessions_max
+        self.nb_trames = nb_trames
+        self.resultat = None
+        self.base = None
+        self.sessions = 0  # Sessions passées sur la calibration en cache
+        self.reutilisations = 0
+        self.calibrations = 0
+
+    def valide(self):
+        return (self.tolerance is not None and self.base is not None
+                and (self.sessions_max is None or self.sessions < self.sessions_max))
+
+    def memoriser(self, resultat, trames):
+        """Garde une calibration complète et la ligne de base des trames qui la suivent."""
+        self.calibrations += 1
+        if not resultat["complete"] or not len(trames):
+            self.oublier()
+            return
+        self.resultat = resultat
+        self.base = ligne_de_base(trames)
+        self.sessions = 1
+
+    def oublier(self):
+        self.resultat = None
+        self.base = None
+
+    def derive(self, trames):
+        """Plus grand écart entre la ligne de base de `trames` et celle en cache (inf sans trame)."""
+        if not len(trames):
+            return float("inf")
+        base = ligne_de_base(trames)
+        # Un canal qui apparaît ou disparaît donne un écart de l'ordre de 1000 : recalibration
+        actifs = canaux_actifs(self.base) | canaux_actifs(base)
+        return float(np.max(np.abs(base - self.base)[actifs], initial=0.0))
+
+    def enregistrer(self, enregistreur, timestamp):
+        """Réécrit le bloc de calibration en cache (mêmes lignes qu'après K, Gx, Cx)."""
+        for texte in self.resultat["reponses"].values():
+            enregistreur.ajouter_trame(timestamp, texte)
+
+
+def demarrer_session(ser, lecteur, cache, enregistreur=None, commandes=COMMANDES_CALIBRATION):
+    """Démarre la mesure (R) en réutilisant la calibration en cache si la ligne de base n'a pas dérivé.
+
+    Sinon le capteur est arrêté puis recalibré, et le cache est mis à jour. Dans les deux cas, le fichier reçoit
+    le bloc de calibration puis les premières trames (celles qui ont servi à mesurer la ligne de base).
+    Renvoie le résumé de Calibration.executer, complété de reutilisee, derive et trames_ecrites (trames de la
+    ligne de base envoyées à l'enregistreur, à compter dans la session : voir acquisition.acquerir).
+    """
+    derive = None
+    if cache.valide():
+        debut = time.perf_counter()
+        t = time.monotonic_ns()
+        ser.write(b"R\n")
+        lots = lire_trames(lecteur, cache.nb_trames)
+        trames = np.concatenate([l for _, l in lots]) if lots else lecteur.analyseur.sortie[:0]
+        derive = cache.derive(trames)
+        if derive <= cache.tolerance:
+            cache.sessions += 1
+            cache.reutilisations += 1
+            if enregistreur is not None:
+                cache.enregistrer(enregistreur, t)
+                for t_lot, trames_lot in lots:
+                    enregistreur.ajouter_lot(t_lot, trames_lot)
+            return dict(cache.resultat, reutilisee=True, derive=derive, trames_ecrites=len(trames) if enregistreur else 0,
+                        duree_ms=(time.perf_counter() - debut) * 1000)
+        arreter_flux(ser, lecteur)
+
+    resultat = Calibration(ser, lecteur).executer(commandes, enregistreur=enregistreur)
+    lots = lire_trames(lecteur, cache.nb_trames)
+    if enregistreur is not None:
+        for t_lot, trames_lot in lots:
+            enregistreur.ajouter_lot(t_lot, trames_lot)
+    cache.memoriser(resultat, np.concatenate([l for _, l in lots]) if lots else lecteur.analyseur.sortie[:0])
+    resultat["reutilisee"] = False
+    resultat["derive"] = derive
+    resultat["trames_ecrites"] = sum(len(l) for _, l in lots) if enregistreur is not None else 0
+    return resultat
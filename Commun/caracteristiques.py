@@ -0,0 +1,113 @@
+"""Entrées des réseaux : caractéristiques de l'ANN et colonnes nettoyées du LSTM.
+
+ANN : le geste rééchantillonné sur un nombre fixe de pas. Seules les trames sont gardées (pas la calibration,
+les réponses ni l'horodatage) et seulement les 8 premiers canaux actifs (voir Enregistrement.actifs) : leur
+signal analogique et leur indicateur de présence. Le tracé est d'abord découpé par SegmenteurGestes (du début
+du premier geste à la fin du dernier, marges comprises) : le repos avant et après ne compte pas, un
+enregistrement arrêté en fin de geste (prototype) et un enregistrement de 275 trames donnent le même axe
+de temps. Chaque colonne est ensuite interpolée linéairement sur NB_PAS pas répartis sur la durée du tracé.
+Le vecteur a donc toujours la même taille (NB_PAS x 16), quelle que soit la longueur du fichier.
+
+LSTM : les 8 premières colonnes capteurs actives, normalisées par leur maximum (sans les valeurs 3299, 1000
+et 0), comme les fichiers écrits par LSTM/nettoyage_csv.py.
+"""
+import numpy as np
+import pandas as pd
+
+from chargement import charger
+from jeu_donnees import BRUT, NETTOYE
+from segmentation import bornes_geste
+from trames import VALEUR_INACTIVE, VALEUR_SATUREE
+
+VERSION = 3  # 2 : découpage du tracé (geste=True) ; 3 : marge avant gardée, trames calmes de la fin retirées
+NB_PAS = 32
+NB_CANAUX = 8
+VALEURS_EXCLUES = (VALEUR_SATUREE, VALEUR_INACTIVE, 0)
+
+
+def reechantillonner(signal, nb_pas=NB_PAS):
+    """Interpolation linéaire de `signal` (trames x canaux) sur nb_pas pas régulièrement espacés."""
+    signal = np.asarray(signal, dtype=np.float32)
+    if len(signal) < 2:
+        return np.repeat(signal[:1], nb_pas, axis=0) if len(signal) else np.zeros((nb_pas, signal.shape[1]), signal.dtype)
+    temps = np.linspace(0, len(signal) - 1, nb_pas)
+    avant = np.minimum(temps.astype(np.int64), len(signal) - 2)
+    poids = (temps - avant)[:, None].astype(np.float32)
+    return signal[avant] * (1 - poids) + signal[avant + 1] * poids
+
+
+class Caracteristiques:
+    """Extraction des caractéristiques (réglages nb_pas, nb_canaux), enregistrée avec le modèle (caracteristiques.pkl).
+
+    Une instance s'utilise aussi comme lecture de jeu_donnees.compiler : elle rend la matrice (nb_pas, 2 x nb_canaux)
+    de chaque fichier, le jeu compilé contient alors directement les entrées de l'ANN (sa disposition reste celle
+    des CSV lus, brut ou nettoye).
+    """
+
+    nom = "caracteristiques"
+    geste = False  # Extractions enregistrées avant le découpage du tracé : tout l'enregistrement
+
+    def __init__(self, nb_pas=NB_PAS, nb_canaux=NB_CANAUX, geste=True):
+        self.nb_pas = nb_pas
+        self.nb_canaux = nb_canaux
+        self.geste = geste
+
+    @property
+    def parametres(self):
+        return {"version": VERSION, "nb_pas": self.nb_pas, "nb_canaux": self.nb_canaux, "geste": self.geste}
+
+    def bornes(self, enregistrement):
+        """Trames du tracé (début, fin) : tout l'enregistrement s'il est nettoyé ou si aucun geste n'est détecté."""
+        if self.geste and not enregistrement.nettoye:
+            bornes = bornes_geste(enregistrement.analogique, enregistrement.presence)
+            if bornes is not None:
+                return bornes
+        return 0, len(enregistrement)
+
+    @property
+    def taille(self):
+        return self.nb_pas * 2 * self.nb_canaux
+
+    def matrice(self, enregistrement):
+        """Canaux actifs rééchantillonnés (nb_pas, 2 x nb_canaux) : analogique puis présence, 0 si canal absent."""
+        canaux = np.flatnonzero(enregistrement.actifs)[:self.nb_canaux]
+        debut, fin = self.bornes(enregistrement)
+        matrice = np.zeros((self.nb_pas, 2 * self.nb_canaux), dtype=np.float32)
+        matrice[:, :len(canaux)] = reechantillonner(enregistrement.analogique[debut:fin, canaux], self.nb_pas)
+        if enregistrement.presence is not None:
+            matrice[:, self.nb_canaux:self.nb_canaux + len(canaux)] = \
+                reechantillonner(enregistrement.presence[debut:fin, canaux], self.nb_pas)
+        return matrice
+
+    def vecteur(self, enregistrement):
+        return self.matrice(enregistrement).ravel()
+
+    def __call__(self, chemin):
+        enregistrement = charger(chemin)
+        return self.matrice(enregistrement), NETTOYE if enregistrement.nettoye else BRUT
+
+
+def nettoyer(enregistrement, nb_colonnes=NB_CANAUX):
+    """Colonnes capteurs actives normalisées (DataFrame), ou None si l'enregistrement n'a aucune trame."""
+    donnees = np.hstack([enregistrement.analogique, enregistrement.presence]).astype(np.float64)
+    colonnes = np.array(enregistrement.colonnes)
+    if not len(donnees):
+        return None
+
+    # Colonnes actives : première trame différente de 1000, au moins une valeur différente de 3299 ; 8 premières
+    colonnes_a_garder = np.flatnonzero((donnees[0] != VALEUR_INACTIVE) & (donnees != VALEUR_SATUREE).any(axis=0))
+    colonnes_a_garder = colonnes_a_garder[:nb_colonnes]
+    donnees = donnees[:, colonnes_a_garder]
+
+    # Normalisation par le maximum global, sans les valeurs 3299, 1000 et 0
+    valides = donnees[~np.isin(donnees, VALEURS_EXCLUES)]
+    maximum = valides.max() if valides.size else np.nan
+    return pd.DataFrame(donnees / maximum, columns=colonnes[colonnes_a_garder])
+
+
+def donnees_lstm(enregistrement, nb_colonnes=NB_CANAUX):
+    """Entrée du LSTM (trames x colonnes) : telle quelle pour un fichier nettoyé, nettoyée sinon."""
+    if enregistrement.nettoye:
+        return np.asarray(enregistrement.analogique, dtype=np.float32)
+    df = nettoyer(enregistrement, nb_colonnes)
+    return np.zeros((0, nb_colonnes), np.float32) if df is None else df.to_numpy(dtype=np.float32)
@@ -0,0 +1,154 @@
+"""Lecture des enregistrements, commune aux visualiseurs, aux outils et aux réseaux de neurones.
+
+Un enregistrement brut (33 colonnes, voir enregistreur.py) est lu en une seule fois : les lignes sont
+triées d'après leurs octets (trames complètes d'un côté, calibration, réponses et en-tête de l'autre),
+puis les trames sont lues par le moteur C de pandas avec des types fixés (uint16 pour l'analogique,
+uint8 pour la présence). Les quelques autres lignes sont gardées telles quelles, découpées en cellules.
+
+Les fichiers nettoyés (colonnes capteurs normalisées, sans horodatage, voir LSTM/nettoyage_csv.py)
+sont aussi acceptés : leurs colonnes sont lues en float dans `analogique`.
+"""
+import csv
+import io
+
+import numpy as np
+import pandas as pd
+
+from enregistreur import ENTETE_CSV
+from horodatage import NAT, lire_horodatages
+from index_series import decouper_lignes, finit_par_chiffre, lire_octets_serie
+from trames import (GAIN, NB_CANAUX, NB_VALEURS, SEUIL, VALEUR_INACTIVE, VALEUR_SATUREE, type_ligne,
+                    valeur_reponse)
+
+NB_COLONNES = 1 + NB_VALEURS
+TYPES = {0: object, **{i: np.uint16 for i in range(1, 1 + NB_CANAUX)},
+         **{i: np.uint8 for i in range(1 + NB_CANAUX, NB_COLONNES)}}
+
+
+class Enregistrement:
+    """Enregistrement lu : horodatages (ns), matrices analogique et présence, calibration et canaux actifs.
+
+    Pour un fichier nettoyé, `timestamps`, `presence` et `calibration` valent None et tous les canaux sont actifs.
+    `autres` garde les lignes qui ne sont pas des trames (position parmi les lignes non vides, cellules).
+    """
+
+    def __init__(self, fichier, colonnes, analogique, presence=None, timestamps=None, calibration=None,
+                 gain=None, seuil=None, autres=(), positions=None):
+        self.fichier = fichier
+        self.colonnes = colonnes  # Noms des colonnes de analogique, puis de presence
+        self.capteurs = colonnes[:analogique.shape[1]]
+        self.analogique = analogique
+        self.presence = presence
+        self.timestamps = timestamps
+        self.calibration = calibration
+        self.gain = gain
+        self.seuil = seuil
+        self.autres = list(autres)
+        self.positions = np.arange(len(analogique)) if positions is None else positions
+        self.actifs = self._actifs()
+
+    def __len__(self):
+        return len(self.analogique)
+
+    @property
+    def nettoye(self):
+        return self.timestamps is None
+
+    def _actifs(self):
+        """Canal actif : calibration différente de 1000 et au moins une trame différente de 3299."""
+        if self.nettoye:
+            return np.ones(self.analogique.shape[1], dtype=bool)
+        actifs = (self.analogique != VALEUR_SATUREE).any(axis=0)
+        if self.calibration is not None:
+            actifs &= self.calibration != VALEUR_INACTIVE
+        return actifs
+
+    def colonnes_actives(self):
+        return [nom for nom, actif in zip(self.capteurs, self.actifs) if actif]
+
+    def dataframe(self):
+        """Trames des canaux actifs avec leur horodatage (colonne Timestamp en datetime64, trames datées seulement)."""
+        df = pd.DataFrame(self.analogique[:, self.actifs], columns=self.colonnes_actives())
+        if self.nettoye:
+            return df
+        df.insert(0, "Timestamp", self.timestamps.astype("datetime64[ns]"))
+        return df[self.timestamps != NAT].reset_index(drop=True)
+
+    def vecteur_ann(self):
+        """Entrée de l'ANN : toutes les lignes non vides du fichier à plat sur 33 colonnes.
+
+        Horodatage et texte valent 0, comme avec la lecture pandas d'origine (tout en texte puis to_numeric).
+        """
+        matrice = np.zeros((len(self.positions) + len(self.autres), NB_COLONNES))
+        matrice[self.positions, 1:1 + NB_CANAUX] = self.analogique
+        matrice[self.positions, 1 + NB_CANAUX:] = self.presence
+        for position, cellules in self.autres:
+            valeurs = pd.to_numeric(pd.Series(cellules[1:NB_COLONNES], dtype=object), errors="coerce")
+            matrice[position, 1:1 + len(valeurs)] = np.nan_to_num(valeurs.to_numpy(dtype=np.float64), nan=0.0)
+        return matrice.ravel()
+
+
+def _lire_nettoye(fichier, octets):
+    df = pd.read_csv(io.BytesIO(octets.tobytes()), dtype=np.float64, engine="c").dropna(how="all")
+    return Enregistrement(fichier, list(df.columns), df.to_numpy())
+
+
+def charger(fichier, serie=None):
+    """Lit un enregistrement, ou seulement l'une de ses séries (entrée de l'index, voir index_series.py)."""
+    if serie is None:
+        octets = np.fromfile(fichier, dtype=np.uint8)
+    else:
+        octets = np.frombuffer(lire_octets_serie(fichier, serie), dtype=np.uint8)
+    debuts, contenu = decouper_lignes(octets)
+    premiere = octets[debuts[0]:contenu[0]].tobytes().decode("utf-8", errors="replace") if len(debuts) else ""
+    entete = None
+    if premiere and not premiere[:1].isdigit() and not premiere.startswith('"'):
+        if not premiere.startswith("Timestamp"):
+            return _lire_nettoye(fichier, octets)
+        entete = next(csv.reader([premiere]))
+
+    # Trame complète : finit par un chiffre et compte 32 virgules (une de plus dans l'ancien horodatage texte)
+    virgules = np.concatenate([[0], np.cumsum(octets == ord(","))])
+    guillemets = octets[np.minimum(debuts, len(octets) - 1)] == ord('"')
+    trames = finit_par_chiffre(octets, debuts, contenu) & (virgules[contenu] - virgules[debuts] - guillemets == NB_VALEURS)
+    if entete is not None:
+        trames[0] = False
+
+    lignes_trames = np.flatnonzero(trames)
+    suivantes = np.append(debuts[1:], len(octets))
+    blocs = np.split(lignes_trames, np.flatnonzero(np.diff(lignes_trames) != 1) + 1) if len(lignes_trames) else []
+    texte = b"".join(octets[debuts[b[0]]:suivantes[b[-1]]].tobytes() for b in blocs)
+    if texte:
+        df = pd.read_csv(io.BytesIO(texte), header=None, names=range(NB_COLONNES), usecols=range(NB_COLONNES),
+                         dtype=TYPES, engine="c")
+    else:
+        df = pd.DataFrame({i: pd.Series(dtype=t) for i, t in TYPES.items()})
+
+    # Autres lignes (en-tête, calibration, réponses, trames incomplètes), sans les lignes vides
+    lignes_autres = np.flatnonzero(~trames & (contenu > debuts))
+    cellules = csv.reader([octets[debuts[i]:contenu[i]].tobytes().decode("utf-8", errors="replace")
+                           for i in lignes_autres])
+    autres = [(i, c) for i, c in zip(lignes_autres, cellules) if any(c)]
+    gardees = trames.copy()
+    gardees[[i for i, _ in autres]] = True
+    rangs = np.cumsum(gardees) - 1
+
+    calibration = gain = seuil = None
+    for i, c in autres:
+        if i == 0 and entete is not None:
+            continue
+        valeurs = c[1:1 + NB_CANAUX]
+        if calibration is None and len(valeurs) == NB_CANAUX and all(v.isdigit() for v in valeurs):
+            calibration = np.array(valeurs, dtype=np.int64)
+        nature = type_ligne(" ".join(c[1:]))
+        if nature == GAIN and gain is None:
+            gain = valeur_reponse(" ".join(c[1:]))
+        elif nature == SEUIL and seuil is None:
+            seuil = valeur_reponse(" ".join(c[1:]))
+
+    return Enregistrement(
+        fichier, (entete or ENTETE_CSV)[1:NB_COLONNES],
+        df.iloc[:, 1:1 + NB_CANAUX].to_numpy(), df.iloc[:, 1 + NB_CANAUX:].to_numpy(),
+        timestamps=lire_horodatages(df[0].to_numpy()), calibration=calibration, gain=gain, seuil=seuil,
+        autres=[(int(rangs[i]), c) for i, c in autres], positions=rangs[lignes_trames],
+    )
@@ -0,0 +1,235 @@
+import csv
+import io
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+from horodatage import Horloge, etaler
+from index_series import SuiviSeries
+
+# En-tête commun à tous les enregistrements (33 colonnes)
+ENTETE_CSV = ["Timestamp", *[f"{p}_{i}" for p in ["M_F", "U_F", "M_C", "U_C"] for i in range(1, 9)]]
+
+_FIN = object()  # Marqueur de fin de session pour le thread d'écriture
+
+
+def ligne_csv(timestamp, data):
+    """Met une trame brute (texte reçu du capteur) au format 33 colonnes."""
+    values = data.split()
+    values += [""] * (32 - len(values))
+    return [timestamp] + values[:32]
+
+
+class LotTrames:
+    """Trames déjà analysées (DTYPE_MESURE, ordre de réception) : un horodatage par trame, ou un seul texte commun."""
+
+    def __init__(self, timestamp, trames):
+        self.timestamp = timestamp
+        self.trames = trames
+
+    def __len__(self):
+        return len(self.trames)
+
+    @property
+    def dernier(self):
+        return int(self.timestamp[-1]) if isinstance(self.timestamp, np.ndarray) else self.timestamp
+
+    def lignes_csv(self, timestamp=None):
+        timestamp = self.timestamp if timestamp is None else timestamp
+        valeurs = np.hstack([self.trames["analogique"], self.trames["presence"]]).tolist()
+        if isinstance(timestamp, np.ndarray):
+            return [[t, *ligne] for t, ligne in zip(timestamp.tolist(), valeurs)]
+        return [[timestamp, *ligne] for ligne in valeurs]
+
+
+class Enregistreur:
+    """Écrit les lignes CSV dans un thread dédié, avec un seul descripteur de fichier ouvert.
+
+    Le thread série se contente de déposer les lignes dans une file (ajouter) ;
+    le thread d'écriture les regroupe par lots, vide le tampon (flush + fsync)
+    toutes les `intervalle_flush` secondes et à la fermeture de la session.
+
+    Les horodatages entiers sont des time.monotonic_ns() : ils sont écrits en heure murale (ns depuis l'epoch)
+    d'après l'ancre relevée à l'ouverture de la session (voir horodatage.py).
+
+    L'index des séries (voir index_series.py) est tenu pendant l'écriture et écrit à la fermeture.
+    """
+
+    def __init__(self, filename, entete=None, intervalle_flush=1.0, fsync=True, taille_lot=512):
+        self.filename = filename
+        self.intervalle_flush = intervalle_flush
+        self.fsync = fsync
+        self.taille_lot = taille_lot
+        self.erreur = None
+        self.horloge = Horloge()
+
+        self.file_attente = queue.Queue()
+        self.lignes_ecrites = 0
+        self.lots_ecrits = 0
+        self.debut = time.monotonic()
+        self.fin = None
+        self.series = None
+        self.dernier_ns = None  # Horodatage du lot précédent (étalement des trames)
+
+        self._ouvrir(entete)
+
+        self.thread = threading.Thread(target=self._boucle_ecriture, daemon=True)
+        self.thread.start()
+
+    def ajouter(self, ligne):
+        """Dépose une ligne (liste de cellules) dans la file d'écriture."""
+        self._verifier()
+        self.file_attente.put(ligne)
+
+    def ajouter_trame(self, timestamp, data):
+        """Dépose une trame brute reçue du capteur."""
+        self._verifier()
+        self.file_attente.put(ligne_csv(timestamp, data))
+
+    def ajouter_lot(self, timestamp, trames, reponses=()):
+        """Dépose un lot analysé par AnalyseurTrames (reordonner=False) : trames et réponses, dans l'ordre reçu."""
+        self._verifier()
+        horodatages = self._etaler(timestamp, len(trames))
+        entier = isinstance(horodatages, np.ndarray)
+        debut = 0
+        for indice, _, texte in reponses:
+            if indice > debut:
+                self.file_attente.put(LotTrames(horodatages[debut:indice] if entier else timestamp,
+                                                trames[debut:indice].copy()))
+                debut = indice
+            # Une réponse prend l'horodatage de la trame qui la suit
+            self.ajouter_trame(int(horodatages[indice]) if entier and indice < len(trames) else timestamp, texte)
+        if len(trames) > debut:
+            self.file_attente.put(LotTrames(horodatages[debut:] if entier else timestamp, trames[debut:].copy()))
+
+    def _etaler(self, timestamp, nombre):
+        """Horodatage de chaque trame d'un lot lu d'un coup (voir horodatage.etaler), après le lot précédent.
+
+        Un tableau (un horodatage par trame, déjà étalé) est gardé tel quel."""
+        if not isinstance(timestamp, (int, np.integer)) or nombre == 0:
+            return timestamp
+        horodatages = etaler(timestamp, nombre, self.dernier_ns)
+        self.dernier_ns = int(timestamp)
+        return horodatages
+
+    def _verifier(self):
+        """Relance l'erreur du thread d'écriture : une fois l'écriture arrêtée, plus rien n'entre dans la file."""
+        if self.erreur is not None:
+            raise self.erreur
+
+    def fermer(self):
+        """Termine la session : écrit les lignes restantes, vide le tampon et ferme le fichier.
+
+        Relance l'erreur qui a arrêté le thread d'écriture, s'il y en a eu une (lignes perdues)."""
+        if self.fin is not None:
+            return
+        self.file_attente.put(_FIN)
+        self.thread.join()
+        self.fin = time.monotonic()
+        self._verifier()
+
+    def taille_ko(self):
+        """Taille du fichier (en Ko) d'après les octets déjà transmis au fichier."""
+        return self.octets_ecrits / 1024
+
+    def statistiques(self):
+        """Renvoie la profondeur de la file et le débit d'écriture de la session."""
+        duree = (self.fin or time.monotonic()) - self.debut
+        return {
+            "profondeur_file": self.file_attente.qsize(),
+            "lignes_ecrites": self.lignes_ecrites,
+            "lots_ecrits": self.lots_ecrits,
+            "octets_ecrits": self.octets_ecrits,
+            "lignes_par_s": self.lignes_ecrites / duree if duree > 0 else 0.0,
+            "ko_par_s": self.octets_ecrits / 1024 / duree if duree > 0 else 0.0,
+        }
+
+    def _ouvrir(self, entete):
+        nouveau = not os.path.exists(self.filename) or os.path.getsize(self.filename) == 0
+        self.fichier = open(self.filename, mode='a', newline='', encoding='utf-8')
+        self.octets_ecrits = 0 if nouveau else os.path.getsize(self.filename)
+        self.series = SuiviSeries(self.filename, self.octets_ecrits, entete)
+        if entete and nouveau:
+            self._ecrire_lignes([entete])
+            self.lignes_ecrites = 0  # L'en-tête ne compte pas parmi les lignes de la session (débit, positions)
+
+    def _fermer_fichier(self):
+        self.fichier.close()
+        self.series.ecrire(self.octets_ecrits, self.lignes_ecrites)
+
+    def _ecrire_lot(self, lot):
+        lignes = []
+        for element in lot:
+            if isinstance(element, LotTrames):
+                timestamp = self._horodatage_csv(element.timestamp)
+                lignes.extend(element.lignes_csv(timestamp))
+                self.series.ajouter_trames(len(element), self._horodatage_csv(element.dernier))
+                continue
+            if element and isinstance(element[0], int):
+                element = [self._horodatage_csv(element[0]), *element[1:]]
+            # Les lignes déjà prêtes sont écrites avant chaque réponse pour connaître sa position exacte
+            self._ecrire_lignes(lignes)
+            lignes = []
+            self.series.ligne(element, self.octets_ecrits, self.lignes_ecrites)
+            lignes.append(element)
+        self._ecrire_lignes(lignes)
+        self.lots_ecrits += 1
+
+    def _ecrire_lignes(self, lignes):
+        if not lignes:
+            return
+        tampon = io.StringIO()
+        csv.writer(tampon).writerows(lignes)
+        texte = tampon.getvalue()
+        self.fichier.write(texte)
+        self.octets_ecrits += len(texte.encode('utf-8'))
+        self.lignes_ecrites += len(lignes)
+
+    def _horodatage_csv(self, timestamp):
+        return self.horloge.murale_ns(timestamp) if isinstance(timestamp, (int, np.integer, np.ndarray)) else timestamp
+
+    def _vider_tampon(self):
+        self.fichier.flush()
+        if self.fsync:
+            os.fsync(self.fichier.fileno())
+
+    def _boucle_ecriture(self):
+        dernier_flush = time.monotonic()
+        termine = False
+        try:
+            while not termine:
+                lot = []
+                try:
+                    ligne = self.file_attente.get(timeout=self.intervalle_flush)
+                    if ligne is _FIN:
+                        termine = True
+                    else:
+                        lot.append(ligne)
+                        # Récupérer tout ce qui est déjà en attente, sans bloquer
+                        while len(lot) < self.taille_lot:
+                            ligne = self.file_attente.get_nowait()
+                            if ligne is _FIN:
+                                termine = True
+                                break
+                            lot.append(ligne)
+                except queue.Empty:
+                    pass
+
+                if lot:
+                    self._ecrire_lot(lot)
+
+                if time.monotonic() - dernier_flush >= self.intervalle_flush:
+                    self._vider_tampon()
+                    dernier_flush = time.monotonic()
+        except Exception as e:
+            self.erreur = e
+            print(f"⚠️ Erreur d'écriture CSV : {e}")
+        finally:
+            try:
+                self._vider_tampon()
+            except Exception:
+                pass
+            self._fermer_fichier()
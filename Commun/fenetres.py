@@ -0,0 +1,58 @@
+"""Fenêtres glissantes (séquences du LSTM) sans copie du corpus.
+
+Les fenêtres sont une vue par pas (sliding_window_view) sur le tableau des trames de tous les fichiers
+mis bout à bout (par exemple le jeu compilé de jeu_donnees.py, en mémoire projetée) : seuls les indices
+de début des fenêtres et leurs classes sont gardés, une fenêtre ne déborde jamais sur le fichier suivant.
+Les fenêtres ne sont copiées que lot par lot, au moment de les donner au réseau.
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def indices_fenetres(debuts, lignes, longueur, pas=1):
+    """Débuts (dans le tableau complet) des fenêtres entièrement contenues dans chaque fichier, tous les `pas` trames."""
+    indices = [np.arange(debut, debut + n - longueur + 1, pas) for debut, n in zip(debuts, lignes) if n >= longueur]
+    return np.concatenate(indices).astype(np.int64) if indices else np.zeros(0, dtype=np.int64)
+
+
+class Fenetres:
+    """Fenêtres de `longueur` trames sur `donnees` (trames x canaux), commençant aux trames `debuts`."""
+
+    def __init__(self, donnees, debuts, classes, longueur):
+        self.donnees = donnees
+        self.debuts = np.asarray(debuts, dtype=np.int64)
+        self.classes = np.asarray(classes, dtype=np.int32)
+        self.longueur = longueur
+        # Vue (trames - longueur + 1, longueur, canaux) sur donnees, rien n'est copié
+        if len(donnees) >= longueur:
+            self.vue = sliding_window_view(donnees, longueur, axis=0).transpose(0, 2, 1)
+        else:
+            self.vue = np.zeros((0, longueur, donnees.shape[1]), dtype=donnees.dtype)
+
+    def __len__(self):
+        return len(self.debuts)
+
+    @property
+    def forme(self):
+        return self.longueur, self.donnees.shape[1]
+
+    def lot(self, indices, dtype=np.float32):
+        """Fenêtres et classes des indices donnés : seul ce lot est copié."""
+        return self.vue[self.debuts[indices]].astype(dtype, copy=False), self.classes[indices]
+
+    def lots(self, taille, indices=None, melanger=False, graine=None):
+        """Parcourt les fenêtres (toutes, ou celles de `indices`) par lots de `taille`."""
+        indices = np.arange(len(self)) if indices is None else np.asarray(indices)
+        if melanger:
+            indices = np.random.default_rng(graine).permutation(indices)
+        for i in range(0, len(indices), taille):
+            yield self.lot(indices[i:i + taille])
+
+
+def fenetres_jeu(jeu, longueur, classes, pas=1):
+    """Fenêtres d'un jeu compilé (voir jeu_donnees.py) ; `classes` donne le numéro de classe de chaque lettre."""
+    debuts_fichiers = [f["debut"] for f in jeu.fichiers]
+    debuts = indices_fenetres(debuts_fichiers, [f["lignes"] for f in jeu.fichiers], longueur, pas)
+    fichier = np.searchsorted(debuts_fichiers, debuts, side="right") - 1
+    classes_fichiers = np.array([classes[f["lettre"]] for f in jeu.fichiers], dtype=np.int32)
+    return Fenetres(jeu.donnees, debuts, classes_fichiers[fichier], longueur)
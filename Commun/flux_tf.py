@@ -0,0 +1,48 @@
+"""Entrée tf.data des entraînements (ANN et LSTM), lue lot par lot dans le jeu compilé au lieu d'un tableau en mémoire.
+
+Le flux ne contient que les numéros des exemples : ils sont mélangés (tampon de la taille du jeu, ce ne sont
+que des entiers), regroupés en lots, puis chaque lot est lu dans le jeu projeté (jeu_donnees.py, fenetres.py)
+par plusieurs appels parallèles, normalisé et préchargé pendant que le lot précédent est calculé. La mémoire
+utilisée ne dépend que de la taille des lots, pas de celle du corpus.
+"""
+import numpy as np
+import tensorflow as tf
+
+AUTOTUNE = tf.data.AUTOTUNE
+
+
+def _flux(indices, lire, formes, types, taille_lot, melanger, graine):
+    flux = tf.data.Dataset.from_tensor_slices(np.asarray(indices, dtype=np.int64))
+    if melanger:
+        flux = flux.shuffle(len(indices), seed=graine, reshuffle_each_iteration=True)
+
+    def lire_lot(lot):
+        sorties = tf.numpy_function(lire, [lot], types)
+        for sortie, forme in zip(sorties, formes):
+            sortie.set_shape((None, *forme))
+        return tuple(sorties)
+
+    return flux.batch(taille_lot).map(lire_lot, num_parallel_calls=AUTOTUNE, deterministic=not melanger)
+
+
+def flux_ann(X, indices, classes, moyenne, ecart, nb_classes, taille_lot=16, melanger=True, graine=None):
+    """Lots (entrées normalisées, classes one-hot) de l'ANN, lus dans X (exemples x caractéristiques, projeté ou non).
+
+    moyenne et ecart sont ceux du StandardScaler.
+    """
+    classes = np.asarray(classes, dtype=np.int32)
+    moyenne, ecart = tf.constant(moyenne, tf.float32), tf.constant(ecart, tf.float32)
+
+    def lire(lot):
+        return np.asarray(X[lot], dtype=np.float32), classes[lot]
+
+    flux = _flux(indices, lire, [X.shape[1:], ()], (tf.float32, tf.int32), taille_lot, melanger, graine)
+    flux = flux.map(lambda X, y: ((X - moyenne) / ecart, tf.one_hot(y, nb_classes)), num_parallel_calls=AUTOTUNE)
+    return flux.prefetch(AUTOTUNE)
+
+
+def flux_fenetres(fenetres, indices, nb_classes, taille_lot=256, melanger=True, graine=None):
+    """Lots (séquences, classes one-hot) du LSTM, lus dans les fenêtres (fenetres.py)."""
+    flux = _flux(indices, fenetres.lot, [fenetres.forme, ()], (tf.float32, tf.int32), taille_lot, melanger, graine)
+    flux = flux.map(lambda X, y: (X, tf.one_hot(y, nb_classes)), num_parallel_calls=AUTOTUNE)
+    return flux.prefetch(AUTOTUNE)
@@ -0,0 +1,355 @@
+"""Format de session binaire (.nmd) et conversion depuis/vers le format CSV historique.
+
+Structure d'un fichier .nmd :
+    - en-tête fixe de 16 octets : b"NMDB", version (uint16), taille d'une trame (uint16), 8 octets réservés ;
+    - trames de taille fixe (DTYPE_TRAME) : horodatage monotone int64 en ns,
+      16 valeurs analogiques uint16 (ordre de réception), masque de présence uint16 (bit i = colonne M_C/U_C i) ;
+    - bloc de métadonnées JSON (réponses K / ADC GAIN VALUE / CAPA THRESHOLD, canaux actifs, ancres d'horloge),
+      suivi d'un pied de 16 octets : position du JSON (uint64), longueur (uint32), b"NMDF".
+
+Les trames reçues entre deux vidages (vider : toutes les intervalle_flush secondes pour l'enregistreur, et à la
+fermeture) restent en mémoire ; chaque vidage les écrit à la place de l'ancien bloc de métadonnées, suivies du
+bloc et du pied réécrits. Un fichier interrompu reste lisible tel qu'au dernier vidage, comme un CSV. Un pied
+absent ou incohérent (fichier tronqué) est ignoré : seules les trames sont alors relues.
+"""
+import argparse
+import csv
+import json
+import os
+import struct
+import time
+
+import numpy as np
+
+from enregistreur import Enregistreur, ENTETE_CSV, LotTrames, ligne_csv
+from horodatage import Horloge, formater_horodatages, lire_horodatages
+from trames import type_ligne, NB_CANAUX, VALEUR_INACTIVE, TRAME
+
+EXTENSION = ".nmd"
+VERSION = 1
+MAGIC = b"NMDB"
+MAGIC_FIN = b"NMDF"
+FORMAT_ENTETE = "<4sHH8x"
+FORMAT_PIED = "<QI4s"
+TAILLE_ENTETE = struct.calcsize(FORMAT_ENTETE)
+TAILLE_PIED = struct.calcsize(FORMAT_PIED)
+
+DTYPE_TRAME = np.dtype([("t_ns", "<i8"), ("analogique", "<u2", (NB_CANAUX,)), ("presence", "<u2")])
+TAILLE_TRAME = DTYPE_TRAME.itemsize
+
+# Longueur moyenne d'une trame au format CSV (horodatage texte + 32 valeurs)
+OCTETS_LIGNE_CSV = 137
+
+_BITS = (1 << np.arange(NB_CANAUX)).astype(np.uint16)
+
+
+def canaux_actifs(calibration):
+    """Canaux actifs d'après la réponse de calibration (1000 = capteur absent)."""
+    valeurs = [int(v) for v in calibration.split()[:NB_CANAUX]]
+    return [v != VALEUR_INACTIVE for v in valeurs]
+
+
+class EcrivainBinaire:
+    """Écriture synchrone d'une session .nmd (utilisée par l'enregistreur et les convertisseurs)."""
+
+    def __init__(self, filename, ancre_murale_ns=None, ancre_monotone_ns=None):
+        self.filename = filename
+        horloge = Horloge(ancre_murale_ns, ancre_monotone_ns)
+        self.meta = {
+            "version": VERSION,
+            "ancre_murale_ns": horloge.ancre_murale_ns,
+            "ancre_monotone_ns": horloge.ancre_monotone_ns,
+            "reponses": [],
+            "series": [],
+        }
+        self.nb_trames = 0
+        self.fichier = open(filename, "wb")
+        self.fichier.write(struct.pack(FORMAT_ENTETE, MAGIC, VERSION, TAILLE_TRAME))
+        self.fin_trames = TAILLE_ENTETE  # Fin des trames, celles en attente comprises
+        self.fin_disque = TAILLE_ENTETE  # Fin des trames déjà écrites dans le fichier
+        self.en_attente = []
+        self._ecrire_meta()
+
+    def ecrire_lignes(self, lignes):
+        """Écrit une suite de (t_ns, texte) reçus du capteur : trames et réponses aux commandes."""
+        t_trames, valeurs = [], []
+        for t_ns, data in lignes:
+            if not data.strip():
+                continue
+            nature = type_ligne(data)
+            if nature == TRAME:
+                t_trames.append(t_ns)
+                valeurs.append(data.split()[:2 * NB_CANAUX])
+            else:
+                self._ecrire_valeurs(t_trames, valeurs)
+                t_trames, valeurs = [], []
+                self.ecrire_reponse(t_ns, data.strip(), nature)
+        self._ecrire_valeurs(t_trames, valeurs)
+
+    def _ecrire_valeurs(self, t_ns, valeurs):
+        if len(t_ns) == 0:
+            return
+        valeurs = np.array(valeurs, dtype=np.uint16)
+        trames = np.zeros(len(t_ns), dtype=DTYPE_TRAME)
+        trames["t_ns"] = t_ns
+        trames["analogique"] = valeurs[:, :NB_CANAUX]
+        trames["presence"] = (valeurs[:, NB_CANAUX:] != 0) @ _BITS
+        self.ecrire_trames(trames)
+
+    def ecrire_mesures(self, t_ns, mesures):
+        """Écrit des trames déjà analysées (DTYPE_MESURE, ordre de réception) : un horodatage par trame ou commun."""
+        trames = np.zeros(len(mesures), dtype=DTYPE_TRAME)
+        trames["t_ns"] = t_ns
+        trames["analogique"] = mesures["analogique"]
+        trames["presence"] = (mesures["presence"] != 0) @ _BITS
+        self.ecrire_trames(trames)
+
+    def ecrire_trames(self, trames):
+        """Ajoute un tableau de trames (DTYPE_TRAME) à la suite des précédentes ; il est écrit au prochain vidage."""
+        if len(trames) == 0:
+            return
+        self.en_attente.append(np.ascontiguousarray(trames, dtype=DTYPE_TRAME).tobytes())
+        self.fin_trames += len(trames) * TAILLE_TRAME
+        self.nb_trames += len(trames)
+
+    def ecrire_reponse(self, t_ns, texte, nature=None):
+        """Mémorise une réponse du capteur (calibration, gain, seuil...) dans les métadonnées."""
+        nature = nature or type_ligne(texte)
+        self.meta["reponses"].append({"t_ns": int(t_ns), "trame": self.nb_trames, "type": nature, "texte": texte})
+        series = self.meta["series"]
+        if nature == "calibration":
+            series.append({"trame_debut": self.nb_trames, "calibration": texte,
+                           "canaux_actifs": canaux_actifs(texte), "gain": None, "seuil": None})
+        elif nature in ("gain", "seuil") and series:
+            series[-1][nature] = texte
+
+    def vider(self, fsync=False):
+        """Écrit les trames en attente (sur l'ancien bloc de métadonnées), réécrit le bloc et le pied, et vide le
+        tampon sur le disque."""
+        if self.en_attente:
+            self.fichier.seek(self.fin_disque)
+            self.fichier.write(b"".join(self.en_attente))
+            self.en_attente = []
+            self.fin_disque = self.fin_trames
+        self._ecrire_meta()
+        self.fichier.flush()
+        if fsync:
+            os.fsync(self.fichier.fileno())
+
+    def fermer(self, fsync=True):
+        self.vider(fsync)
+        self.fichier.close()
+
+    def _ecrire_meta(self):
+        self.meta["nb_trames"] = self.nb_trames
+        contenu = json.dumps(self.meta, ensure_ascii=False).encode("utf-8")
+        self.fichier.seek(self.fin_trames)
+        self.fichier.write(contenu)
+        self.fichier.write(struct.pack(FORMAT_PIED, self.fin_trames, len(contenu), MAGIC_FIN))
+        self.fichier.truncate()
+
+
+class EnregistreurBinaire(Enregistreur):
+    """Variante binaire de l'enregistreur : même file d'attente et même thread d'écriture, fichier .nmd."""
+
+    def ajouter(self, ligne):
+        """Dépose une ligne au format CSV (horodatage + cellules)."""
+        self.ajouter_trame(ligne[0], " ".join(c for c in ligne[1:] if c))
+
+    def ajouter_trame(self, timestamp, data):
+        """Dépose une trame brute ; l'horodatage texte est remplacé par l'horloge monotone."""
+        self._verifier()
+        self.file_attente.put((self._horodatage(timestamp), data))
+
+    def ajouter_lot(self, timestamp, trames, reponses=()):
+        super().ajouter_lot(self._horodatage(timestamp), trames, reponses)
+
+    def taille_ko(self):
+        """Taille équivalente au format CSV (en Ko), pour conserver les conditions d'arrêt en Ko."""
+        return self.lignes_ecrites * OCTETS_LIGNE_CSV / 1024
+
+    def _ouvrir(self, entete):
+        self.ecrivain = EcrivainBinaire(self.filename)
+        self.octets_ecrits = self.ecrivain.fin_trames
+
+    @staticmethod
+    def _horodatage(timestamp):
+        return timestamp if isinstance(timestamp, (int, np.integer, np.ndarray)) else time.monotonic_ns()
+
+    def _ecrire_lot(self, lot):
+        lignes = []
+        for element in lot:
+            if isinstance(element, LotTrames):
+                self.ecrivain.ecrire_lignes(lignes)
+                lignes = []
+                self.ecrivain.ecrire_mesures(element.timestamp, element.trames)
+                self.lignes_ecrites += len(element)
+            else:
+                lignes.append(element)
+        self.ecrivain.ecrire_lignes(lignes)
+        self.octets_ecrits = self.ecrivain.fin_trames
+        self.lignes_ecrites += len(lignes)
+        self.lots_ecrits += 1
+
+    def _vider_tampon(self):
+        self.ecrivain.vider(self.fsync)
+
+    def _fermer_fichier(self):
+        self.ecrivain.fichier.close()
+
+
+class SessionBinaire:
+    """Session .nmd projetée en mémoire : les trames sont lues à la demande (np.memmap)."""
+
+    def __init__(self, filename, mmap=True):
+        self.filename = filename
+        taille = os.path.getsize(filename)
+        with open(filename, "rb") as f:
+            magic, version, taille_trame = struct.unpack(FORMAT_ENTETE, f.read(TAILLE_ENTETE))
+            if magic != MAGIC or taille_trame != TAILLE_TRAME:
+                raise ValueError(f"{filename} n'est pas une session binaire nanomade.")
+            self.version = version
+            self.meta = {}
+            fin_trames = taille
+            if taille >= TAILLE_ENTETE + TAILLE_PIED:
+                f.seek(taille - TAILLE_PIED)
+                position, longueur, magic_fin = struct.unpack(FORMAT_PIED, f.read(TAILLE_PIED))
+                if magic_fin == MAGIC_FIN and TAILLE_ENTETE <= position <= taille - TAILLE_PIED - longueur:
+                    fin_trames = position
+                    f.seek(position)
+                    try:
+                        self.meta = json.loads(f.read(longueur).decode("utf-8"))
+                    except ValueError:
+                        pass  # Métadonnées recouvertes : les trames jusqu'au bloc restent lisibles
+
+        nb_trames = (fin_trames - TAILLE_ENTETE) // TAILLE_TRAME
+        if nb_trames == 0:
+            self.trames = np.zeros(0, dtype=DTYPE_TRAME)
+        elif mmap:
+            self.trames = np.memmap(filename, dtype=DTYPE_TRAME, mode="r", offset=TAILLE_ENTETE, shape=(nb_trames,))
+        else:
+            self.trames = np.fromfile(filename, dtype=DTYPE_TRAME, count=nb_trames, offset=TAILLE_ENTETE)
+
+    def __len__(self):
+        return len(self.trames)
+
+    @property
+    def horodatages_ns(self):
+        """Horodatages monotones (ns) de chaque trame."""
+        return self.trames["t_ns"]
+
+    @property
+    def analogique(self):
+        """Matrice (N, 16) des valeurs analogiques, dans l'ordre de réception."""
+        return self.trames["analogique"]
+
+    @property
+    def presence(self):
+        """Matrice (N, 16) des indicateurs de présence (0 ou 1)."""
+        return ((self.trames["presence"][:, None] & _BITS) != 0).astype(np.uint8)
+
+    @property
+    def series(self):
+        return self.meta.get("series", [])
+
+    @property
+    def canaux_actifs(self):
+        """Canaux actifs de la première série (tous si aucune calibration n'a été reçue)."""
+        if self.series:
+            return np.array(self.series[0]["canaux_actifs"], dtype=bool)
+        return np.ones(NB_CANAUX, dtype=bool)
+
+    def horodatages_muraux_ns(self, t_ns=None):
+        """Heure murale (ns, heure locale naïve) correspondant à des horodatages monotones."""
+        t_ns = self.horodatages_ns if t_ns is None else np.asarray(t_ns, dtype=np.int64)
+        return self.meta.get("ancre_murale_ns", 0) + (t_ns - self.meta.get("ancre_monotone_ns", 0))
+
+
+def lire_session(filename, mmap=True):
+    """Ouvre une session binaire .nmd."""
+    return SessionBinaire(filename, mmap=mmap)
+
+
+def binaire_vers_csv(source, destination, taille_bloc=65536):
+    """Exporte une session .nmd au format CSV historique (33 colonnes), par blocs de trames."""
+    session = lire_session(source)
+    reponses = session.meta.get("reponses", [])
+    with open(destination, mode="w", newline="", encoding="utf-8") as fichier:
+        writer = csv.writer(fichier)
+        writer.writerow(ENTETE_CSV)
+        i_reponse = 0
+        debut = 0
+        while True:
+            # Réponses (calibration...) à écrire avant la trame `debut`
+            while i_reponse < len(reponses) and reponses[i_reponse]["trame"] <= debut:
+                reponse = reponses[i_reponse]
+                ts = formater_horodatages(session.horodatages_muraux_ns([reponse["t_ns"]]))[0]
+                writer.writerow(ligne_csv(ts, reponse["texte"]))
+                i_reponse += 1
+            if debut >= len(session):
+                break
+
+            fin = min(len(session), debut + taille_bloc)
+            if i_reponse < len(reponses):
+                fin = min(fin, max(debut + 1, reponses[i_reponse]["trame"]))
+            bloc = session.trames[debut:fin]
+            timestamps = formater_horodatages(session.horodatages_muraux_ns(bloc["t_ns"]))
+            valeurs = np.hstack([bloc["analogique"], ((bloc["presence"][:, None] & _BITS) != 0).astype(np.uint8)])
+            writer.writerows([ts, *ligne] for ts, ligne in zip(timestamps, valeurs.tolist()))
+            debut = fin
+
+
+def csv_vers_binaire(source, destination, taille_bloc=8192):
+    """Convertit un enregistrement CSV historique en session .nmd, par blocs de lignes."""
+    ecrivain = None
+    bloc_ts, bloc_valeurs = [], []
+
+    def vider_bloc():
+        if not bloc_ts:
+            return
+        ecrivain._ecrire_valeurs(lire_horodatages(bloc_ts) - ecrivain.meta["ancre_murale_ns"], bloc_valeurs)
+        bloc_ts.clear()
+        bloc_valeurs.clear()
+
+    with open(source, newline="", encoding="utf-8") as fichier:
+        reader = csv.reader(fichier)
+        next(reader, None)  # En-tête
+        for row in reader:
+            if not row or not row[0]:
+                continue
+            if ecrivain is None:
+                # L'horloge murale du premier enregistrement sert d'ancre (horloge monotone = 0)
+                ecrivain = EcrivainBinaire(destination, ancre_murale_ns=int(lire_horodatages([row[0]])[0]),
+                                           ancre_monotone_ns=0)
+            tokens = [c for c in row[1:] if c]
+            nature = type_ligne(" ".join(tokens))
+            if nature == TRAME:
+                bloc_ts.append(row[0])
+                bloc_valeurs.append(tokens[:2 * NB_CANAUX])
+                if len(bloc_ts) >= taille_bloc:
+                    vider_bloc()
+            elif tokens:
+                vider_bloc()
+                t_ns = int(lire_horodatages([row[0]])[0]) - ecrivain.meta["ancre_murale_ns"]
+                ecrivain.ecrire_reponse(t_ns, " ".join(tokens), nature)
+
+    if ecrivain is None:
+        ecrivain = EcrivainBinaire(destination)
+    vider_bloc()
+    ecrivain.fermer()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Conversion entre enregistrements CSV et sessions binaires .nmd")
+    parser.add_argument("sens", choices=["vers-binaire", "vers-csv"])
+    parser.add_argument("source")
+    parser.add_argument("destination", nargs="?")
+    args = parser.parse_args()
+
+    if args.sens == "vers-binaire":
+        destination = args.destination or os.path.splitext(args.source)[0] + EXTENSION
+        csv_vers_binaire(args.source, destination)
+    else:
+        destination = args.destination or os.path.splitext(args.source)[0] + ".csv"
+        binaire_vers_csv(args.source, destination)
+    print(f"✅ {args.source} → {destination}")
@@ -0,0 +1,96 @@
+"""Horodatage des trames : horloge monotone en ns, convertie en heure murale grâce à une ancre par session.
+
+Les lecteurs horodatent chaque lot de trames avec time.monotonic_ns() (entier, sans mise en forme, insensible
+aux changements d'heure du système). Les trames d'un même lot sont ensuite étalées vers le passé à la période
+du capteur (au plus l'écart avec le lot précédent) : chacune garde son propre horodatage. L'enregistreur relève une seule fois l'heure murale au début de la session
+et écrit dans la colonne Timestamp l'heure murale en ns depuis l'epoch (heure locale, comme les anciens CSV).
+Le texte 'AAAA-MM-JJ HH:MM:SS,mmm' n'est produit qu'à l'export ou à l'affichage.
+
+Les chargeurs acceptent les deux formes de la colonne Timestamp : entier en ns ou ancien texte.
+"""
+import datetime
+import time
+
+import numpy as np
+
+NAT = np.iinfo(np.int64).min  # Valeur de NaT en datetime64[ns]
+PERIODE_TRAME_NS = 18_230_000  # Écart moyen entre deux trames du capteur (ANN/Lettres, Outils/Test)
+
+
+def etaler(timestamp, nombre, precedent=None, periode=PERIODE_TRAME_NS):
+    """Horodatage de chaque trame d'un lot lu d'un coup à `timestamp` : la dernière le garde, les précédentes sont
+    espacées de `periode`, réduite si besoin pour rester après `precedent` (horodatage du lot précédent)."""
+    if precedent is not None and nombre:
+        periode = min(periode, max(timestamp - precedent, 0) // nombre)
+    return int(timestamp) - periode * np.arange(nombre - 1, -1, -1, dtype=np.int64)
+
+
+def maintenant_ns():
+    """Heure murale locale (naïve, comme dans les CSV) en ns depuis l'epoch."""
+    return int(np.datetime64(datetime.datetime.now(), "ns").astype(np.int64))
+
+
+class Horloge:
+    """Ancre murale d'une session : convertit les horodatages monotones (ns) en heure murale (ns)."""
+
+    def __init__(self, ancre_murale_ns=None, ancre_monotone_ns=None):
+        self.ancre_monotone_ns = time.monotonic_ns() if ancre_monotone_ns is None else ancre_monotone_ns
+        self.ancre_murale_ns = maintenant_ns() if ancre_murale_ns is None else ancre_murale_ns
+
+    def murale_ns(self, t_ns):
+        """Heure murale (ns) d'un horodatage monotone (entier ou tableau)."""
+        return self.ancre_murale_ns + (t_ns - self.ancre_monotone_ns)
+
+
+def formater_horodatages(wall_ns):
+    """Convertit des horodatages muraux (ns) au format texte des CSV : 'AAAA-MM-JJ HH:MM:SS,mmm'."""
+    textes = np.datetime_as_string(np.asarray(wall_ns, dtype=np.int64).astype("datetime64[ns]"), unit="ms")
+    return [t.replace("T", " ").replace(".", ",") for t in textes]
+
+
+def lire_horodatages(valeurs):
+    """Convertit une colonne Timestamp (ns entiers ou texte 'AAAA-MM-JJ HH:MM:SS,mmm') en ns int64.
+
+    Les valeurs illisibles donnent NAT (NaT une fois converties en datetime64[ns]).
+    """
+    valeurs = np.asarray(valeurs)
+    if valeurs.dtype.kind in "iuf":
+        # Colonne déjà lue comme nombres par pandas
+        resultat = np.full(valeurs.shape, NAT, dtype=np.int64)
+        lisibles = np.isfinite(valeurs) if valeurs.dtype.kind == "f" else np.ones(valeurs.shape, dtype=bool)
+        resultat[lisibles] = valeurs[lisibles].astype(np.int64)
+        return resultat
+
+    textes = np.char.strip(valeurs.astype(str))
+    resultat = np.full(textes.shape, NAT, dtype=np.int64)
+    if textes.size == 0:
+        return resultat
+
+    entiers = np.char.isdigit(textes)
+    resultat[entiers] = textes[entiers].astype(np.int64)
+
+    autres = np.flatnonzero(~entiers)
+    if len(autres):
+        iso = np.char.replace(np.char.replace(textes[autres], " ", "T", count=1), ",", ".")
+        try:
+            resultat[autres] = iso.astype("datetime64[ns]").astype(np.int64)
+        except ValueError:
+            for i, texte in zip(autres, iso):
+                try:
+                    resultat[i] = np.datetime64(texte, "ns").astype(np.int64)
+                except ValueError:
+                    pass
+    return resultat
+
+
+def vers_datetime(valeurs):
+    """Colonne Timestamp (ns ou texte) en tableau datetime64[ns], pour l'affichage (NaT si illisible)."""
+    return lire_horodatages(valeurs).astype("datetime64[ns]")
+
+
+def formater_titre(valeur, format="%d/%m %Hh%M"):
+    """Met en forme un horodatage (ns ou texte) pour l'affichage ; None s'il est illisible."""
+    ns = lire_horodatages([valeur])[0]
+    if ns == NAT:
+        return None
+    return (datetime.datetime(1970, 1, 1) + datetime.timedelta(microseconds=int(ns) // 1000)).strftime(format)
@@ -0,0 +1,226 @@
+"""Index des séries d'un enregistrement CSV, écrit à côté du fichier (fichier.csv.index.json).
+
+Une série commence à chaque ligne de calibration (réponse à K : 16 entiers suivis de cellules vides),
+puis viennent les réponses de gain et de seuil et les trames. Pour chaque série, l'index donne ses
+positions dans le fichier (octets et lignes), ses horodatages de début et de fin (ns), le nombre de
+trames, la calibration et les canaux actifs : les visualiseurs listent les séries sans lire le fichier
+et ne chargent que la série choisie.
+
+Les enregistreurs tiennent l'index pendant l'écriture et l'écrivent à la fermeture de la session.
+Un fichier sans index (ou dont la taille ou la date de modification a changé) est balayé une fois, de façon vectorisée sur ses
+octets, et l'index reconstruit est mis en cache.
+"""
+import csv
+import io
+import json
+import os
+
+import numpy as np
+
+from horodatage import NAT, formater_titre, lire_horodatages
+from trames import NB_CANAUX, NB_VALEURS, canaux_actifs
+
+VERSION = 2  # 2 : date de modification du fichier (mtime_ns) dans l'index
+EXTENSION = ".index.json"
+CAPTEURS = [f"{p}_{i}" for p in ("M_F", "U_F") for i in range(1, 9)]  # Colonnes 1 à 16 de l'en-tête habituel
+
+
+def chemin_index(fichier):
+    return fichier + EXTENSION
+
+
+def est_calibration(cellules):
+    """Ligne CSV (liste de cellules) de réponse à K : 16 entiers puis des cellules vides."""
+    valeurs = cellules[1:1 + NB_CANAUX]
+    return (len(valeurs) == NB_CANAUX and all(str(v).isdigit() for v in valeurs)
+            and not any(str(v) for v in cellules[1 + NB_CANAUX:]))
+
+
+def _ns(timestamp):
+    """Horodatage d'une cellule (ns entier ou ancien texte) en ns, None s'il est illisible."""
+    if timestamp is None:
+        return None
+    ns = int(lire_horodatages([timestamp])[0])
+    return None if ns == NAT else ns
+
+
+def _serie(debut_octet, debut_ligne, cellules, capteurs):
+    calibration = [int(v) for v in cellules[1:1 + NB_CANAUX]]
+    return {
+        "debut_octet": debut_octet, "fin_octet": None,
+        "debut_ligne": debut_ligne, "fin_ligne": None,
+        "debut_ns": _ns(cellules[0]), "fin_ns": None,
+        "trames": 0,
+        "calibration": calibration,
+        "canaux_actifs": [nom for nom, actif in zip(capteurs, canaux_actifs(np.array(calibration))) if actif],
+    }
+
+
+def titre_serie(serie, format="%d/%m %Hh%M"):
+    """Date de début d'une série pour les listes déroulantes (format : 24/04 19h35)."""
+    titre = formater_titre(serie["debut_ns"], format) if serie["debut_ns"] is not None else None
+    return titre or "??/?? ??:??"
+
+
+def decouper_lignes(octets):
+    """Début et fin du contenu (sans \\r\\n) de chaque ligne d'un fichier lu en octets (tableau uint8)."""
+    taille = len(octets)
+    if not taille:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    fins = np.flatnonzero(octets == ord("\n"))
+    if not len(fins) or fins[-1] != taille - 1:
+        fins = np.append(fins, taille)  # Dernière ligne sans fin de ligne
+    debuts = np.concatenate([[0], fins[:-1] + 1]).astype(np.int64)
+    contenu = fins - ((fins > debuts) & (octets[np.maximum(fins - 1, 0)] == ord("\r")))
+    return debuts, contenu
+
+
+def finit_par_chiffre(octets, debuts, contenu):
+    """Lignes dont le dernier caractère est un chiffre : les trames (calibration et réponses finissent par des cellules vides)."""
+    dernier = octets[np.maximum(contenu - 1, 0)]
+    return (contenu > debuts) & (dernier >= ord("0")) & (dernier <= ord("9"))
+
+
+def lignes_calibration(octets, debuts, contenu):
+    """Lignes de calibration : exactement 16 cellules vides en fin de ligne, précédées d'un chiffre."""
+    calibration = np.zeros(len(debuts), dtype=bool)
+    longues = np.flatnonzero(contenu - debuts > NB_CANAUX + 1)
+    queue = octets[contenu[longues, None] - np.arange(1, NB_CANAUX + 1)]
+    avant = octets[contenu[longues] - NB_CANAUX - 1]
+    calibration[longues] = (queue == ord(",")).all(axis=1) & (avant >= ord("0")) & (avant <= ord("9"))
+    return calibration
+
+
+def construire_index(fichier):
+    """Balaye le fichier (une passe vectorisée sur les octets) et renvoie son index."""
+    mtime_ns = os.stat(fichier).st_mtime_ns  # Relevée avant la lecture : une écriture pendant le balayage invalide l'index
+    octets = np.fromfile(fichier, dtype=np.uint8)
+    taille = len(octets)
+    debuts, contenu = decouper_lignes(octets)
+
+    premiere = octets[:contenu[0]].tobytes().decode("utf-8", errors="replace") if len(debuts) else ""
+    entete = next(csv.reader([premiere])) if premiere.startswith("Timestamp") else None
+    capteurs = entete[1:1 + NB_CANAUX] if entete else CAPTEURS
+
+    trames = finit_par_chiffre(octets, debuts, contenu)
+    calibration = lignes_calibration(octets, debuts, contenu)
+    if entete is not None:
+        trames[0] = False
+
+    series = []
+    lignes_series = np.flatnonzero(calibration)
+    limites = np.append(lignes_series, len(debuts))
+    nb_trames = np.concatenate([[0], np.cumsum(trames)])
+    for debut, fin in zip(limites[:-1], limites[1:]):
+        texte = octets[debuts[debut]:contenu[debut]].tobytes().decode("utf-8", errors="replace")
+        cellules = next(csv.reader([texte]))
+        if not est_calibration(cellules):
+            continue
+        serie = _serie(int(debuts[debut]), int(debut), cellules, capteurs)
+        serie["fin_octet"] = int(debuts[fin]) if fin < len(debuts) else taille
+        serie["fin_ligne"] = int(fin)
+        serie["trames"] = int(nb_trames[fin] - nb_trames[debut])
+        derniere = debut + np.flatnonzero(trames[debut:fin])[-1] if serie["trames"] else debut
+        texte = octets[debuts[derniere]:contenu[derniere]].tobytes().decode("utf-8", errors="replace")
+        serie["fin_ns"] = _ns(next(csv.reader([texte]))[0])
+        series.append(serie)
+
+    return {"version": VERSION, "taille": taille, "mtime_ns": mtime_ns, "lignes": len(debuts), "entete": entete,
+            "series": series}
+
+
+def ecrire_index(fichier, index):
+    """Écrit l'index à côté du fichier (sans effet si le dossier est en lecture seule)."""
+    try:
+        with open(chemin_index(fichier), "w", encoding="utf-8") as f:
+            json.dump(index, f, ensure_ascii=False)
+    except OSError:
+        pass
+
+
+def lire_index(fichier, construire=True):
+    """Index du fichier : celui en cache s'il correspond encore au fichier, sinon reconstruit (et mis en cache)."""
+    try:
+        with open(chemin_index(fichier), encoding="utf-8") as f:
+            index = json.load(f)
+        etat = os.stat(fichier)
+        if (index.get("version"), index.get("taille"), index.get("mtime_ns")) == (VERSION, etat.st_size, etat.st_mtime_ns):
+            return index
+    except (OSError, ValueError):
+        pass
+    if not construire:
+        return None
+    index = construire_index(fichier)
+    ecrire_index(fichier, index)
+    return index
+
+
+def serie_fichier(fichier, index):
+    """Pseudo-série couvrant tout le fichier après l'en-tête (choix « Fichier entier »)."""
+    debut = 0
+    if index["entete"] is not None:
+        with open(fichier, "rb") as f:
+            debut = len(f.readline())
+    return {"debut_octet": debut, "fin_octet": index["taille"]}
+
+
+def lire_octets_serie(fichier, serie):
+    """Octets d'une série (lignes CSV complètes), sans lire le reste du fichier."""
+    with open(fichier, "rb") as f:
+        f.seek(serie["debut_octet"])
+        return f.read(serie["fin_octet"] - serie["debut_octet"])
+
+
+def lire_lignes_serie(fichier, serie):
+    """Lignes d'une série, découpées en cellules comme csv.reader (lignes vides ignorées)."""
+    texte = lire_octets_serie(fichier, serie).decode("utf-8")
+    return [ligne for ligne in csv.reader(io.StringIO(texte, newline="")) if ligne]
+
+
+class SuiviSeries:
+    """Index tenu par un enregistreur pendant l'écriture : positions connues sans relire le fichier."""
+
+    def __init__(self, fichier, taille, entete=None):
+        self.fichier = fichier
+        existant = lire_index(fichier, construire=False) if taille else None
+        # Fichier existant sans index à jour : il sera balayé à la fermeture
+        self.a_reconstruire = bool(taille) and existant is None
+        # Nouveau fichier : l'en-tête est écrit par l'enregistreur avant les lignes de la session
+        self.index = existant or {"version": VERSION, "taille": 0, "lignes": int(bool(entete)), "entete": entete,
+                                  "series": []}
+        self.lignes_initiales = self.index["lignes"]
+        self.capteurs = (self.index["entete"] or [None] + CAPTEURS)[1:1 + NB_CANAUX]
+        self.en_cours = None
+
+    def ligne(self, cellules, octet, numero):
+        """Ligne hors lot de trames (réponse, trame brute) écrite à l'octet `octet`, `numero`-ième de la session."""
+        if est_calibration(cellules):
+            self._clore(octet, numero)
+            self.en_cours = _serie(octet, self.lignes_initiales + numero, cellules, self.capteurs)
+        elif len(cellules) > NB_VALEURS and all(str(v).isdigit() for v in cellules[1:1 + NB_VALEURS]):
+            self.ajouter_trames(1, cellules[0])
+
+    def ajouter_trames(self, nombre, timestamp):
+        if self.en_cours is not None:
+            self.en_cours["trames"] += nombre
+            self.en_cours["fin_ns"] = timestamp
+
+    def _clore(self, octet, numero):
+        if self.en_cours is None:
+            return
+        self.en_cours["fin_octet"] = octet
+        self.en_cours["fin_ligne"] = self.lignes_initiales + numero
+        self.en_cours["fin_ns"] = _ns(self.en_cours["fin_ns"]) if self.en_cours["trames"] else self.en_cours["debut_ns"]
+        self.index["series"].append(self.en_cours)
+        self.en_cours = None
+
+    def ecrire(self, taille, lignes):
+        """Termine l'index à la fermeture de la session (fichier de `taille` octets, `lignes` lignes écrites)."""
+        self._clore(taille, lignes)
+        if self.a_reconstruire:
+            ecrire_index(self.fichier, construire_index(self.fichier))
+            return
+        self.index["taille"] = taille
+        self.index["mtime_ns"] = os.stat(self.fichier).st_mtime_ns  # Fichier déjà fermé par l'enregistreur
+        self.index["lignes"] = self.lignes_initiales + lignes
+        ecrire_index(self.fichier, self.index)
@@ -0,0 +1,193 @@
+"""Jeu de données compilé d'un dossier Lettres (un sous-dossier par lettre), lu en mémoire projetée.
+
+Toutes les matrices du dossier sont rangées bout à bout dans un seul tableau float32 (Lettres.jeu.npy,
+à côté du dossier), décrit par une table JSON (Lettres.jeu.json) : pour chaque fichier, sa lettre,
+sa position et son nombre de lignes dans le tableau, sa taille, sa date de modification et son empreinte.
+
+    - disposition "brut" (ANN/Lettres, Outils/Test/A) : toutes les lignes non vides du CSV sur 33 colonnes,
+      horodatage et texte à 0 (la matrice de Enregistrement.vecteur_ann) ;
+    - disposition "nettoye" (LSTM/Lettres/*_) : les colonnes capteurs normalisées.
+
+Une autre extraction peut être donnée à la compilation (par exemple caracteristiques.Caracteristiques) : le
+jeu (Lettres.<nom>.jeu.npy) contient alors la matrice qu'elle rend pour chaque fichier, avec ses réglages.
+
+La compilation est incrémentale : un fichier dont la taille et la date n'ont pas changé (ou, à défaut,
+dont l'empreinte est la même) n'est pas relu. Sans aucun changement, l'ouverture ne coûte que la
+lecture de la table et un stat par fichier. Les fichiers à relire sont lus sur plusieurs processus
+(lire_fichiers), chacun renvoyant ses matrices NumPy par paquets, dans l'ordre des fichiers.
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from chargement import NB_COLONNES, charger
+
+VERSION = 1
+EXTENSION = ".jeu"
+BRUT = "brut"
+NETTOYE = "nettoye"
+
+
+def chemins_jeu(racine, nom=None):
+    """Chemins du tableau et de la table d'un dossier (à côté du dossier, pour ne pas ajouter de fichier dedans)."""
+    base = os.path.normpath(racine) + (f".{nom}" if nom else "") + EXTENSION
+    return base + ".npy", base + ".json"
+
+
+def empreinte(chemin):
+    with open(chemin, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def lister_fichiers(racine):
+    """CSV du dossier, triés : [(chemin relatif, lettre)] (la lettre est le nom du sous-dossier)."""
+    fichiers = []
+    for lettre in sorted(os.listdir(racine)):
+        dossier = os.path.join(racine, lettre)
+        if os.path.isdir(dossier):
+            fichiers += [(os.path.join(lettre, f), lettre) for f in sorted(os.listdir(dossier)) if f.endswith(".csv")]
+    return fichiers
+
+
+def _matrice(chemin):
+    """Matrice rangée dans le jeu pour un fichier, avec sa disposition."""
+    enregistrement = charger(chemin)
+    if enregistrement.nettoye:
+        return enregistrement.analogique.astype(np.float32), NETTOYE
+    return enregistrement.vecteur_ann().reshape(-1, NB_COLONNES).astype(np.float32), BRUT
+
+
+def lire_fichiers(chemins, lecture=_matrice, workers=None):
+    """Applique lecture à chaque fichier sur `workers` processus (None : tous les cœurs), résultats dans l'ordre des chemins."""
+    workers = min(workers or os.cpu_count() or 1, len(chemins))
+    if workers <= 1:
+        return [lecture(chemin) for chemin in chemins]
+    # Quelques paquets par processus : peu d'échanges, et les processus finissent à peu près ensemble
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(lecture, chemins, chunksize=max(1, len(chemins) // (workers * 4))))
+
+
+class JeuDonnees:
+    """Jeu compilé : tableau en mémoire projetée (donnees) et table des fichiers."""
+
+    def __init__(self, racine, nom=None):
+        self.racine = racine
+        chemin_donnees, chemin_table = chemins_jeu(racine, nom)
+        with open(chemin_table, encoding="utf-8") as f:
+            self.table = json.load(f)
+        self.fichiers = self.table["fichiers"]
+        self.disposition = self.table["disposition"]
+        self.donnees = np.load(chemin_donnees, mmap_mode="r") if self.fichiers else np.zeros((0, 0), np.float32)
+
+    def __len__(self):
+        return len(self.fichiers)
+
+    @property
+    def lettres(self):
+        return [f["lettre"] for f in self.fichiers]
+
+    def matrice(self, i):
+        """Matrice du i-ème fichier (vue en lecture seule sur le tableau projeté)."""
+        fichier = self.fichiers[i]
+        return self.donnees[fichier["debut"]:fichier["debut"] + fichier["lignes"]]
+
+    def __iter__(self):
+        for i, fichier in enumerate(self.fichiers):
+            yield fichier["lettre"], self.matrice(i)
+
+
+def _ouvrir_ancien(racine, nom, parametres):
+    try:
+        jeu = JeuDonnees(racine, nom)
+    except (OSError, ValueError, KeyError):
+        return None
+    return jeu if (jeu.table.get("version"), jeu.table.get("extraction")) == (VERSION, parametres) else None
+
+
+def compiler(racine, verbeux=True, workers=None, extraction=None):
+    """Met à jour le jeu compilé du dossier (seuls les fichiers nouveaux ou modifiés sont relus) et l'ouvre.
+
+    `extraction` (objet avec nom, parametres, et appelable sur un chemin -> (matrice, disposition)) remplace la
+    lecture par défaut ; un jeu compilé avec d'autres réglages est entièrement refait.
+    """
+    nom, parametres = (extraction.nom, extraction.parametres) if extraction else (None, None)
+    chemin_donnees, chemin_table = chemins_jeu(racine, nom)
+    debut = time.perf_counter()
+    ancien = _ouvrir_ancien(racine, nom, parametres)
+    anciens = ancien.fichiers if ancien else []
+    connus = {f["chemin"]: i for i, f in enumerate(anciens)}
+    disposition = ancien.disposition if ancien else None
+
+    fichiers, reprises, a_relire = [], [], []
+    table_modifiee = ancien is None
+    for chemin_relatif, lettre in lister_fichiers(racine):
+        chemin = os.path.join(racine, chemin_relatif)
+        etat = os.stat(chemin)
+        entree = {"chemin": chemin_relatif, "lettre": lettre, "taille": etat.st_size, "mtime_ns": etat.st_mtime_ns}
+        i = connus.get(chemin_relatif)
+        if i is not None and (anciens[i]["taille"], anciens[i]["mtime_ns"]) == (etat.st_size, etat.st_mtime_ns):
+            entree["empreinte"] = anciens[i]["empreinte"]
+        else:
+            # Date ou taille changée : le contenu n'est relu que si l'empreinte a changé
+            entree["empreinte"] = empreinte(chemin)
+            table_modifiee = True
+            if i is not None and anciens[i]["empreinte"] != entree["empreinte"]:
+                i = None
+        if i is None:
+            a_relire.append(chemin)
+        fichiers.append(entree)
+        reprises.append(i)
+
+    lus = iter(zip(a_relire, lire_fichiers(a_relire, extraction or _matrice, workers)))
+    relus, blocs = len(a_relire), []
+    for entree, i in zip(fichiers, reprises):
+        if i is not None:
+            bloc = ancien.matrice(i)
+        else:
+            chemin, (bloc, disposition_fichier) = next(lus)
+            if disposition is not None and disposition_fichier != disposition:
+                raise ValueError(f"{chemin} : disposition {disposition_fichier}, le dossier est en {disposition}")
+            disposition = disposition_fichier
+        entree["lignes"] = len(bloc)
+        blocs.append(bloc)
+
+    # Le tableau n'est réécrit que si son contenu change (fichier relu, ajouté, supprimé ou déplacé)
+    donnees_modifiees = relus > 0 or [f["chemin"] for f in fichiers] != [f["chemin"] for f in anciens]
+    if donnees_modifiees or table_modifiee:
+        position = 0
+        for entree in fichiers:
+            entree["debut"] = position
+            position += entree["lignes"]
+        colonnes = blocs[0].shape[1] if blocs else 0
+        if donnees_modifiees and blocs:
+            donnees = np.concatenate(blocs)  # Copie : l'ancien tableau projeté peut ensuite être remplacé
+            del blocs, bloc, ancien
+            temporaire = chemin_donnees + ".tmp.npy"
+            np.save(temporaire, donnees)
+            os.replace(temporaire, chemin_donnees)
+        table = {"version": VERSION, "extraction": parametres, "disposition": disposition, "colonnes": colonnes,
+                 "fichiers": fichiers}
+        temporaire = chemin_table + ".tmp"
+        with open(temporaire, "w", encoding="utf-8") as f:
+            json.dump(table, f, ensure_ascii=False)
+        os.replace(temporaire, chemin_table)
+
+    jeu = JeuDonnees(racine, nom)
+    if verbeux:
+        print(f"📦 Jeu {os.path.basename(os.path.normpath(racine))} : {len(jeu)} fichiers ({jeu.disposition}), "
+              f"{relus} relus en {(time.perf_counter() - debut) * 1000:.0f} ms")
+    return jeu
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compile un dossier Lettres en jeu de données (mémoire projetée)")
+    parser.add_argument("dossiers", nargs="+")
+    parser.add_argument("--workers", type=int, default=None, help="processus de lecture (défaut : tous les cœurs)")
+    args = parser.parse_args()
+    for dossier in args.dossiers:
+        compiler(dossier, workers=args.workers)
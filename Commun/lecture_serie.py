@@ -0,0 +1,73 @@
+"""Lecture du port série par blocs, partagée par l'interface, le prototype et l'outil de prise de données.
+
+Au lieu d'un readline() par trame, on lit d'un coup tout ce que contient le tampon du port
+(in_waiting), on découpe les lignes complètes et on les transmet par lots à l'analyseur de trames.
+La fin de ligne incomplète est conservée pour la lecture suivante.
+"""
+import time
+
+from trames import AnalyseurTrames
+
+
+class LecteurSerie:
+    def __init__(self, ser, analyseur=None, taille_max=1 << 16):
+        self.ser = ser
+        self.analyseur = analyseur or AnalyseurTrames(reordonner=False)
+        self.taille_max = taille_max
+        self.tampon = bytearray()
+        self.octets_lus = 0
+        self.lignes_lues = 0
+        self.trames_lues = 0
+        self.lectures = 0
+        self.debut = time.monotonic()
+
+    @property
+    def lignes_invalides(self):
+        return self.analyseur.lignes_invalides
+
+    def lire_lignes(self):
+        """Lit le contenu disponible du port et renvoie les lignes complètes (bytes, sans fin de ligne)."""
+        # read() attend au moins un octet (dans la limite du timeout du port), puis on vide in_waiting
+        data = self.ser.read(min(max(self.ser.in_waiting, 1), self.taille_max))
+        if not data:
+            return []
+        self.lectures += 1
+        self.octets_lus += len(data)
+        self.tampon += data
+
+        fin = self.tampon.rfind(b"\n")
+        if fin < 0:
+            return []
+        lignes = bytes(self.tampon[:fin]).split(b"\n")
+        del self.tampon[:fin + 1]
+        self.lignes_lues += len(lignes)
+        return lignes
+
+    def lire(self):
+        """Lit le port et analyse les lignes complètes : renvoie (trames, reponses) comme AnalyseurTrames.analyser."""
+        lignes = self.lire_lignes()
+        if not lignes:
+            return self.analyseur.sortie[:0], []
+        trames, reponses = self.analyseur.analyser(lignes)
+        self.trames_lues += len(trames)
+        return trames, reponses
+
+    def vider(self):
+        """Abandonne les données en attente (tampon du port et ligne incomplète) ; renvoie le nombre d'octets ignorés."""
+        ignores = len(self.tampon) + self.ser.in_waiting
+        self.ser.reset_input_buffer()
+        self.tampon.clear()
+        return ignores
+
+    def statistiques(self):
+        """Débits (octets/s, trames/s) et compteurs de lignes depuis la création du lecteur."""
+        duree = time.monotonic() - self.debut
+        return {
+            "octets_lus": self.octets_lus,
+            "lignes_lues": self.lignes_lues,
+            "trames_lues": self.trames_lues,
+            "lignes_invalides": self.lignes_invalides,
+            "lectures": self.lectures,
+            "octets_par_s": self.octets_lus / duree if duree > 0 else 0.0,
+            "trames_par_s": self.trames_lues / duree if duree > 0 else 0.0,
+        }
@@ -0,0 +1,263 @@
+"""Reconnaissance du LSTM en continu, trame par trame, en NumPy seul (sans TensorFlow).
+
+Le LSTM est entraîné sur des séquences de 50 trames qui partent chacune d'un état nul : garder un seul état d'une
+trame à l'autre ne donne pas les mêmes lettres (25 % de bonnes réponses sur Outils/Test, au lieu de 97,5 %).
+ReconnaissanceContinue garde donc l'état de chaque séquence en cours (au plus 50) et les avance toutes d'un pas à
+chaque nouvelle trame, en un seul calcul : la trame n'est projetée (x·W) qu'une fois pour toutes les séquences et
+aucune fenêtre n'est recopiée. Chaque séquence terminée donne ses probabilités ; l'estimation courante est la
+moyenne de celles d'au moins 98 % de confiance, comme predire_csv, qu'elle rejoint à la fin d'un fichier.
+
+NormalisationContinue prépare les trames brutes du capteur : colonnes actives choisies sur la première trame, puis
+division par le maximum vu jusque-là (le maximum de tout l'enregistrement, utilisé par nettoyage_csv.py, n'est
+connu qu'à la fin ; 36 fichiers de Outils/Test sur 40 reconnus ainsi, 39 avec le maximum final).
+
+    python lstm_continu.py ../LSTM --exporter                 model_lstm.keras et lettres.pkl -> model_lstm.npz
+    python lstm_continu.py ../LSTM --fichier geste.csv        fichier rejoué trame par trame
+    python lstm_continu.py ../LSTM [--port simulateur://...]  flux du capteur, une lettre par geste détecté
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from caracteristiques import NB_CANAUX, VALEURS_EXCLUES, donnees_lstm
+from chargement import charger
+from reseau_numpy import ACTIVATIONS, _sigmoide
+from trames import VALEUR_INACTIVE, VALEUR_SATUREE
+
+FICHIER = "model_lstm.npz"
+VERSION = 1
+SEUIL_CONFIANCE = 0.98
+INCONNUE = "Inconnue"
+
+
+def exporter(modele, classes, chemin):
+    """Écrit le LSTM Keras (une couche LSTM, puis Dropout et Dense) et ses classes dans `chemin` (.npz)."""
+    tableaux, activations = {}, []
+    for couche in modele.layers:
+        config, nom = couche.get_config(), type(couche).__name__
+        if nom in ("Dropout", "InputLayer"):
+            continue
+        if nom == "LSTM" and "noyau" not in tableaux and not config["return_sequences"] \
+                and (config["activation"], config["recurrent_activation"]) == ("tanh", "sigmoid"):
+            tableaux["noyau"], tableaux["recurrent"], tableaux["biais_lstm"] = couche.get_weights()
+        elif nom == "Dense" and "noyau" in tableaux and config["activation"] in ACTIVATIONS:
+            tableaux[f"poids_{len(activations)}"], tableaux[f"biais_{len(activations)}"] = couche.get_weights()
+            activations.append(config["activation"])
+        else:
+            raise ValueError(f"Couche {couche.name} ({nom}) non exportable")
+    meta = {"version": VERSION, "longueur": int(modele.input_shape[1]), "activations": activations}
+    np.savez(chemin, meta=np.array(json.dumps(meta)), classes=np.array([str(c) for c in classes]),
+             **{nom: np.asarray(t, dtype=np.float32) for nom, t in tableaux.items()})
+
+
+class LSTMNumpy:
+    """LSTM exporté : pas de la cellule (portes i, f, c, o comme Keras) et couches Dense de sortie, en float32."""
+
+    def __init__(self, chemin):
+        with np.load(chemin, allow_pickle=False) as f:
+            meta = json.loads(str(f["meta"]))
+            self.classes = [str(c) for c in f["classes"]]
+            self.noyau, self.recurrent, self.biais = f["noyau"], f["recurrent"], f["biais_lstm"]
+            self.couches = [(f[f"poids_{i}"], f[f"biais_{i}"], ACTIVATIONS[a]) for i, a in enumerate(meta["activations"])]
+        if meta["version"] != VERSION:
+            raise ValueError(f"{chemin} : version {meta['version']} non prise en charge")
+        self.longueur = meta["longueur"]
+        self.unites = self.recurrent.shape[0]
+
+    def projeter(self, x):
+        """Partie de la cellule qui ne dépend que des trames : x·W + b."""
+        return x @ self.noyau + self.biais
+
+    def pas(self, projection, h, c):
+        """Un pas de temps pour un lot d'états (h, c), mis à jour sur place."""
+        z = projection + h @ self.recurrent
+        i, f, g, o = np.split(z, 4, axis=-1)
+        c *= _sigmoide(f)
+        c += _sigmoide(i) * np.tanh(g)
+        h[:] = _sigmoide(o) * np.tanh(c)
+
+    def sortie(self, h):
+        for poids, biais, activation in self.couches:
+            h = activation(h @ poids + biais)
+        return h
+
+    def probabilites(self, sequences):
+        """Probabilités de séquences entières (n x longueur x colonnes), comme model.predict."""
+        sequences = np.asarray(sequences, dtype=np.float32)
+        h = np.zeros((len(sequences), self.unites), np.float32)
+        c = np.zeros_like(h)
+        projections = self.projeter(sequences)
+        for t in range(sequences.shape[1]):
+            self.pas(projections[:, t], h, c)
+        return self.sortie(h)
+
+
+class ReconnaissanceContinue:
+    """Estimation courante de la lettre, mise à jour à chaque trame (colonnes déjà nettoyées)."""
+
+    def __init__(self, reseau, seuil=SEUIL_CONFIANCE):
+        self.reseau = reseau
+        self.seuil = seuil
+        self.h = np.zeros((reseau.longueur, reseau.unites), np.float32)  # Case t % longueur : séquence commencée en t
+        self.c = np.zeros_like(self.h)
+        self.reinitialiser()
+
+    def reinitialiser(self):
+        self.trames = 0
+        self.sequences = 0
+        self.confiantes = 0
+        self.somme = np.zeros(len(self.reseau.classes))
+
+    def ajouter(self, trame):
+        """Avance toutes les séquences en cours d'une trame ; rend les probabilités de la séquence terminée, ou None."""
+        longueur = self.reseau.longueur
+        case = self.trames % longueur
+        self.h[case] = 0  # Nouvelle séquence
+        self.c[case] = 0
+        actives = slice(0, min(self.trames + 1, longueur))
+        self.reseau.pas(self.reseau.projeter(np.asarray(trame, dtype=np.float32)), self.h[actives], self.c[actives])
+        self.trames += 1
+        if self.trames < longueur:
+            return None
+        # La séquence commencée il y a `longueur` trames est complète
+        probabilites = self.reseau.sortie(self.h[(self.trames - longueur) % longueur])
+        self.sequences += 1
+        if probabilites.max() >= self.seuil:
+            self.confiantes += 1
+            self.somme += probabilites
+        return probabilites
+
+    def ajouter_lot(self, trames):
+        for trame in trames:
+            self.ajouter(trame)
+        return self.resultat
+
+    def terminer(self):
+        """Fin d'enregistrement : moins de `longueur` trames sont complétées par des zéros, comme predire_csv."""
+        while self.trames < self.reseau.longueur:
+            self.ajouter(np.zeros(self.reseau.noyau.shape[0], np.float32))
+        return self.resultat
+
+    @property
+    def resultat(self):
+        """Comme le service de prédiction : {"lettre", "classes", "probabilites", "sequences", "confiantes"}."""
+        moyenne = self.somme / self.confiantes if self.confiantes else np.zeros(len(self.reseau.classes))
+        lettre = self.reseau.classes[int(np.argmax(moyenne))] if self.confiantes else INCONNUE
+        return {"lettre": lettre, "classes": self.reseau.classes, "probabilites": moyenne.tolist(),
+                "sequences": self.sequences, "confiantes": self.confiantes}
+
+
+class NormalisationContinue:
+    """Trames brutes (analogique, présence) -> colonnes du LSTM divisées par le maximum vu jusque-là."""
+
+    def __init__(self, nb_colonnes=NB_CANAUX):
+        self.nb_colonnes = nb_colonnes
+        self.reinitialiser()
+
+    def reinitialiser(self):
+        """Nouveau geste : colonnes et maximum repris à zéro, comme nettoyer() le fait pour chaque fichier."""
+        self.colonnes = None
+        self.maximum = 0.0
+
+    def __call__(self, analogique, presence):
+        brut = np.hstack([analogique, presence]).astype(np.float64)
+        if not len(brut):
+            return np.zeros((0, self.nb_colonnes), np.float32)
+        if self.colonnes is None:
+            # Comme nettoyer() : colonnes actives (ni 1000 ni 3299) de la première trame, 8 premières
+            self.colonnes = np.flatnonzero((brut[0] != VALEUR_INACTIVE) & (brut[0] != VALEUR_SATUREE))[:self.nb_colonnes]
+        x = brut[:, self.colonnes]
+        valides = np.where(np.isin(x, VALEURS_EXCLUES), 0, x).max(axis=1, initial=0)
+        maximum = np.maximum.accumulate(np.concatenate([[self.maximum], valides]))[1:]
+        self.maximum = maximum[-1]
+        return np.divide(x, maximum[:, None], out=np.zeros_like(x), where=maximum[:, None] > 0).astype(np.float32)
+
+
+def reconnaitre_fichier(reseau, chemin, causal=False):
+    """Rejoue un fichier trame par trame ; causal : normalisation du flux (maximum courant) au lieu de celle du fichier."""
+    enregistrement = charger(chemin)
+    if causal and not enregistrement.nettoye:
+        trames = NormalisationContinue()(enregistrement.analogique, enregistrement.presence)
+    else:
+        trames = donnees_lstm(enregistrement)
+    reconnaissance = ReconnaissanceContinue(reseau)
+    reconnaissance.ajouter_lot(trames)
+    return reconnaissance.terminer()
+
+
+def exporter_dossier(dossier):
+    """Exporte model_lstm.keras et lettres.pkl d'un dossier du LSTM ; rend le chemin du .npz."""
+    import joblib
+    from tensorflow.keras.models import load_model
+
+    classe_to_lettre = joblib.load(os.path.join(dossier, "lettres.pkl"))
+    sortie = os.path.join(dossier, FICHIER)
+    exporter(load_model(os.path.join(dossier, "model_lstm.keras")),
+             [classe_to_lettre[i] for i in range(len(classe_to_lettre))], sortie)
+    return sortie
+
+
+def reconnaitre_flux(reseau, port):
+    """Flux du capteur : trames normalisées au fil de l'eau, une lettre affichée à la fin de chaque geste.
+
+    La normalisation et les séquences repartent de zéro après chaque geste (l'entraînement normalise chaque
+    fichier à part). La fin d'un geste n'est connue qu'au bloc qui la contient : la lettre tient aussi compte des
+    trames qui suivent le geste dans ce bloc.
+    """
+    from calibration import CacheCalibration, arreter_flux, demarrer_session, resume_calibration
+    from lecture_serie import LecteurSerie
+    from segmentation import SegmenteurGestes
+    from simulateur import ouvrir_port
+    from trames import AnalyseurTrames
+
+    ser = ouvrir_port(port, baudrate=430000, timeout=1)
+    lecteur = LecteurSerie(ser, AnalyseurTrames(capacite=64, reordonner=False))
+    cache = CacheCalibration()
+    print(resume_calibration(demarrer_session(ser, lecteur, cache)))
+    segmenteur = SegmenteurGestes(cache.base)
+    normalisation = NormalisationContinue()
+    reconnaissance = ReconnaissanceContinue(reseau)
+    print("✍️ Reconnaissance en continu (Ctrl+C pour arrêter).")
+    try:
+        while True:
+            trames, _ = lecteur.lire()
+            if not len(trames):
+                continue
+            debut = time.perf_counter()
+            resultat = reconnaissance.ajouter_lot(normalisation(trames["analogique"], trames["presence"]))
+            duree = (time.perf_counter() - debut) * 1000 / len(trames)
+            for _ in segmenteur.ajouter(trames, time.monotonic_ns()):
+                print(f"🧠 Geste {segmenteur.gestes} : {resultat['lettre']} ({resultat['confiantes']}/"
+                      f"{resultat['sequences']} séquences confiantes, {duree:.3f} ms par trame)")
+                reconnaissance.reinitialiser()
+                normalisation.reinitialiser()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        arreter_flux(ser, lecteur)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reconnaissance du LSTM trame par trame")
+    parser.add_argument("dossier", help="dossier du LSTM (model_lstm.npz, ou model_lstm.keras et lettres.pkl)")
+    parser.add_argument("--exporter", action="store_true", help="écrit model_lstm.npz depuis le modèle Keras")
+    parser.add_argument("--fichier", nargs="+", help="fichiers CSV rejoués trame par trame")
+    parser.add_argument("--causal", action="store_true", help="fichiers normalisés comme le flux du capteur")
+    parser.add_argument("--port", default=os.environ.get("NANOMADE_PORT", "COM9"))
+    args = parser.parse_args()
+
+    chemin = os.path.join(args.dossier, FICHIER)
+    if args.exporter or not os.path.exists(chemin):
+        print(f"📦 Export : {exporter_dossier(args.dossier)}")
+    reseau = LSTMNumpy(chemin)
+    if args.fichier:
+        for fichier in args.fichier:
+            debut = time.perf_counter()
+            resultat = reconnaitre_fichier(reseau, fichier, args.causal)
+            print(f"🧠 {fichier} : {resultat['lettre']} ({resultat['confiantes']}/{resultat['sequences']} séquences "
+                  f"confiantes, {(time.perf_counter() - debut) * 1000:.1f} ms)")
+    elif not args.exporter:
+        reconnaitre_flux(reseau, args.port)
@@ -0,0 +1,197 @@
+"""Modèles quantifiés en int8 (TFLite, quantification entière après entraînement) pour les PC peu puissants.
+
+quantifier() convertit un modèle Keras (ANN ou LSTM) en .tflite entièrement entier : poids en int8, activations,
+entrée et sortie en int8 (ANN) ou en int16 (LSTM : en int8, l'erreur s'accumule d'un pas de temps à l'autre et
+la moitié des séquences changent de lettre). Les plages de valeurs sont calibrées sur un sous-ensemble
+représentatif des données d'entraînement (exemples tirés au hasard dans le jeu compilé de Lettres). ModeleTFLite exécute ce fichier avec
+la même interface que le modèle Keras pour la prédiction (predict, predict_on_batch, input_shape) : il
+quantifie l'entrée et rend les probabilités en float32 (par pas de 1/256). L'interpréteur vient de ai_edge_litert ou tflite_runtime s'ils sont
+installés (sans TensorFlow), sinon de TensorFlow.
+
+Les modèles quantifiés ne servent que si on les demande (QUANTIFIE, variable NANOMADE_QUANTIFIE=1) : ils sont moins
+précis que les modèles float32, et le LSTM en int16x8 est plus lent. Chaque .tflite a à côté de lui un .json avec
+l'empreinte (sha1) du modèle Keras dont il vient ; modele_quantifie() refuse un .tflite dont le modèle Keras a été
+réentraîné depuis (ou sans .json), et l'appelant garde alors le modèle float32.
+
+    python quantification.py --ann ../ANN --lstm ../LSTM [--exemples 500] [--bits-lstm 8]
+écrit modele_lettres_int8.tflite et model_lstm_int8.tflite (et leurs .json) à côté des modèles Keras.
+"""
+import argparse
+import hashlib
+import json
+import os
+
+import numpy as np
+
+FICHIER_ANN = "modele_lettres_int8.tflite"
+FICHIER_LSTM = "model_lstm_int8.tflite"
+NB_EXEMPLES = 500  # Exemples de calibration
+BITS_LSTM = 16  # Activations du LSTM (les poids restent en int8)
+QUANTIFIE = os.environ.get("NANOMADE_QUANTIFIE", "0") == "1"  # Prototype et LSTM : modèles quantifiés si à jour
+
+
+def _interpreteur(chemin):
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+    except ImportError:
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+    return Interpreter(model_path=chemin)
+
+
+def empreinte(chemin):
+    """sha1 du fichier `chemin` (modèle Keras source d'un .tflite)."""
+    sha1 = hashlib.sha1()
+    with open(chemin, "rb") as f:
+        for bloc in iter(lambda: f.read(1 << 20), b""):
+            sha1.update(bloc)
+    return sha1.hexdigest()
+
+
+def a_jour(chemin, source):
+    """Vrai si le .tflite `chemin` existe et vient du modèle Keras `source` tel qu'il est maintenant."""
+    try:
+        with open(chemin + ".json", encoding="utf-8") as f:
+            meta = json.load(f)
+        return os.path.exists(chemin) and meta.get("sha1") == empreinte(source)
+    except (OSError, ValueError):
+        return False
+
+
+def quantifier(modele, representatif, chemin, bits_activations=8, source=None):
+    """Convertit `modele` en TFLite entier (poids int8, activations sur 8 ou 16 bits), calibré sur `representatif`.
+
+    `source` est le .keras de `modele` : son empreinte est écrite dans `chemin`.json (voir a_jour).
+    """
+    import tensorflow as tf
+
+    def exemples():
+        for x in representatif:
+            yield [np.asarray(x, dtype=np.float32)[None]]
+
+    # La boucle d'un LSTM ne se quantifie pas en int8 : il est déroulé (mêmes poids, une étape par pas de temps)
+    config = modele.get_config()
+    for couche in config["layers"]:
+        if couche["class_name"] in ("LSTM", "GRU", "SimpleRNN"):
+            couche["config"]["unroll"] = True
+    deroule = type(modele).from_config(config)
+    deroule.set_weights(modele.get_weights())
+    convertisseur = tf.lite.TFLiteConverter.from_keras_model(deroule)
+    convertisseur.optimizations = [tf.lite.Optimize.DEFAULT]
+    convertisseur.representative_dataset = exemples
+    if bits_activations == 16:
+        convertisseur.target_spec.supported_ops = [tf.lite.OpsSet.EXPERIMENTAL_TFLITE_BUILTINS_ACTIVATIONS_INT16_WEIGHTS_INT8]
+        convertisseur.inference_input_type = convertisseur.inference_output_type = tf.int16
+    else:
+        convertisseur.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        convertisseur.inference_input_type = convertisseur.inference_output_type = tf.int8
+    tflite = convertisseur.convert()
+    with open(chemin, "wb") as f:
+        f.write(tflite)
+    meta = {"source": os.path.basename(source) if source else None, "sha1": empreinte(source) if source else None,
+            "bits_activations": bits_activations}
+    with open(chemin + ".json", "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=1)
+    return chemin
+
+
+class ModeleTFLite:
+    """Modèle .tflite quantifié : entrée float32 quantifiée (int8 ou int16), probabilités rendues en float32."""
+
+    def __init__(self, chemin):
+        self.interpreteur = _interpreteur(chemin)
+        self.interpreteur.allocate_tensors()
+        self.entree = self.interpreteur.get_input_details()[0]
+        self.sortie = self.interpreteur.get_output_details()[0]
+        self.input_shape = (None, *(int(n) for n in self.entree["shape"][1:]))
+        self.taille_lot = 1
+
+    def _lot(self, taille):
+        # L'interpréteur est préparé pour une taille de lot : il est redimensionné quand elle change
+        if taille != self.taille_lot:
+            self.interpreteur.resize_tensor_input(self.entree["index"], [taille, *self.input_shape[1:]])
+            self.interpreteur.allocate_tensors()
+            self.entree = self.interpreteur.get_input_details()[0]
+            self.sortie = self.interpreteur.get_output_details()[0]
+            self.taille_lot = taille
+
+    def predict_on_batch(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        self._lot(len(X))
+        echelle, zero = self.entree["quantization"]
+        bornes = np.iinfo(self.entree["dtype"])
+        quantifie = np.clip(np.round(X / echelle + zero), bornes.min, bornes.max).astype(self.entree["dtype"])
+        self.interpreteur.set_tensor(self.entree["index"], quantifie)
+        self.interpreteur.invoke()
+        echelle, zero = self.sortie["quantization"]
+        return (self.interpreteur.get_tensor(self.sortie["index"]).astype(np.float32) - zero) * echelle
+
+    def predict(self, X, verbose=0):
+        return self.predict_on_batch(X)
+
+    @property
+    def version(self):
+        return "int8" if self.entree["dtype"] == np.int8 else "int16x8"
+
+
+def modele_quantifie(chemin, source):
+    """ModeleTFLite de `chemin` s'il est à jour pour `source`, sinon None (l'appelant garde le modèle float32)."""
+    if not os.path.exists(chemin):
+        return None
+    if not a_jour(chemin, source):
+        print(f"⚠️ {chemin} ne vient pas de {source} (réentraîné depuis ?) : modèle float32 utilisé. "
+              "Le recréer avec Commun/quantification.py.")
+        return None
+    return ModeleTFLite(chemin)
+
+
+def representatif_ann(dossier, lettres, nb_exemples=NB_EXEMPLES, graine=0):
+    """Vecteurs normalisés (comme à l'entraînement) tirés au hasard dans le jeu compilé des caractéristiques."""
+    import joblib
+    from jeu_donnees import compiler
+
+    extraction = joblib.load(os.path.join(dossier, "caracteristiques.pkl"))
+    scaler = joblib.load(os.path.join(dossier, "scaler.pkl"))
+    jeu = compiler(lettres, verbeux=False, extraction=extraction)
+    X = jeu.donnees.reshape(len(jeu), extraction.taille)
+    indices = np.sort(np.random.default_rng(graine).permutation(len(X))[:nb_exemples])
+    return scaler.transform(X[indices]).astype(np.float32)
+
+
+def representatif_lstm(lettres, longueur, nb_exemples=NB_EXEMPLES, graine=0):
+    """Séquences tirées au hasard dans le jeu compilé des fichiers nettoyés."""
+    from fenetres import fenetres_jeu
+    from jeu_donnees import compiler
+
+    jeu = compiler(lettres, verbeux=False)
+    fenetres = fenetres_jeu(jeu, longueur, {lettre: i for i, lettre in enumerate(sorted(set(jeu.lettres)))})
+    indices = np.sort(np.random.default_rng(graine).permutation(len(fenetres))[:nb_exemples])
+    return fenetres.lot(indices)[0]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Quantification int8 (TFLite) de l'ANN et du LSTM")
+    parser.add_argument("--ann", help="dossier de l'ANN (modele_lettres.keras, scaler.pkl, caracteristiques.pkl)")
+    parser.add_argument("--lstm", help="dossier du LSTM (model_lstm.keras)")
+    parser.add_argument("--lettres-ann", help="données de calibration de l'ANN (défaut : <ann>/Lettres)")
+    parser.add_argument("--lettres-lstm", help="données de calibration du LSTM (défaut : <lstm>/Lettres)")
+    parser.add_argument("--exemples", type=int, default=NB_EXEMPLES)
+    parser.add_argument("--bits-lstm", type=int, choices=(8, 16), default=BITS_LSTM, help="activations du LSTM")
+    args = parser.parse_args()
+
+    from tensorflow.keras.models import load_model
+    if args.ann:
+        representatif = representatif_ann(args.ann, args.lettres_ann or os.path.join(args.ann, "Lettres"), args.exemples)
+        source = os.path.join(args.ann, "modele_lettres.keras")
+        chemin = quantifier(load_model(source), representatif, os.path.join(args.ann, FICHIER_ANN), source=source)
+        print(f"✅ ANN quantifié : {chemin} ({os.path.getsize(chemin) / 1024:.0f} Ko)")
+    if args.lstm:
+        source = os.path.join(args.lstm, "model_lstm.keras")
+        modele = load_model(source)
+        representatif = representatif_lstm(args.lettres_lstm or os.path.join(args.lstm, "Lettres"),
+                                           modele.input_shape[1], args.exemples)
+        chemin = quantifier(modele, representatif, os.path.join(args.lstm, FICHIER_LSTM), args.bits_lstm, source)
+        print(f"✅ LSTM quantifié : {chemin} ({os.path.getsize(chemin) / 1024:.0f} Ko)")
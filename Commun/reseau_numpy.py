@@ -0,0 +1,113 @@
+"""Prédiction de l'ANN en NumPy seul, sans importer TensorFlow (prototype, visualiseur CSV, service).
+
+exporter() écrit tout ce qu'il faut pour prédire dans un seul fichier .npz (modele_lettres.npz, à côté de
+modele_lettres.keras) : poids et activation de chaque couche Dense, moyenne et écart type du StandardScaler,
+classes du LabelEncoder, et réglages de l'entrée (caractéristiques, ou taille_max des anciens modèles).
+ReseauNumpy relit ce fichier et refait le calcul du modèle Keras (les Dropout ne servent qu'à l'entraînement).
+
+    python reseau_numpy.py ../ANN      exporte modele_lettres.keras et ses .pkl en ../ANN/modele_lettres.npz
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+
+from caracteristiques import Caracteristiques
+
+FICHIER = "modele_lettres.npz"
+VERSION = 1
+
+
+def _relu(x):
+    return np.maximum(x, 0, out=x)
+
+
+def _softmax(x):
+    x = np.exp(x - x.max(axis=-1, keepdims=True))
+    return x / x.sum(axis=-1, keepdims=True)
+
+
+def _sigmoide(x):
+    return 1 / (1 + np.exp(-x))
+
+
+ACTIVATIONS = {"linear": lambda x: x, "relu": _relu, "softmax": _softmax, "sigmoid": _sigmoide, "tanh": np.tanh}
+
+
+def exporter(modele, scaler, classes, chemin, extraction=None, taille_max=None):
+    """Écrit le modèle Keras (couches Dense et Dropout), le scaler et les classes dans `chemin` (.npz)."""
+    tableaux, activations = {}, []
+    for couche in modele.layers:
+        config = couche.get_config()
+        if type(couche).__name__ in ("Dropout", "InputLayer"):
+            continue
+        if type(couche).__name__ != "Dense" or config["activation"] not in ACTIVATIONS:
+            raise ValueError(f"Couche {couche.name} ({type(couche).__name__}, {config.get('activation')}) non exportable")
+        poids, biais = couche.get_weights()
+        tableaux[f"poids_{len(activations)}"] = poids.astype(np.float32)
+        tableaux[f"biais_{len(activations)}"] = biais.astype(np.float32)
+        activations.append(config["activation"])
+
+    entree = {"extraction": extraction.parametres} if extraction is not None else {"taille_max": int(taille_max)}
+    meta = {"version": VERSION, "activations": activations, **entree}
+    np.savez(chemin, meta=np.array(json.dumps(meta)), classes=np.array([str(c) for c in classes]),
+             moyenne=np.asarray(scaler.mean_, dtype=np.float64), ecart=np.asarray(scaler.scale_, dtype=np.float64),
+             **tableaux)
+
+
+class ReseauNumpy:
+    """ANN exporté : normalisation en float64 (comme le StandardScaler), puis couches Dense en float32 (comme Keras)."""
+
+    def __init__(self, chemin):
+        with np.load(chemin, allow_pickle=False) as f:
+            meta = json.loads(str(f["meta"]))
+            self.classes = [str(c) for c in f["classes"]]
+            self.moyenne = f["moyenne"]
+            self.ecart = f["ecart"]
+            self.couches = [(f[f"poids_{i}"], f[f"biais_{i}"], ACTIVATIONS[a]) for i, a in enumerate(meta["activations"])]
+        if meta["version"] != VERSION:
+            raise ValueError(f"{chemin} : version {meta['version']} non prise en charge")
+        parametres = meta.get("extraction")
+        self.extraction = Caracteristiques(parametres["nb_pas"], parametres["nb_canaux"], parametres.get("geste", False)) \
+            if parametres else None
+        self.taille_max = meta.get("taille_max")
+
+    @property
+    def taille(self):
+        return len(self.moyenne)
+
+    def probabilites(self, vecteurs):
+        """Probabilités des classes (n x classes) pour des vecteurs non normalisés (n x taille)."""
+        x = ((np.asarray(vecteurs, dtype=np.float64) - self.moyenne) / self.ecart).astype(np.float32)
+        for poids, biais, activation in self.couches:
+            x = activation(x @ poids + biais)
+        return x
+
+    def predire(self, vecteur):
+        """(lettre, probabilités) pour un seul vecteur."""
+        probabilites = self.probabilites(vecteur[None])[0]
+        return self.classes[int(np.argmax(probabilites))], probabilites
+
+
+def exporter_dossier(dossier):
+    """Exporte le modèle Keras d'un dossier de l'ANN (modele_lettres.keras et ses .pkl) ; rend le chemin du .npz."""
+    import joblib
+    from tensorflow.keras.models import load_model
+
+    modele = load_model(os.path.join(dossier, "modele_lettres.keras"))
+    scaler = joblib.load(os.path.join(dossier, "scaler.pkl"))
+    classes = joblib.load(os.path.join(dossier, "label_encoder.pkl")).classes_
+    chemin = os.path.join(dossier, "caracteristiques.pkl")
+    extraction = joblib.load(chemin) if os.path.exists(chemin) else None
+    taille_max = joblib.load(os.path.join(dossier, "taille_max.pkl")) if extraction is None else None
+    sortie = os.path.join(dossier, FICHIER)
+    exporter(modele, scaler, classes, sortie, extraction, taille_max)
+    return sortie
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exporte l'ANN Keras en .npz pour la prédiction sans TensorFlow")
+    parser.add_argument("dossier", help="dossier de modele_lettres.keras, scaler.pkl, label_encoder.pkl...")
+    args = parser.parse_args()
+    print(f"✅ Modèle exporté : {exporter_dossier(args.dossier)}")
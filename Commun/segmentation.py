@@ -0,0 +1,222 @@
+"""Découpage automatique des gestes dans un flux continu de trames (enregistrement continu).
+
+Un geste commence quand l'écart à la ligne de base calibrée dépasse le seuil haut sur au moins un canal
+actif, et se termine après `trames_calmes` trames calmes consécutives (hystérésis : une trame est calme
+sous le seuil bas, pas dès qu'elle repasse sous le seuil haut). Après un appui fort, le capteur garde
+un décalage de plusieurs dizaines d'unités pendant des secondes : une trame qui varie de moins de
+`seuil_stable` en 100 ms est donc aussi calme, et la ligne de base est recalée sur la fin du geste.
+Les écarts sont calculés pour tout le bloc de trames d'un coup ; seules les transitions sont cherchées
+trame par trame.
+
+Avec presence=True, une trame n'est calme que si aucun indicateur de présence (colonnes M_C/U_C) n'est
+levé sur les canaux actifs : le doigt doit avoir quitté le capteur.
+
+Chaque geste est rendu avec une marge avant (trames de repos qui le précèdent) et une marge après
+(prise parmi les trames calmes qui le terminent). Pendant le repos, la ligne de base suit lentement
+la dérive du capteur.
+"""
+import numpy as np
+
+from calibration import NB_TRAMES_BASE
+from trames import canaux_actifs
+
+SEUIL_HAUT = 30  # Écart à la ligne de base (unités ADC) qui démarre un geste (bruit ~3)
+SEUIL_BAS = 15  # Écart sous lequel une trame est calme
+SEUIL_STABLE = 10  # Variation sur DECALAGE trames sous laquelle une trame est calme (repos : ~6 au plus)
+DECALAGE = 5  # 100 ms à 50 trames/s
+TRAMES_CALMES = 25  # Trames calmes consécutives qui terminent un geste (0,5 s)
+MARGE_AVANT = 10  # Trames de repos gardées avant le geste (200 ms à 50 trames/s)
+MARGE_APRES = 10
+DUREE_MIN = 10  # Un geste plus court est un parasite
+DUREE_MAX = 500  # Au-delà (10 s), le geste est coupé
+ADAPTATION = 0.01  # Poids de chaque trame de repos dans le suivi de la ligne de base
+
+
+def series_calmes(calmes, deja=0):
+    """Nombre de trames calmes consécutives se terminant à chaque indice (`deja` trames calmes avant le bloc)."""
+    indices = np.arange(len(calmes))
+    dernier_agite = np.maximum.accumulate(np.where(calmes, -1, indices)) if len(calmes) else indices
+    series = indices - dernier_agite
+    return np.where(dernier_agite < 0, series + deja, series)
+
+
+def _nb_trames(morceaux):
+    return sum(len(trames) for _, trames in morceaux)
+
+
+def _morceau(timestamp, trames, debut, fin):
+    """Morceau (horodatage, trames[debut:fin]) ; un tableau d'horodatages (un par trame) est découpé avec les trames."""
+    return (timestamp[debut:fin] if isinstance(timestamp, np.ndarray) else timestamp), trames[debut:fin]
+
+
+def _garder_fin(morceaux, n):
+    """Garde les `n` dernières trames d'une liste de morceaux (horodatage, trames)."""
+    garde = []
+    for t, trames in reversed(morceaux):
+        if n <= 0:
+            break
+        garde.append(_morceau(t, trames, max(len(trames) - n, 0), len(trames)))
+        n -= len(garde[-1][1])
+    return garde[::-1]
+
+
+def _retirer_fin(morceaux, n):
+    """Retire les `n` dernières trames d'une liste de morceaux (le début, marge avant comprise, est gardé)."""
+    if n <= 0:
+        return morceaux
+    garde, reste = [], _nb_trames(morceaux) - n
+    for t, trames in morceaux:
+        if reste <= 0:
+            break
+        garde.append(_morceau(t, trames, 0, min(len(trames), reste)))
+        reste -= len(garde[-1][1])
+    return garde
+
+
+class SegmenteurGestes:
+    """Rend les gestes complets d'un flux de trames : liste de morceaux (horodatage, trames) avec marges."""
+
+    def __init__(self, ligne_base=None, seuil_haut=SEUIL_HAUT, seuil_bas=SEUIL_BAS, seuil_stable=SEUIL_STABLE,
+                 trames_calmes=TRAMES_CALMES, marge_avant=MARGE_AVANT, marge_apres=MARGE_APRES,
+                 duree_min=DUREE_MIN, duree_max=DUREE_MAX, adaptation=ADAPTATION, nb_base=NB_TRAMES_BASE,
+                 presence=False):
+        self.seuil_haut = seuil_haut
+        self.seuil_bas = seuil_bas
+        self.seuil_stable = seuil_stable
+        self.trames_calmes = trames_calmes
+        self.marge_avant = marge_avant
+        self.marge_apres = min(marge_apres, trames_calmes)  # La marge après est prise dans les trames calmes
+        self.duree_min = duree_min
+        self.duree_max = duree_max
+        self.adaptation = adaptation
+        self.presence = presence
+        self.nb_base = nb_base
+        self.ligne_base = None
+        self.base = []
+        if ligne_base is not None:
+            self.fixer_base(ligne_base)
+        self.avant = []  # Trames de repos récentes (marge avant)
+        self.historique = None  # DECALAGE dernières valeurs analogiques, pour la variation en début de bloc
+        self.positions = []  # Indice (dans le dernier bloc) de la trame qui a terminé chaque geste rendu
+        self.geste = None  # Morceaux du geste en cours
+        self.calmes = 0
+        self.marge = 0
+        self.gestes = 0
+        self.rejetes = 0
+
+    def fixer_base(self, ligne_base):
+        self.ligne_base = np.asarray(ligne_base, dtype=np.float64)
+        self.actifs = canaux_actifs(self.ligne_base)
+
+    def _ecarts(self, trames):
+        """Plus grand écart à la ligne de base sur les canaux actifs, pour chaque trame du bloc."""
+        if not self.actifs.any():
+            return np.zeros(len(trames))
+        return np.abs(trames["analogique"][:, self.actifs] - self.ligne_base[self.actifs]).max(axis=1)
+
+    def _variations(self, trames):
+        """Plus grande variation sur DECALAGE trames (canaux actifs), pour chaque trame du bloc."""
+        analogique = trames["analogique"][:, self.actifs].astype(np.float64)
+        precedentes = analogique if self.historique is None else np.concatenate([self.historique, analogique])
+        self.historique = precedentes[-DECALAGE:]
+        decalees = np.concatenate([np.full((DECALAGE, analogique.shape[1]), np.nan), precedentes])
+        decalees = decalees[len(decalees) - DECALAGE - len(analogique):len(decalees) - DECALAGE]
+        variations = np.abs(analogique - decalees).max(axis=1, initial=0.0)
+        return np.where(np.isnan(variations), np.inf, variations)
+
+    def _adapter(self, trames, ecarts):
+        calmes = trames["analogique"][ecarts < self.seuil_bas]
+        if self.adaptation and len(calmes):
+            poids = 1 - (1 - self.adaptation) ** len(calmes)
+            self.ligne_base += poids * (calmes.mean(axis=0) - self.ligne_base)
+
+    def ajouter(self, trames, timestamp):
+        """Ajoute un bloc de trames (copié) ; renvoie la liste des gestes terminés dans ce bloc.
+
+        timestamp : horodatage du bloc, ou tableau d'un horodatage par trame (horodatage.etaler), gardé trame par
+        trame dans les morceaux des gestes."""
+        trames = trames.copy()
+        self.positions = []
+        decalage = 0  # Trames du bloc consommées par la mesure de la ligne de base
+        if self.ligne_base is None:
+            # Sans ligne de base calibrée, elle est mesurée sur les premières trames
+            manque = self.nb_base - len(self.base)
+            self.base.extend(trames["analogique"][:manque])
+            if len(self.base) < self.nb_base:
+                return []
+            self.fixer_base(np.mean(self.base, axis=0))
+            (timestamp, trames), decalage = _morceau(timestamp, trames, manque, len(trames)), manque
+
+        gestes = []
+        ecarts = self._ecarts(trames)
+        variations = self._variations(trames)
+        i = 0
+        while i < len(trames):
+            if self.geste is None:
+                departs = np.flatnonzero(ecarts[i:] > self.seuil_haut)
+                fin_repos = i + departs[0] if len(departs) else len(trames)
+                self._adapter(trames[i:fin_repos], ecarts[i:fin_repos])
+                self.avant = _garder_fin(self.avant + [_morceau(timestamp, trames, i, fin_repos)], self.marge_avant)
+                if not len(departs):
+                    break
+                self.geste = self.avant
+                self.marge = _nb_trames(self.avant)
+                self.avant = []
+                self.calmes = 0
+                i = fin_repos
+            else:
+                calmes = (ecarts[i:] < self.seuil_bas) | (variations[i:] < self.seuil_stable)
+                if self.presence:
+                    calmes &= ~trames["presence"][i:, self.actifs].any(axis=1)
+                series = series_calmes(calmes, self.calmes)
+                fins = np.flatnonzero(series >= self.trames_calmes)
+                j = i + fins[0] + 1 if len(fins) else len(trames)
+                self.geste.append(_morceau(timestamp, trames, i, j))
+                self.calmes = int(series[j - i - 1])
+                if len(fins) or _nb_trames(self.geste) >= self.duree_max:
+                    geste = self._clore()
+                    if geste is not None:
+                        gestes.append(geste)
+                        self.positions.append(j + decalage)
+                    ecarts[j:] = self._ecarts(trames[j:])  # Ligne de base recalée
+                i = j
+        return gestes
+
+    def _clore(self):
+        """Termine le geste en cours ; renvoie ses morceaux (None si trop court)."""
+        morceaux, calmes = self.geste, self.calmes
+        self.geste = None
+        self.calmes = 0
+        # Les trames calmes de la fin servent de marge après, puis de marge avant pour le geste suivant
+        self.avant = _garder_fin(morceaux, min(calmes, self.marge_avant))
+        fin = [trames for _, trames in _garder_fin(morceaux, min(calmes, NB_TRAMES_BASE))]
+        if sum(len(trames) for trames in fin):
+            self.ligne_base = np.concatenate(fin)["analogique"].mean(axis=0)  # Décalage laissé par le geste
+        morceaux = _retirer_fin(morceaux, max(calmes - self.marge_apres, 0))
+        duree = _nb_trames(morceaux) - self.marge - min(calmes, self.marge_apres)
+        if duree < self.duree_min:
+            self.rejetes += 1
+            return None
+        self.gestes += 1
+        return morceaux
+
+
+def bornes_geste(analogique, presence=None, **options):
+    """Début et fin (exclue) du tracé d'un enregistrement : du début du premier geste détecté à la fin du dernier,
+    marges comprises (la ligne de base est mesurée sur les premières trames). None si aucun geste n'est détecté."""
+    trames = np.zeros(len(analogique), dtype=[("analogique", "<f8", (analogique.shape[1],)),
+                                             ("presence", "u1", (analogique.shape[1],)), ("indice", "<i8")])
+    trames["analogique"] = analogique
+    if presence is not None:
+        trames["presence"] = presence
+    trames["indice"] = np.arange(len(trames))
+    segmenteur = SegmenteurGestes(**options)
+    gestes = segmenteur.ajouter(trames, 0)
+    if segmenteur.geste is not None:
+        geste = segmenteur._clore()  # Geste encore en cours à la fin de l'enregistrement
+        if geste is not None:
+            gestes.append(geste)
+    indices = [trames["indice"] for geste in gestes for _, trames in geste if len(trames)]
+    if not indices:
+        return None
+    return int(indices[0][0]), int(indices[-1][-1]) + 1
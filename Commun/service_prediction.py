@@ -0,0 +1,345 @@
+"""Service de prédiction local : les modèles ANN et LSTM sont chargés une seule fois et restent en mémoire.
+
+Le service écoute en HTTP sur la machine locale (127.0.0.1:8765 par défaut, variable NANOMADE_SERVICE) :
+
+    POST /predire/ann   {"fichier": "chemin.csv"}  ou  {"trames": [[16 valeurs analogiques, 16 présences], ...],
+                                                         "calibration": [16 valeurs]}
+    POST /predire/lstm  {"fichier": "chemin.csv"}  ou  {"trames": [[8 valeurs normalisées], ...]}
+                        (un fichier brut est nettoyé comme par LSTM/nettoyage_csv.py)
+    GET  /etat          modèles chargés, nombre de demandes et de lots, latences (p50, p95, p99)
+
+Les demandes qui arrivent en même temps sont regroupées (au plus TAILLE_LOT demandes, en attendant au plus
+DELAI_LOT après la première) et passent dans un seul appel du modèle. Les fonctions predire() et
+service_disponible() servent de client (menus de l'ANN et du LSTM, visualiseur CSV, prototype) ; si le service
+ne répond plus au milieu d'une demande, predire() lève ServiceIndisponible et l'appelant prédit en local.
+
+    python service_prediction.py --ann ../ANN --lstm ../LSTM [--adresse 127.0.0.1:8765]
+"""
+import argparse
+import http.client
+import json
+import os
+import queue
+import socket
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from acquisition import NB_TRAMES_SESSION
+from caracteristiques import donnees_lstm
+from chargement import NB_COLONNES, Enregistrement, charger
+from enregistreur import ENTETE_CSV
+from reseau_numpy import FICHIER as FICHIER_NUMPY, ReseauNumpy
+from trames import NB_CANAUX, NB_VALEURS
+
+ADRESSE = os.environ.get("NANOMADE_SERVICE", "127.0.0.1:8765")
+TAILLE_LOT = 64
+DELAI_LOT = 0.005  # s
+SEUIL_CONFIANCE = 0.98  # Séquences du LSTM gardées pour la moyenne
+NB_LATENCES = 10000  # Latences gardées pour les percentiles
+
+
+def enregistrement_demande(demande):
+    """Enregistrement d'une demande : fichier à lire, ou trames brutes (32 colonnes) ou nettoyées envoyées telles quelles."""
+    if "fichier" in demande:
+        return charger(demande["fichier"])
+    trames = np.asarray(demande["trames"], dtype=np.float64)
+    if trames.ndim != 2:
+        raise ValueError("trames : tableau à deux dimensions attendu (trames x colonnes)")
+    if trames.shape[1] == NB_VALEURS:
+        calibration = demande.get("calibration")
+        return Enregistrement(None, ENTETE_CSV[1:NB_COLONNES], trames[:, :NB_CANAUX], trames[:, NB_CANAUX:],
+                              timestamps=np.zeros(len(trames), dtype=np.int64),
+                              calibration=None if calibration is None else np.asarray(calibration, dtype=np.int64))
+    return Enregistrement(None, [f"C_{i + 1}" for i in range(trames.shape[1])], trames)
+
+
+class FileLots:
+    """Regroupe les demandes concurrentes en lots, traités un par un par un thread (predire_lot : liste -> liste)."""
+
+    def __init__(self, predire_lot, taille=TAILLE_LOT, delai=DELAI_LOT):
+        self.predire_lot = predire_lot
+        self.taille = taille
+        self.delai = delai
+        self.file = queue.Queue()
+        self.nb_lots = 0
+        self.nb_demandes = 0
+        threading.Thread(target=self._boucle, daemon=True).start()
+
+    def soumettre(self, entree):
+        """Attend le résultat de `entree` (l'exception du lot est relancée dans le thread appelant)."""
+        demande = {"entree": entree, "fait": threading.Event()}
+        self.file.put(demande)
+        demande["fait"].wait()
+        if "erreur" in demande:
+            raise demande["erreur"]
+        return demande["resultat"]
+
+    def _boucle(self):
+        while True:
+            lot = [self.file.get()]
+            limite = time.perf_counter() + self.delai
+            while len(lot) < self.taille:
+                try:
+                    lot.append(self.file.get(timeout=max(limite - time.perf_counter(), 0)))
+                except queue.Empty:
+                    break
+            try:
+                for demande, resultat in zip(lot, self.predire_lot([d["entree"] for d in lot])):
+                    demande["resultat"] = resultat
+            except Exception as e:
+                for demande in lot:
+                    demande["erreur"] = e
+            self.nb_lots += 1
+            self.nb_demandes += len(lot)
+            for demande in lot:
+                demande["fait"].set()
+
+
+class EntreeANN:
+    """Entrée de l'ANN pour un enregistrement : caractéristiques, ou fichier à plat pour les anciens modèles."""
+
+    def __init__(self, extraction=None, taille_max=None):
+        self.extraction = extraction
+        self.taille_max = taille_max
+
+    def __call__(self, enregistrement):
+        if self.extraction is not None:
+            return self.extraction.vecteur(enregistrement)
+        # Modèle entraîné sur le fichier à plat, avec des enregistrements de NB_TRAMES_SESSION trames : un geste
+        # arrêté plus tôt (prototype) est complété en répétant sa dernière trame plutôt que par des zéros (ANN/Lettres
+        # rejoué avec l'arrêt en fin de geste : 91,9 % de bonnes réponses, 44,4 % avec des zéros, 92,9 % en entier)
+        matrice = enregistrement.vecteur_ann().reshape(-1, NB_COLONNES)
+        manque = NB_TRAMES_SESSION - len(enregistrement)
+        if manque > 0 and len(enregistrement):
+            matrice = np.vstack([matrice, np.repeat(matrice[enregistrement.positions[-1]][None], manque, axis=0)])
+        vecteur = matrice.ravel()
+        return np.pad(vecteur, (0, max(0, self.taille_max - len(vecteur))))[:self.taille_max]
+
+
+class EntreeLSTM:
+    """Entrée du LSTM pour un enregistrement : toutes ses séquences (vues sur les trames nettoyées)."""
+
+    def __init__(self, longueur):
+        self.longueur = longueur
+
+    def __call__(self, enregistrement):
+        data = donnees_lstm(enregistrement)
+        if len(data) < self.longueur:
+            data = np.vstack([data, np.zeros((self.longueur - len(data), data.shape[1]), np.float32)])
+        return np.lib.stride_tricks.sliding_window_view(data, self.longueur, axis=0).transpose(0, 2, 1)
+
+
+class ModeleANN:
+    """ANN : modele_lettres.npz (NumPy, sans TensorFlow) s'il existe, sinon modele_lettres.keras, scaler.pkl,
+    label_encoder.pkl et caracteristiques.pkl ou taille_max.pkl."""
+
+    fichiers = (FICHIER_NUMPY, "modele_lettres.keras", "scaler.pkl", "label_encoder.pkl", "caracteristiques.pkl",
+                "taille_max.pkl")
+
+    def __init__(self, dossier):
+        if os.path.exists(os.path.join(dossier, FICHIER_NUMPY)):
+            reseau = ReseauNumpy(os.path.join(dossier, FICHIER_NUMPY))
+            self.classes, self.probabilites = reseau.classes, reseau.probabilites
+            self.entree = EntreeANN(reseau.extraction, reseau.taille_max)
+            self.forme_entree = (reseau.taille,)
+            return
+        import joblib
+        from tensorflow.keras.models import load_model
+        modele = load_model(os.path.join(dossier, "modele_lettres.keras"))
+        scaler = joblib.load(os.path.join(dossier, "scaler.pkl"))
+        self.probabilites = lambda vecteurs: modele.predict_on_batch(scaler.transform(vecteurs))
+        self.classes = [str(c) for c in joblib.load(os.path.join(dossier, "label_encoder.pkl")).classes_]
+        chemin = os.path.join(dossier, "caracteristiques.pkl")
+        extraction = joblib.load(chemin) if os.path.exists(chemin) else None
+        taille_max = joblib.load(os.path.join(dossier, "taille_max.pkl")) if extraction is None else None
+        self.entree = EntreeANN(extraction, taille_max)
+        self.forme_entree = modele.input_shape[1:]
+
+    @staticmethod
+    def disponible(dossier):
+        return any(os.path.exists(os.path.join(dossier, f)) for f in (FICHIER_NUMPY, "modele_lettres.keras"))
+
+    def predire_lot(self, vecteurs):
+        probabilites = self.probabilites(np.stack(vecteurs))
+        return [{"lettre": self.classes[int(np.argmax(p))], "classes": self.classes, "probabilites": p.tolist()}
+                for p in np.asarray(probabilites)]
+
+
+class ModeleLSTM:
+    """LSTM (model_lstm.keras, lettres.pkl) : moyenne des séquences prédites avec une confiance d'au moins 98 %."""
+
+    fichiers = ("model_lstm.keras", "lettres.pkl")
+
+    def __init__(self, dossier):
+        import joblib
+        from tensorflow.keras.models import load_model
+        self.modele = load_model(os.path.join(dossier, "model_lstm.keras"))
+        classe_to_lettre = joblib.load(os.path.join(dossier, "lettres.pkl"))
+        self.classes = [str(classe_to_lettre[i]) for i in range(len(classe_to_lettre))]
+        self.entree = EntreeLSTM(self.modele.input_shape[1])
+        self.forme_entree = (1, *self.modele.input_shape[1:])  # Une séquence
+
+    @staticmethod
+    def disponible(dossier):
+        return os.path.exists(os.path.join(dossier, "model_lstm.keras"))
+
+    def predire_lot(self, sequences):
+        # Toutes les séquences du lot en un seul appel, puis réparties entre les demandes
+        probabilites = np.asarray(self.modele.predict_on_batch(np.concatenate(sequences).astype(np.float32)))
+        resultats = []
+        for p in np.split(probabilites, np.cumsum([len(s) for s in sequences])[:-1]):
+            confiantes = p[p.max(axis=1) >= SEUIL_CONFIANCE]
+            moyenne = confiantes.mean(axis=0) if len(confiantes) else np.zeros(len(self.classes))
+            lettre = self.classes[int(np.argmax(moyenne))] if len(confiantes) else "Inconnue"
+            resultats.append({"lettre": lettre, "classes": self.classes, "probabilites": moyenne.tolist(),
+                              "sequences": len(p), "confiantes": len(confiantes)})
+        return resultats
+
+
+class Service:
+    """Modèles chargés, leurs files de lots et les statistiques des demandes."""
+
+    def __init__(self, modeles, taille=TAILLE_LOT, delai=DELAI_LOT):
+        self.modeles = modeles
+        self.files = {nom: FileLots(modele.predire_lot, taille, delai) for nom, modele in modeles.items()}
+        self.latences = {nom: [] for nom in modeles}
+        self.debut = time.perf_counter()
+
+    def chauffer(self):
+        """Premier appel de chaque modèle (construction du graphe TensorFlow) avant les vraies demandes."""
+        for nom, modele in self.modeles.items():
+            debut = time.perf_counter()
+            modele.predire_lot([np.zeros(modele.forme_entree, dtype=np.float32)])
+            print(f"🔥 {nom.upper()} prêt ({(time.perf_counter() - debut) * 1000:.0f} ms)")
+
+    def predire(self, nom, demande):
+        debut = time.perf_counter()
+        resultat = self.files[nom].soumettre(self.modeles[nom].entree(enregistrement_demande(demande)))
+        latences = self.latences[nom]
+        latences.append(time.perf_counter() - debut)
+        del latences[:-NB_LATENCES]
+        return resultat
+
+    def etat(self):
+        etat = {"duree_s": time.perf_counter() - self.debut, "modeles": {}}
+        for nom, file in self.files.items():
+            latences = np.array(self.latences[nom]) * 1000
+            etat["modeles"][nom] = {
+                "demandes": file.nb_demandes, "lots": file.nb_lots,
+                "demandes_par_lot": file.nb_demandes / max(file.nb_lots, 1),
+                **{f"p{q}_ms": float(np.percentile(latences, q)) if len(latences) else None for q in (50, 95, 99)},
+            }
+        return etat
+
+
+def _gestionnaire(service):
+    class Gestionnaire(BaseHTTPRequestHandler):
+        def _repondre(self, code, contenu):
+            corps = json.dumps(contenu, ensure_ascii=False).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(corps)))
+            self.end_headers()
+            self.wfile.write(corps)
+
+        def do_GET(self):
+            if self.path == "/etat":
+                self._repondre(200, service.etat())
+            else:
+                self._repondre(404, {"erreur": f"{self.path} inconnu"})
+
+        def do_POST(self):
+            nom = self.path[len("/predire/"):]
+            if not self.path.startswith("/predire/") or nom not in service.modeles:
+                self._repondre(404, {"erreur": f"{self.path} inconnu (modèles chargés : {', '.join(service.modeles)})"})
+                return
+            try:
+                demande = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                self._repondre(200, service.predire(nom, demande))
+            except Exception as e:
+                self._repondre(400, {"erreur": f"{type(e).__name__} : {e}"})
+
+        def log_message(self, format, *args):
+            pass  # Pas de ligne par demande
+
+    return Gestionnaire
+
+
+class ServeurPrediction(ThreadingHTTPServer):
+    """Serveur HTTP du service : la file d'attente du socket (5 connexions par défaut) doit accepter toute une rafale
+    de clients, sinon les connexions en trop sont refusées avant de pouvoir former un lot."""
+
+    daemon_threads = True
+
+    def __init__(self, adresse, gestionnaire, taille_lot=TAILLE_LOT):
+        self.request_queue_size = max(socket.SOMAXCONN, taille_lot)
+        super().__init__(adresse, gestionnaire)
+
+
+class ServiceIndisponible(ConnectionError):
+    """Le service ne répond plus (arrêté, connexion refusée ou coupée) : prédire en local."""
+
+
+def lancer(service, adresse=ADRESSE, taille_lot=TAILLE_LOT):
+    hote, port = adresse.rsplit(":", 1)
+    serveur = ServeurPrediction((hote, int(port)), _gestionnaire(service), taille_lot)
+    print(f"🚀 Service de prédiction sur http://{hote}:{port} ({', '.join(service.modeles) or 'aucun modèle'})")
+    serveur.serve_forever()
+
+
+def predire(modele, fichier=None, trames=None, calibration=None, adresse=ADRESSE, delai=30):
+    """Client : prédiction du service pour un fichier ou des trames ({"lettre", "classes", "probabilites", ...}).
+
+    ValueError si le service refuse la demande, ServiceIndisponible s'il ne répond pas."""
+    demande = {"fichier": os.path.abspath(fichier)} if fichier is not None else {"trames": np.asarray(trames).tolist()}
+    if calibration is not None:
+        demande["calibration"] = np.asarray(calibration).tolist()
+    requete = urllib.request.Request(f"http://{adresse}/predire/{modele}", data=json.dumps(demande).encode("utf-8"),
+                                     headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(requete, timeout=delai) as reponse:
+            return json.loads(reponse.read())
+    except urllib.error.HTTPError as e:
+        raise ValueError(json.loads(e.read()).get("erreur", str(e))) from None
+    except (OSError, http.client.HTTPException) as e:
+        raise ServiceIndisponible(f"Service {adresse} indisponible : {e}") from e
+
+
+def etat_service(adresse=ADRESSE, delai=0.5):
+    """Client : état du service (voir GET /etat)."""
+    with urllib.request.urlopen(f"http://{adresse}/etat", timeout=delai) as reponse:
+        return json.loads(reponse.read())
+
+
+def service_disponible(modele=None, adresse=ADRESSE, delai=0.5):
+    """Vrai si le service répond (et a chargé `modele`, s'il est donné)."""
+    try:
+        return modele is None or modele in etat_service(adresse, delai)["modeles"]
+    except (OSError, ValueError):
+        return False
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Service de prédiction local (ANN et LSTM chargés une seule fois)")
+    parser.add_argument("--ann", help="dossier des fichiers de l'ANN (modele_lettres.npz, ou .keras et .pkl)")
+    parser.add_argument("--lstm", help="dossier des fichiers du LSTM (model_lstm.keras, lettres.pkl)")
+    parser.add_argument("--adresse", default=ADRESSE)
+    parser.add_argument("--taille-lot", type=int, default=TAILLE_LOT)
+    parser.add_argument("--delai-lot", type=float, default=DELAI_LOT * 1000, help="attente max d'un lot (ms)")
+    args = parser.parse_args()
+
+    modeles = {}
+    for nom, classe, dossier in (("ann", ModeleANN, args.ann), ("lstm", ModeleLSTM, args.lstm)):
+        if dossier:
+            try:
+                modeles[nom] = classe(dossier)
+            except (OSError, ValueError) as e:
+                print(f"⚠️ {nom.upper()} non chargé : {e}")
+    service = Service(modeles, args.taille_lot, args.delai_lot / 1000)
+    service.chauffer()
+    lancer(service, args.adresse, args.taille_lot)
@@ -0,0 +1,525 @@
+"""Capteur nanomade simulé : rejoue des enregistrements (CSV ou .nmd) comme le ferait le kit branché en USB.
+
+Le simulateur répond aux commandes du firmware :
+    - K        : renvoie la ligne de calibration (16 valeurs, 1000 = capteur absent) de l'enregistrement ;
+    - GA..GG   : "ADC GAIN VALUE = n" ;
+    - CA..CG   : "CAPA THRESHOLD = n" ;
+    - R        : démarre l'envoi des trames ;
+    - S        : arrête l'envoi des trames.
+Chaque commande R passe à l'enregistrement suivant de la liste (une session = un enregistrement),
+et l'envoi reprend au début de la liste une fois tous les enregistrements rejoués (boucle=True).
+Comme le capteur resté branché, le simulateur garde sa ligne de base d'une session à l'autre : sans nouvelle
+calibration (K), l'enregistrement suivant est recentré sur la ligne de base de l'enregistrement calibré (ses
+canaux actifs sont décalés d'autant), et une calibration en cache (voir calibration.CacheCalibration) peut être
+réutilisée. Après K, l'enregistrement calibré est rejoué tel quel.
+
+Vitesse de lecture :
+    - vitesse=1.0 : cadence d'origine (d'après les horodatages de l'enregistrement) ;
+    - vitesse=N   : N fois plus vite ;
+    - vitesse=None : au plus vite, limité seulement par la place dans le tampon de réception ;
+    - frequence=F : cadence fixe de F trames/s (remplace les horodatages).
+En cadence imposée, le tampon de réception a une taille limitée (comme celui du système) : si le lecteur
+ne suit pas, les octets en trop sont perdus et les lignes arrivent tronquées, comme avec le vrai port.
+
+CapteurSimule s'utilise à la place de serial.Serial dans le même processus ; CapteurPty expose le même
+capteur sur un pseudo-terminal (Linux, macOS) pour les programmes qui ouvrent eux-mêmes le port.
+ouvrir_port("simulateur://chemin?vitesse=2") renvoie un capteur simulé, tout autre nom ouvre le vrai port :
+dans l'interface, choisir le port "simulateur://" ; pour le prototype, Outils/prise_de_données_auto.py et
+lstm_continu.py, définir NANOMADE_PORT (par exemple NANOMADE_PORT="simulateur://ANN/Lettres/A?vitesse=2").
+
+    python simulateur.py ../Outils/Test --vitesse 1
+"""
+import argparse
+import copy
+import csv
+import glob
+import os
+import threading
+import time
+
+import numpy as np
+
+from calibration import NB_TRAMES_BASE
+from format_binaire import EXTENSION as EXTENSION_BINAIRE, lire_horodatages, lire_session
+from trames import type_ligne, canaux_actifs, CALIBRATION, TRAME, NB_CANAUX, VALEUR_INACTIVE, VALEUR_SATUREE
+
+PREFIXE = "simulateur://"
+RACINE = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+ENREGISTREMENTS_DEFAUT = os.path.join(RACINE, "Outils", "Test")
+
+# Réponses du firmware aux commandes de gain et de seuil (GD -> 8 et CC -> 150 dans tous les enregistrements)
+GAINS = {f"G{lettre}": 2 ** i for i, lettre in enumerate("ABCDEFG")}
+SEUILS = {f"C{lettre}": 50 * (i + 1) for i, lettre in enumerate("ABCDEFG")}
+
+FIN_LIGNE = b"\r\n"
+
+
+def lister_enregistrements(chemins):
+    """Liste (triée) des enregistrements CSV et .nmd d'un fichier ou d'un dossier (récursif)."""
+    if isinstance(chemins, str):
+        chemins = [chemins]
+    fichiers = []
+    for chemin in chemins:
+        if not os.path.exists(chemin) and os.path.exists(os.path.join(RACINE, chemin)):
+            chemin = os.path.join(RACINE, chemin)
+        if os.path.isdir(chemin):
+            for extension in ("csv", EXTENSION_BINAIRE.lstrip(".")):
+                fichiers += glob.glob(os.path.join(chemin, "**", f"*.{extension}"), recursive=True)
+        elif os.path.exists(chemin):
+            fichiers.append(chemin)
+    return sorted(fichiers)
+
+
+class Enregistrement:
+    """Trames d'un enregistrement prêtes à être réémises : lignes encodées et instants relatifs (s)."""
+
+    def __init__(self, filename):
+        self.filename = filename
+        if filename.endswith(EXTENSION_BINAIRE):
+            self._charger_binaire(filename)
+        else:
+            self._charger_csv(filename)
+        if self.calibration is None and self.lignes:
+            self.calibration = self._calibration_par_defaut()
+
+    def __len__(self):
+        return len(self.lignes)
+
+    def _charger_csv(self, filename):
+        self.calibration = None
+        horodatages, self.lignes = [], []
+        with open(filename, newline="", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            for row in reader:
+                if not row:
+                    continue
+                texte = " ".join(c for c in row[1:] if c)
+                nature = type_ligne(texte)
+                if nature == TRAME:
+                    horodatages.append(row[0])
+                    self.lignes.append(texte.encode() + FIN_LIGNE)
+                elif nature == CALIBRATION and self.calibration is None:
+                    self.calibration = texte
+        # Les fichiers nettoyés (valeurs normalisées) n'ont pas de trames brutes : ils sont ignorés
+        self.instants = self._instants(lire_horodatages(horodatages)) if horodatages else np.zeros(0)
+
+    def _charger_binaire(self, filename):
+        session = lire_session(filename, mmap=False)
+        series = session.series
+        self.calibration = series[0]["calibration"] if series else None
+        valeurs = np.hstack([session.analogique, session.presence]).tolist()
+        self.lignes = [" ".join(map(str, ligne)).encode() + FIN_LIGNE for ligne in valeurs]
+        self.instants = self._instants(session.horodatages_ns)
+
+    @staticmethod
+    def _instants(horodatages_ns):
+        horodatages_ns = np.asarray(horodatages_ns, dtype=np.int64)
+        return (horodatages_ns - horodatages_ns[0]) / 1e9
+
+    def _valeurs(self, nombre=None):
+        return np.array([[int(v) for v in ligne.split()] for ligne in self.lignes[:nombre]], dtype=np.int64)
+
+    def ligne_de_base(self):
+        """Moyenne des premières trames (canaux analogiques), comme la mesure faite après une calibration."""
+        return self._valeurs(NB_TRAMES_BASE)[:, :NB_CANAUX].mean(axis=0)
+
+    def recentrer(self, base):
+        """Copie dont les canaux actifs partent de la ligne de base `base` (capteur non recalibré entre deux sessions)."""
+        valeurs = self._valeurs()
+        propre = self.ligne_de_base()
+        actifs = canaux_actifs(np.round(propre)) & canaux_actifs(np.round(base))
+        decalage = np.where(actifs, np.round(base - propre), 0).astype(np.int64)
+        valeurs[:, :NB_CANAUX] = np.where(actifs, np.clip(valeurs[:, :NB_CANAUX] + decalage, 0, VALEUR_SATUREE - 1),
+                                         valeurs[:, :NB_CANAUX])
+        copie = copy.copy(self)
+        copie.lignes = [" ".join(map(str, ligne)).encode() + FIN_LIGNE for ligne in valeurs.tolist()]
+        return copie
+
+    def _calibration_par_defaut(self):
+        # Pas de réponse K enregistrée : les capteurs saturés (3299) sont déclarés absents
+        premiere = self.lignes[0].split()[:NB_CANAUX]
+        return " ".join(str(VALEUR_INACTIVE) if int(v) == VALEUR_SATUREE else "150" for v in premiere)
+
+
+class MoteurCapteur:
+    """Comportement du firmware : interprète les commandes reçues et émet réponses et trames.
+
+    `emettre(octets, cadence_imposee)` est fourni par le transport (tampon en mémoire ou pseudo-terminal) ;
+    il renvoie le nombre d'octets réellement acceptés. Si `journal` est une liste, chaque lot émis y est noté
+    (indice de la première trame, indice de fin, instant perf_counter_ns) pour mesurer les latences.
+    """
+
+    def __init__(self, enregistrements=None, vitesse=1.0, frequence=None, boucle=True, taille_lot=64):
+        self.fichiers = lister_enregistrements(enregistrements or ENREGISTREMENTS_DEFAUT)
+        if not self.fichiers:
+            raise ValueError(f"Aucun enregistrement trouvé dans {enregistrements}")
+        self.vitesse = vitesse
+        self.frequence = frequence
+        self.boucle = boucle
+        self.taille_lot = taille_lot
+        self.emettre = None
+
+        self.indice = -1
+        self.courant = None
+        self.base = None  # Ligne de base de l'enregistrement calibré, gardée jusqu'à la calibration suivante
+        self._cache = {}
+        self._commande = bytearray()
+        self._actif = threading.Event()
+        self._reveil = threading.Event()
+        self._ferme = threading.Event()
+        self._verrou = threading.Lock()
+
+        self.trames_emises = 0
+        self.trames_perdues = 0
+        self.octets_emis = 0
+        self.octets_perdus = 0
+        self.commandes = []
+        self.journal = None
+
+        self.thread = None
+
+    def demarrer(self, emettre):
+        self.emettre = emettre
+        self.thread = threading.Thread(target=self._boucle_emission, daemon=True)
+        self.thread.start()
+
+    def arreter(self):
+        self._ferme.set()
+        self._actif.clear()
+        self._reveil.set()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout=2)
+
+    @property
+    def en_cours(self):
+        return self._actif.is_set()
+
+    def recevoir(self, octets):
+        """Octets écrits par le programme : les commandes complètes (terminées par \\n) sont exécutées."""
+        self._commande += octets
+        while b"\n" in self._commande:
+            ligne, _, reste = bytes(self._commande).partition(b"\n")
+            self._commande = bytearray(reste)
+            commande = ligne.decode(errors="replace").strip().upper()
+            if commande:
+                self._executer(commande)
+
+    def _charger(self, indice):
+        if indice not in self._cache:
+            self._cache = {indice: Enregistrement(self.fichiers[indice])}
+        return self._cache[indice]
+
+    def _enregistrement_suivant(self):
+        """Passe à l'enregistrement suivant contenant des trames ; None si la liste est épuisée."""
+        for _ in range(len(self.fichiers)):
+            if self.indice + 1 >= len(self.fichiers):
+                if not self.boucle and self.indice >= 0:
+                    return None
+                self.indice = -1
+            self.indice += 1
+            enregistrement = self._charger(self.indice)
+            if len(enregistrement):
+                return enregistrement
+        return None
+
+    def _enregistrement_recentre(self):
+        """Enregistrement suivant, sur la ligne de base du capteur depuis la dernière calibration."""
+        enregistrement = self._enregistrement_suivant()
+        if enregistrement is None or self.base is None:
+            return enregistrement
+        return enregistrement.recentrer(self.base)
+
+    def _executer(self, commande):
+        self.commandes.append(commande)
+        with self._verrou:
+            if commande == "K":
+                if self.courant is None:
+                    self.courant = self._enregistrement_suivant()
+                if self.courant is not None:
+                    self.base = self.courant.ligne_de_base()
+                    self._repondre(self.courant.calibration)
+            elif commande in GAINS:
+                self._repondre(f"ADC GAIN VALUE = {GAINS[commande]}")
+            elif commande in SEUILS:
+                self._repondre(f"CAPA THRESHOLD = {SEUILS[commande]}")
+            elif commande == "R":
+                if not self._actif.is_set():
+                    self._actif.set()
+                    self._reveil.set()
+            elif commande == "S":
+                if self._actif.is_set():
+                    self._actif.clear()
+                    self._reveil.set()
+                    self.courant = None  # La prochaine session passe à l'enregistrement suivant
+
+    def _repondre(self, texte):
+        self.emettre(texte.encode() + FIN_LIGNE, False)
+
+    def _instants(self, enregistrement):
+        if self.frequence:
+            return np.arange(len(enregistrement)) / self.frequence
+        return enregistrement.instants / self.vitesse
+
+    def _boucle_emission(self):
+        while not self._ferme.is_set():
+            if not self._actif.wait(0.1):
+                continue
+            with self._verrou:
+                enregistrement = self.courant if self.courant is not None else self._enregistrement_recentre()
+                self.courant = None
+            if enregistrement is None:
+                self._actif.clear()
+                continue
+            self._reveil.clear()
+            self._rejouer(enregistrement)
+
+    def _rejouer(self, enregistrement):
+        """Émet les trames d'un enregistrement à la cadence choisie, jusqu'à la fin ou jusqu'à S.
+
+        Si la session continue après la dernière trame, la boucle d'émission enchaîne sur l'enregistrement suivant.
+        """
+        lignes = enregistrement.lignes
+        cadence_imposee = self.vitesse is not None or self.frequence is not None
+        instants = self._instants(enregistrement) if cadence_imposee else None
+        debut = time.perf_counter()
+        position = 0
+        while position < len(lignes) and self._actif.is_set() and not self._ferme.is_set():
+            if cadence_imposee:
+                # Toutes les trames dont l'instant est passé partent ensemble (sommeil de l'OS ~1-15 ms)
+                ecoule = time.perf_counter() - debut
+                fin = min(int(np.searchsorted(instants, ecoule, side="right")), position + self.taille_lot)
+                if fin <= position:
+                    self._reveil.wait(min(instants[position] - ecoule, 0.05))
+                    continue
+            else:
+                fin = min(len(lignes), position + self.taille_lot)
+            lot = lignes[position:fin]
+            donnees = b"".join(lot)
+            acceptes = self.emettre(donnees, cadence_imposee)
+            completes = len(lot)
+            if acceptes < len(donnees):
+                completes = int(np.searchsorted(np.cumsum([len(l) for l in lot]), acceptes, side="right"))
+                self.trames_perdues += len(lot) - completes
+                self.octets_perdus += len(donnees) - acceptes
+            self.trames_emises += completes
+            if self.journal is not None:
+                self.journal.append((position, position + completes, time.perf_counter_ns()))
+            self.octets_emis += acceptes
+            position = fin
+
+    def statistiques(self):
+        return {
+            "trames_emises": self.trames_emises,
+            "trames_perdues": self.trames_perdues,
+            "octets_emis": self.octets_emis,
+            "octets_perdus": self.octets_perdus,
+            "enregistrement": self.fichiers[self.indice] if self.indice >= 0 else None,
+        }
+
+
+class CapteurSimule:
+    """Remplaçant de serial.Serial dans le même processus (read, readline, write, in_waiting...)."""
+
+    def __init__(self, enregistrements=None, vitesse=1.0, frequence=None, boucle=True,
+                 port=PREFIXE, baudrate=430000, timeout=None, taille_tampon=4096, **kwargs):
+        self.port = port
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self.taille_tampon = taille_tampon
+        self.tampon = bytearray()
+        self._condition = threading.Condition()
+        self.moteur = MoteurCapteur(enregistrements, vitesse=vitesse, frequence=frequence, boucle=boucle)
+        self.is_open = True
+        self.moteur.demarrer(self._emettre)
+
+    # --- Côté capteur ---
+    def _emettre(self, octets, cadence_imposee):
+        with self._condition:
+            if not cadence_imposee:
+                # Au plus vite : on attend que le programme lise (pas de perte)
+                while self.is_open and len(self.tampon) + len(octets) > max(self.taille_tampon, len(octets)):
+                    self._condition.wait(0.1)
+                acceptes = len(octets)
+            else:
+                acceptes = max(0, min(len(octets), self.taille_tampon - len(self.tampon)))
+            self.tampon += octets[:acceptes]
+            self._condition.notify_all()
+            return acceptes
+
+    # --- Interface serial.Serial ---
+    @property
+    def in_waiting(self):
+        return len(self.tampon)
+
+    def inWaiting(self):
+        return self.in_waiting
+
+    def _attendre(self, condition):
+        """Attend que `condition()` soit vraie ou que le timeout du port expire (appelé sous verrou)."""
+        limite = None if self.timeout is None else time.monotonic() + self.timeout
+        while not condition() and self.is_open:
+            restant = None if limite is None else limite - time.monotonic()
+            if restant is not None and restant <= 0:
+                break
+            self._condition.wait(restant)
+
+    def read(self, size=1):
+        with self._condition:
+            self._attendre(lambda: len(self.tampon) >= size)
+            donnees = bytes(self.tampon[:size])
+            del self.tampon[:size]
+            self._condition.notify_all()
+            return donnees
+
+    def readline(self, size=-1):
+        with self._condition:
+            self._attendre(lambda: b"\n" in self.tampon)
+            fin = self.tampon.find(b"\n")
+            fin = len(self.tampon) if fin < 0 else fin + 1
+            if size is not None and size >= 0:
+                fin = min(fin, size)
+            donnees = bytes(self.tampon[:fin])
+            del self.tampon[:fin]
+            self._condition.notify_all()
+            return donnees
+
+    def write(self, data):
+        if not self.is_open:
+            raise ValueError("Port simulé fermé")
+        self.moteur.recevoir(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def reset_input_buffer(self):
+        with self._condition:
+            self.tampon.clear()
+            self._condition.notify_all()
+
+    def reset_output_buffer(self):
+        pass
+
+    def open(self):
+        if not self.is_open:
+            self.is_open = True
+            self.moteur = MoteurCapteur(self.moteur.fichiers, self.moteur.vitesse, self.moteur.frequence, self.moteur.boucle)
+            self.moteur.demarrer(self._emettre)
+
+    def close(self):
+        if not self.is_open:
+            return
+        with self._condition:
+            self.is_open = False
+            self._condition.notify_all()
+        self.moteur.arreter()
+
+    def statistiques(self):
+        return self.moteur.statistiques()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class CapteurPty:
+    """Capteur simulé exposé sur un pseudo-terminal : `port` s'ouvre avec serial.Serial (POSIX uniquement)."""
+
+    def __init__(self, enregistrements=None, vitesse=1.0, frequence=None, boucle=True):
+        import pty
+        import tty
+        self.maitre, self.esclave = pty.openpty()
+        tty.setraw(self.esclave)
+        self.port = os.ttyname(self.esclave)
+        self.is_open = True
+        self.moteur = MoteurCapteur(enregistrements, vitesse=vitesse, frequence=frequence, boucle=boucle)
+        self.moteur.demarrer(self._emettre)
+        self.thread = threading.Thread(target=self._boucle_commandes, daemon=True)
+        self.thread.start()
+
+    def _emettre(self, octets, cadence_imposee):
+        # Le pseudo-terminal a son propre tampon : l'écriture bloque quand il est plein
+        try:
+            os.write(self.maitre, octets)
+            return len(octets)
+        except OSError:
+            return 0
+
+    def _boucle_commandes(self):
+        while self.is_open:
+            try:
+                octets = os.read(self.maitre, 1024)
+            except OSError:
+                break
+            if octets:
+                self.moteur.recevoir(octets)
+
+    def close(self):
+        self.is_open = False
+        self.moteur.arreter()
+        for fd in (self.maitre, self.esclave):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def analyser_adresse(port):
+    """Décompose "simulateur://chemin?vitesse=2&frequence=500&boucle=0" en paramètres de CapteurSimule."""
+    adresse = port[len(PREFIXE):]
+    chemin, _, requete = adresse.partition("?")
+    options = {"enregistrements": chemin or None}
+    for element in filter(None, requete.split("&")):
+        cle, _, valeur = element.partition("=")
+        if cle == "vitesse":
+            options["vitesse"] = None if valeur in ("max", "0", "") else float(valeur)
+        elif cle == "frequence":
+            options["frequence"] = float(valeur)
+        elif cle == "boucle":
+            options["boucle"] = valeur not in ("0", "non", "false")
+        elif cle == "tampon":
+            options["taille_tampon"] = int(valeur)
+    return options
+
+
+def ouvrir_port(port, **kwargs):
+    """Ouvre le port série `port`, ou un capteur simulé si le nom commence par "simulateur://"."""
+    if port.startswith(PREFIXE):
+        options = analyser_adresse(port)
+        options["timeout"] = kwargs.get("timeout")
+        options["baudrate"] = kwargs.get("baudrate", 430000)
+        return CapteurSimule(port=port, **options)
+    import serial
+    return serial.Serial(port, **kwargs)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Capteur nanomade simulé sur pseudo-terminal.")
+    parser.add_argument("enregistrements", nargs="*", default=[ENREGISTREMENTS_DEFAUT],
+                        help="Fichiers ou dossiers d'enregistrements (CSV ou .nmd)")
+    parser.add_argument("--vitesse", default="1", help="Facteur de vitesse (1 = cadence d'origine, max = au plus vite)")
+    parser.add_argument("--frequence", type=float, default=None, help="Cadence fixe en trames/s")
+    parser.add_argument("--une-fois", action="store_true", help="Ne pas reboucler sur les enregistrements")
+    args = parser.parse_args()
+
+    vitesse = None if args.vitesse in ("max", "0") else float(args.vitesse)
+    capteur = CapteurPty(args.enregistrements, vitesse=vitesse, frequence=args.frequence, boucle=not args.une_fois)
+    print(f"🔌 Capteur simulé disponible sur {capteur.port} ({len(capteur.moteur.fichiers)} enregistrements)")
+    try:
+        while True:
+            time.sleep(5)
+            stats = capteur.moteur.statistiques()
+            print(f"📡 {stats['trames_emises']} trames émises, {stats['trames_perdues']} perdues")
+    except KeyboardInterrupt:
+        print("\n🛑 Arrêt du capteur simulé.")
+    finally:
+        capteur.close()
@@ -0,0 +1,155 @@
+"""Analyse des lignes envoyées par le capteur nanomade, partagée par l'interface, le prototype et les outils.
+
+Une trame contient 32 entiers séparés par des espaces : 16 valeurs analogiques
+(M_F_1..8 puis U_F_1..8) suivies de 16 indicateurs de présence (M_C_1..8 puis U_C_1..8).
+Une ligne de plus de 32 valeurs (deux trames fusionnées après une perte d'octets) est illisible.
+Les autres lignes sont des réponses aux commandes : calibration (16 entiers, réponse à K),
+"ADC GAIN VALUE = n" (réponse à Gx) et "CAPA THRESHOLD = n" (réponse à Cx).
+"""
+import numpy as np
+
+NB_CANAUX = 16
+NB_VALEURS = 2 * NB_CANAUX
+VALEUR_INACTIVE = 1000  # Valeur d'un capteur absent (calibration)
+VALEUR_SATUREE = 3299  # Valeur d'un capteur absent (mesure)
+
+# Ordre physique des électrodes : le deuxième groupe de 4 (M_F_5..8) est câblé à l'envers
+PERMUTATION_ELECTRODES = np.array([0, 1, 2, 3, 7, 6, 5, 4, *range(8, NB_CANAUX)])
+ENTETES_CAPTEURS = [f"MF{i + 1}" for i in range(8)] + [f"UF{i + 1}" for i in range(8)]
+ENTETES_ELECTRODES = [ENTETES_CAPTEURS[i] for i in PERMUTATION_ELECTRODES]
+
+DTYPE_MESURE = np.dtype([("analogique", "<u2", (NB_CANAUX,)), ("presence", "u1", (NB_CANAUX,))])
+
+TRAME = "trame"
+CALIBRATION = "calibration"
+GAIN = "gain"
+SEUIL = "seuil"
+AUTRE = "autre"
+
+
+def type_ligne(ligne):
+    """Nature d'une ligne reçue : trame, calibration, gain, seuil ou autre."""
+    if isinstance(ligne, (bytes, bytearray)):
+        ligne = ligne.decode(errors="replace")
+    tokens = ligne.split()
+    if not tokens:
+        return AUTRE
+    if tokens[:3] == ["ADC", "GAIN", "VALUE"]:
+        return GAIN
+    if tokens[:2] == ["CAPA", "THRESHOLD"]:
+        return SEUIL
+    if all(t.isdigit() for t in tokens):
+        if len(tokens) == NB_VALEURS:
+            return TRAME
+        if len(tokens) == NB_CANAUX:
+            return CALIBRATION
+    return AUTRE
+
+
+def valeur_reponse(ligne):
+    """Valeur numérique d'une réponse "ADC GAIN VALUE = n" ou "CAPA THRESHOLD = n"."""
+    return int(ligne.split("=")[-1])
+
+
+def canaux_actifs(valeurs):
+    """Masque des canaux actifs (ni 1000 ni 3299) pour une calibration ou des trames."""
+    valeurs = np.asarray(valeurs)
+    return (valeurs != VALEUR_INACTIVE) & (valeurs != VALEUR_SATUREE)
+
+
+def ordre_electrodes(valeurs):
+    """Réordonne la dernière dimension (16 canaux) dans l'ordre physique des électrodes."""
+    return np.take(valeurs, PERMUTATION_ELECTRODES, axis=-1)
+
+
+def _texte(ligne):
+    if isinstance(ligne, (bytes, bytearray)):
+        ligne = ligne.decode(errors="replace")
+    return ligne.strip()
+
+
+class AnalyseurTrames:
+    """Convertit des lignes (ou des lots de lignes) en enregistrements NumPy typés, en une seule passe.
+
+    Les trames sont écrites dans un tampon de sortie réutilisé d'un appel à l'autre : le tableau
+    renvoyé est une vue valable jusqu'à l'appel suivant (le copier pour le conserver).
+    """
+
+    def __init__(self, capacite=1024, reordonner=True):
+        self.reordonner = reordonner
+        self.sortie = np.zeros(capacite, dtype=DTYPE_MESURE)
+        self.lignes_invalides = 0
+
+    def analyser(self, lignes):
+        """Analyse un lot de lignes (str ou bytes).
+
+        Renvoie (trames, reponses) : trames est une vue (N,) de DTYPE_MESURE, reponses une liste
+        de (indice de la trame suivante, nature, texte) pour les lignes qui ne sont pas des trames.
+        """
+        candidates = []
+        reponses = []
+        for ligne in lignes:
+            premier = ligne[:1]
+            if premier.isdigit():
+                candidates.append(ligne)
+            elif ligne.strip():
+                reponses.append((len(candidates), ligne))
+
+        total = len(candidates) + len(reponses)
+        if self.sortie.shape[0] < total:
+            self.sortie = np.zeros(max(total, 2 * self.sortie.shape[0]), dtype=DTYPE_MESURE)
+
+        valeurs = self._convertir(candidates)
+        if valeurs is None:
+            # Lot hétérogène (réponse K, ligne tronquée...) : analyse ligne par ligne
+            return self._analyser_ligne_a_ligne(lignes)
+
+        reponses = [(i, type_ligne(l), _texte(l)) for i, l in reponses]
+        if any(nature == TRAME for _, nature, _ in reponses):
+            return self._analyser_ligne_a_ligne(lignes)
+        self.lignes_invalides += sum(nature == AUTRE for _, nature, _ in reponses)
+
+        n = valeurs.shape[0]
+        self._remplir(valeurs, n)
+        return self.sortie[:n], reponses
+
+    def analyser_ligne(self, ligne):
+        """Analyse une seule ligne ; renvoie (trames, reponses) comme analyser."""
+        return self.analyser((ligne,))
+
+    def _convertir(self, candidates):
+        if not candidates:
+            return np.zeros((0, NB_VALEURS), dtype=np.int64)
+        premier = candidates[0]
+        separateur = b"\n" if isinstance(premier, (bytes, bytearray)) else "\n"
+        try:
+            valeurs = np.fromstring(separateur.join(candidates), dtype=np.int64, sep=" ")
+        except ValueError:
+            return None
+        if valeurs.size != NB_VALEURS * len(candidates):
+            return None
+        return valeurs.reshape(len(candidates), NB_VALEURS)
+
+    def _remplir(self, valeurs, n, debut=0):
+        analogique = valeurs[:, :NB_CANAUX]
+        presence = valeurs[:, NB_CANAUX:NB_VALEURS]
+        if self.reordonner:
+            analogique = analogique[:, PERMUTATION_ELECTRODES]
+            presence = presence[:, PERMUTATION_ELECTRODES]
+        self.sortie["analogique"][debut:debut + n] = analogique
+        self.sortie["presence"][debut:debut + n] = presence != 0
+
+    def _analyser_ligne_a_ligne(self, lignes):
+        n = 0
+        reponses = []
+        for ligne in lignes:
+            nature = type_ligne(ligne)
+            if nature == TRAME:
+                valeurs = np.fromstring(ligne, dtype=np.int64, sep=" ")
+                self._remplir(valeurs[None, :], 1, debut=n)
+                n += 1
+            elif _texte(ligne):
+                if nature == AUTRE:
+                    self.lignes_invalides += 1
+                reponses.append((n, nature, _texte(ligne)))
+        return self.sortie[:n], reponses
@@ -4,10 +4,19 @@ from PySide6.QtCore import Qt, QTimer, QPointF
 import serial
 import serial.tools.list_ports
 import threading
-import csv
 import os
 import datetime
 import time
+import sys
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Commun"))
+from enregistreur import Enregistreur, ENTETE_CSV
+from format_binaire import EnregistreurBinaire, EXTENSION as EXTENSION_BINAIRE
+from trames import AnalyseurTrames, ENTETES_ELECTRODES, canaux_actifs, ordre_electrodes
+from lecture_serie import LecteurSerie
+from simulateur import ouvrir_port, PREFIXE as PREFIXE_SIMULATEUR
+from calibration import Calibration
 
 class FullscreenWindow(QMainWindow):
         """Fenêtre plein écran pour afficher QGraphicsView avec sortie via Échap."""
@@ -34,11 +43,16 @@ class SerialWidget(QWidget):
         # Layout principal
         self.layout = QVBoxLayout(self)
 
-        self.sensor_presence=[]
-        self.sensor_data=[]
+        self.analyseur = AnalyseurTrames(capacite=64, reordonner=False)
+        self.lecteur = None  # Lecture du port série par blocs
+        self.calibration = None  # Échange commande/réponse, alimenté par le thread de lecture
+        self.active_mask = None
+        self.sensor_data = ([], np.zeros(0), np.zeros(0))  # (headers actifs, valeurs, présences)
         self.headers= []
         self.calibrated = False
         self.k_response = None  # Déclaration globale
+        self.csv_file = None
+        self.enregistreur = None  # Écriture CSV en tâche de fond
         
        
 
@@ -303,18 +317,28 @@ class SerialWidget(QWidget):
             self.port_dropdown.addItem(port.device)
         if self.port_dropdown.count() == 0:
             self.port_dropdown.addItem("Aucun port détecté")
+        # Capteur simulé (rejoue les enregistrements du dossier Outils/Test)
+        self.port_dropdown.addItem(PREFIXE_SIMULATEUR)
 
     def init_csv_file(self):
-        """Crée le fichier CSV et ajoute un en-tête si nécessaire."""
-        if not os.path.exists(self.csv_file):
-            with open(self.csv_file, mode='w', newline='') as file:
-                writer = csv.writer(file)
-                writer.writerow([
-                    "Timestamp", "M_F_1", "M_F_2", "M_F_3", "M_F_4", "M_F_5", "M_F_6", "M_F_7", "M_F_8",
-                    "U_F_1", "U_F_2", "U_F_3", "U_F_4", "U_F_5", "U_F_6", "U_F_7", "U_F_8",
-                    "M_C_1", "M_C_2", "M_C_3", "M_C_4", "M_C_5", "M_C_6", "M_C_7", "M_C_8",
-                    "U_C_1", "U_C_2", "U_C_3", "U_C_4", "U_C_5", "U_C_6", "U_C_7", "U_C_8"
-                ])
+        """Ouvre l'enregistreur du fichier CSV (l'en-tête est ajouté si le fichier est nouveau) ou de la session binaire."""
+        self.close_csv_file()
+        if self.csv_file.endswith(EXTENSION_BINAIRE):
+            self.enregistreur = EnregistreurBinaire(self.csv_file)
+        else:
+            self.enregistreur = Enregistreur(self.csv_file, entete=ENTETE_CSV)
+
+    def close_csv_file(self):
+        """Vide la file d'écriture et ferme le fichier CSV en cours."""
+        if self.enregistreur is None:
+            return
+        try:
+            self.enregistreur.fermer()
+        except Exception as e:
+            self.output_display.append(f"⚠️ Enregistrement incomplet ({self.enregistreur.filename}) : {e}")
+        stats = self.enregistreur.statistiques()
+        self.output_display.append(f"💾 {stats['lignes_ecrites']} lignes écrites ({stats['lignes_par_s']:.0f} lignes/s)")
+        self.enregistreur = None
                 
     def toggle_connection(self):
         """Se connecte ou se déconnecte du port série."""
@@ -330,31 +354,35 @@ class SerialWidget(QWidget):
             self.output_display.append("⚠️ Aucun port disponible !")
             return
         try:
-            self.ser = serial.Serial(port_name, baudrate=430000, timeout=2)
+            self.ser = ouvrir_port(port_name, baudrate=430000, timeout=2)
             self.is_connected = True
             self.connect_button.setText("Déconnexion")
             self.connect_button.setStyleSheet("background-color: #DC3545; color: white;font:bold; padding: 5px; border-radius: 5px;")
             self.output_display.append(f"✅ Connecté à {port_name}")
 
-            # Envoi du caractère 'K' après connexion
-            self.ser.write(b'K\n')
-            self.output_display.append("📤 Envoyé : K")
+            # Réouverture de l'enregistrement si un fichier a déjà été choisi
+            if self.csv_file and self.enregistreur is None:
+                self.init_csv_file()
 
-            # Lecture de la réponse après 'K'
-            self.k_response = self.ser.readline().decode().strip()  
-            #self.output_display.append(f"📥 Réponse reçue : {self.k_response}") 
-            timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S,%f")[:-3]
-            self.save_to_csv(timestamp, None, None, self.k_response) 
+            # Envoi du caractère 'K' après connexion, puis attente de la ligne de calibration (renvoyé sans réponse)
+            self.lecteur = LecteurSerie(self.ser, self.analyseur)
+            calibration = Calibration(self.ser, self.lecteur)
+            self.output_display.append("📤 Envoyé : K")
+            self.k_response = calibration.envoyer("K")
 
             # Vérifier si la réponse est valide
             if not self.k_response:
                 self.output_display.append("⚠️ Aucune réponse du capteur !")
                 return
+            _, timestamp, tentatives, duree_ms = calibration.derniere
+            #self.output_display.append(f"📥 Réponse reçue : {self.k_response}") 
+            self.output_display.append(f"⏱️ Calibration reçue en {duree_ms:.0f} ms ({tentatives} envoi(s))")
+            self.save_to_csv(timestamp, None, None, self.k_response) 
 
             self.calibrated = True  # Activation du flag de calibration
 
-            
-
+            # Les réponses suivantes (gain, seuil) sont lues par le thread de lecture et transmises à l'échange
+            self.calibration = Calibration(self.ser)
             self.read_thread = threading.Thread(target=self.read_from_sensor, daemon=True)
             self.read_thread.start()
             self.update_timer.start(5)  # Mise à jour toutes les 20 ms
@@ -363,7 +391,7 @@ class SerialWidget(QWidget):
             self.update_timer.timeout.connect(self.create_rectangles)
 
             
-        except serial.SerialException:
+        except (serial.SerialException, ValueError):
             self.output_display.append(f"❌ Impossible de se connecter à {port_name}")
             
         
@@ -374,6 +402,13 @@ class SerialWidget(QWidget):
         if self.ser and self.ser.is_open:
             self.ser.close()
         self.is_connected = False
+        if self.lecteur is not None:
+            stats = self.lecteur.statistiques()
+            self.output_display.append(f"📡 {stats['trames_par_s']:.0f} trames/s, {stats['octets_par_s'] / 1024:.1f} Ko/s, "
+                                       f"{stats['lignes_invalides']} ligne(s) illisible(s)")
+            self.lecteur = None
+        self.calibration = None
+        self.close_csv_file()
         self.connect_button.setText("Se connecter")
         self.connect_button.setStyleSheet("background-color: #007BFF; color: white;font:bold; padding: 5px; border-radius: 5px;")
         self.output_display.append("🔌 Déconnecté")
@@ -400,116 +435,53 @@ class SerialWidget(QWidget):
         gain_value = self.gain_dropdown.currentText()
         limit_value = self.limit_dropdown.currentText()
 
-        # Envoi du gain
-        gain_command = f"{gain_value}\n"
-        self.ser.write(gain_command.encode())
-        self.output_display.append(f"📤 Envoyé : {gain_command.strip()}")
-
-        # Attente d'une réponse du capteur
-        start_time = time.time()
-        while time.time() - start_time < 2:  # Timeout de 2 secondes
-            if self.ser.in_waiting:
-                response = self.ser.readline().decode().strip()
-                #self.output_display.append(f"📥 Reçu : {response}")
-                
-                """# Récupération du timestamp actuel
-                timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
-                
-                # Préparation des valeurs à enregistrer
-                values = [""] * 32  # On initialise une liste de 32 éléments vides
-                presence_values = [""] * 8  # Liste vide pour les valeurs de présence
-
-                # Appel de save_to_csv avec tous les paramètres requis
-                self.save_to_csv(timestamp, values, presence_values, response)"""
-                break
-            time.sleep(0.1)  # Petit délai pour éviter de bloquer la boucle inutilement
-
-        # Envoi de la limite
-        limit_command = f"{limit_value}\n"
-        self.ser.write(limit_command.encode())
-        self.output_display.append(f"📤 Envoyé : {limit_command.strip()}")
+        # Chaque commande attend sa réponse ("ADC GAIN VALUE = n" puis "CAPA THRESHOLD = n") avant la suivante
+        debut = time.perf_counter()
+        for command in (gain_value, limit_value):
+            self.output_display.append(f"📤 Envoyé : {command}")
+            response = self.calibration.envoyer(command)
+            if response is None:
+                self.output_display.append(f"⚠️ Pas de réponse à {command}")
+            else:
+                self.output_display.append(f"📥 Reçu : {response}")
+        self.output_display.append(f"⏱️ Calibration en {(time.perf_counter() - debut) * 1000:.0f} ms")
 
 
     def read_from_sensor(self):
-        """Lit et stocke les données du capteur en continu, en filtrant les valeurs inactives."""
+        """Lit et stocke les données du capteur en continu, par blocs, en filtrant les valeurs inactives."""
         while self.is_connected and self.ser and self.ser.is_open:
             try:
-                data = self.ser.readline().decode().strip()
-                if data:
-                    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S,%f")[:-3]
-                    #self.output_display.append(f"📥 [{timestamp}] Reçu : {data}")
-                    
-                    # Définition des headers selon la trame
-                    headers = [
-                        "MF1", "MF2", "MF3", "MF4", "MF8", "MF7", "MF6", "MF5",
-                        "UF1", "UF2", "UF3", "UF4", "UF5", "UF6", "UF7", "UF8"
-                    ]
-                    
-                    # Filtrer uniquement les headers des capteurs actifs
-                    active_headers = []
-                    
-
-                   
-
-
-                    # Extraction des valeurs analogiques
-                    values = data.split()
-                    if len(values) > 17:  # Limite à 17 valeurs max
-                        values = values[:17]
-
-                    # Conversion en int avec gestion des valeurs non numériques
-                    values = [int(v) if v.isdigit() else 1000 for v in values]
-                    
-                    # Extraction des valeurs de présence (indices 16 à 33)
-                    presence_values = data.split()[16:33]
-                    presence_values = [int(v) if v in ('0', '1') else 0 for v in presence_values]
-                    
-                    # Réorganisation des valeurs par groupes de 4. Nécessaire pour avoir les électrodes dans le bon ordre 
-                    reorganized_values = []
-                    presence_reorganized_values = []
-                    
-                    for i in range(0, len(values), 4):
-                        group = values[i:i+4]
-                        presence_group= presence_values[i:i+4]
-                        # Inverser seulement le deuxième groupe (i = 4 car 2ème groupe commence à l'indice 4)
-                        if i == 4:
-                            group.reverse()
-                            presence_group.reverse()
-                        reorganized_values.extend(group)
-                        presence_reorganized_values.extend(presence_group)
-
-                    
-                    
-
-                    # Association des valeurs avec les headers
-                    sensor_data = []
-                    sensor_presence = {}
-                    for h, v, p in zip(headers, reorganized_values, presence_reorganized_values):
-                        if v not in (1000, 3299):  # Filtrage des valeurs inactives
-                            sensor_data.append(f"{h}: {v}")
-                            sensor_presence[h] = p  # 0 ou 1 pour la présence
-                            active_headers.append(h)
-
-                            
-                    self.headers=active_headers
-                    
-                    
-                    # Mise à jour des capteurs actifs et des présences
-                    self.sensor_data = sensor_data
-                    self.sensor_presence = sensor_presence  # Stockage des présences dans un dict
-
-                    #print("🔍 sensor_data :", self.sensor_data)
-                    #print("🔍 sensor_presence :", self.sensor_presence)
-                    
+                trames, reponses = self.lecteur.lire()
+                if len(trames) or reponses:
+                    timestamp = time.monotonic_ns()  # Mis en forme à l'écriture (ancre murale de la session)
+
+                    # Seule la dernière trame du bloc est affichée
+                    if len(trames):
+                        self.update_sensor_state(trames[-1])
+
                     #Enregistrement dans le csv
-                    
-                    #self.save_to_csv(timestamp, reorganized_values, presence_reorganized_values, self.k_response)
-                    self.save_to_csv(timestamp, reorganized_values, presence_reorganized_values, data)
+                    self.save_lot_to_csv(timestamp, trames, reponses)
+
+                    # Réponses attendues par send_calibration_values
+                    if reponses and self.calibration is not None:
+                        self.calibration.recevoir(reponses, timestamp)
 
             except Exception as e:
                 self.output_display.append(f"⚠️ Erreur de lecture : {e}")
                 break
 
+    def update_sensor_state(self, trame):
+        """Met à jour les capteurs actifs (hors valeurs inactives 1000/3299) et leurs présences."""
+        analogique = ordre_electrodes(trame["analogique"])
+        presence = ordre_electrodes(trame["presence"])
+        actifs = canaux_actifs(analogique)
+        if not np.array_equal(actifs, self.active_mask):
+            self.active_mask = actifs
+            self.headers = [ENTETES_ELECTRODES[i] for i in np.flatnonzero(actifs)]
+
+        # Un seul tuple (remplacé d'un bloc) pour que l'affichage lise un état cohérent
+        self.sensor_data = (self.headers, analogique[actifs], presence[actifs])
+
 
 
 
@@ -552,12 +524,8 @@ class SerialWidget(QWidget):
 
         existing_items = {header.toPlainText(): (rect, value_text, header) for rect, value_text, header in self.rect_items}
 
-        for sensor_info in self.sensor_data:
-            try:
-                key, value = sensor_info.split(": ")
-                value = int(value)
-            except ValueError:
-                continue
+        headers, values, presences = self.sensor_data
+        for key, value, presence in zip(headers, values.tolist(), presences.tolist()):
 
             if count >= row_limit:
                 x_offset = 10
@@ -593,7 +561,7 @@ class SerialWidget(QWidget):
 
                 self.rect_items.append((rect, value_text, header_text))
 
-            if key in self.sensor_presence and self.sensor_presence[key] == 1:
+            if presence == 1:
                 rect.setPen(QPen(QColor(0, 0, 255), 5))
                 rect.setZValue(1)
 
@@ -716,17 +684,26 @@ class SerialWidget(QWidget):
         while len(ligne) < 33:
             ligne.append("")
 
-        # Écriture dans le fichier CSV
+        # Écriture dans le fichier CSV (réalisée par le thread de l'enregistreur)
+        if self.enregistreur is None:
+            return 0
         try:
-            with open(self.csv_file, mode='a', newline='') as file:
-                writer = csv.writer(file)
-                writer.writerow(ligne)
-                #print(f"Données enregistrées : {ligne}")
+            self.enregistreur.ajouter(ligne)
+            #print(f"Données enregistrées : {ligne}")
         except Exception as e:
             #self.output_display.append(f"⚠️ Erreur de sauvegarde CSV : {e}")
             #print(f"⚠️ Erreur de sauvegarde CSV : {e}")
             return 0
 
+    def save_lot_to_csv(self, timestamp, trames, reponses):
+        """Enregistre un bloc de trames analysées et les réponses reçues avec elles."""
+        if self.enregistreur is None:
+            return 0
+        try:
+            self.enregistreur.ajouter_lot(timestamp, trames, reponses)
+        except Exception as e:
+            return 0
+
     def choose_save_location(self, state): 
         """Ouvre une boîte de dialogue pour choisir l'emplacement en mode clair et force le format CSV."""
         
@@ -741,7 +718,7 @@ class SerialWidget(QWidget):
             file_dialog = QFileDialog(self, 
                                     "Choisir l'emplacement du fichier", 
                                     default_name, 
-                                    "Fichiers CSV (*.csv);;Tous les fichiers (*)",
+                                    f"Fichiers CSV (*.csv);;Sessions binaires (*{EXTENSION_BINAIRE});;Tous les fichiers (*)",
                                     options=options)
                                     
             file_dialog.setAcceptMode(QFileDialog.AcceptSave)
@@ -754,8 +731,11 @@ class SerialWidget(QWidget):
                 file_path = file_dialog.selectedFiles()[0]  # Récupère le chemin du fichier
                 
                 if file_path:
-                    # Vérification et ajout de l'extension .csv si l'utilisateur ne l'a pas ajoutée
-                    if not file_path.endswith(".csv"):
+                    # Vérification et ajout de l'extension si l'utilisateur ne l'a pas ajoutée
+                    if file_dialog.selectedNameFilter().startswith("Sessions binaires"):
+                        if not file_path.endswith(EXTENSION_BINAIRE):
+                            file_path += EXTENSION_BINAIRE
+                    elif not file_path.endswith((".csv", EXTENSION_BINAIRE)):
                         file_path += ".csv"
                         
                     self.csv_file = file_path  # Mise à jour du chemin du fichier
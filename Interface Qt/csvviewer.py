@@ -1,14 +1,20 @@
 import sys
 import os
-import csv
-import pandas as pd
+import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
-from datetime import datetime
 from PySide6.QtWidgets import *
 from PySide6.QtCore import Qt
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Commun"))
+from chargement import charger
+from index_series import lire_index, lire_lignes_serie, serie_fichier, titre_serie
+from reseau_numpy import FICHIER as FICHIER_NUMPY
+from service_prediction import ModeleANN, ServiceIndisponible, predire, service_disponible
+
+DOSSIER_ANN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "ANN")
+
 class CSVViewer(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -84,7 +90,7 @@ class CSVViewer(QWidget):
         layout.addWidget(self.label_series, alignment=Qt.AlignCenter)
         
         self.series_dropdown = QComboBox()
-        self.series_dropdown.setFixedSize(200, 30)
+        self.series_dropdown.setFixedSize(280, 30)
         self.series_dropdown.setStyleSheet("border-radius: 5px; padding: 3px;")
         #self.series_dropdown.setToolTip("Sélectionnez une série de données dans le fichier CSV.")
         self.series_dropdown.currentIndexChanged.connect(self.load_selected_series)
@@ -98,6 +104,14 @@ class CSVViewer(QWidget):
         self.graph_or_csv_btn.clicked.connect(self.toggle_graph_view)
         layout.addWidget(self.graph_or_csv_btn, alignment=Qt.AlignCenter)
 
+        self.predict_btn = QPushButton("🧠 Prédire")
+        self.predict_btn.setFixedSize(120, 30)
+        self.predict_btn.setStyleSheet(
+            "background-color: #58B; color: white; font-weight: bold; border-radius: 5px; padding: 3px;"
+        )
+        self.predict_btn.clicked.connect(self.predict_letter)
+        layout.addWidget(self.predict_btn, alignment=Qt.AlignCenter)
+
         self.tableWidget = QTableWidget()
         layout.addWidget(self.tableWidget)
 
@@ -144,105 +158,48 @@ class CSVViewer(QWidget):
 
     
     def load_csv(self, filename):
-        """Charge le CSV et segmente en séries de données correctement, avec date/heure dans les titres."""
+        """Liste les séries du CSV d'après son index (construit au premier chargement) et affiche la première."""
         self.current_file = filename
+        self.series_dropdown.blockSignals(True)  # Ne rien charger pendant le remplissage de la liste
         self.series_dropdown.clear()
-        self.series_data = []
+        self.series_data = []  # Entrées de l'index : chaque série est lue à la demande
         self.global_headers = []  # Stocker les en-têtes du CSV
 
         try:
-            with open(filename, newline='', encoding='utf-8') as file:
-                reader = csv.reader(file)
-                data = list(reader)
-
-                if not data:
-                    return
-
-                # Stocker la première ligne comme en-têtes
-                self.global_headers = data[0]  
-                data = data[1:]  # Supprimer la première ligne des données
-
-                self.series_dropdown.addItem("Fichier entier")
-                self.series_data.append(data)
-
-                current_series = []
-                collecting = False
-                series_titles = []
-
-                for i, row in enumerate(data):
-                    if not row:
-                        continue  
-
-                    is_calibration = all(cell.replace('.', '', 1).isdigit() if cell else True for cell in row[1:])
-                    is_gain = any(key in row for key in ["ADC", "GAIN", "VALUE"])
-                    is_threshold = any(key in row for key in ["CAPA", "THRESHOLD"])
-
-                    if is_calibration and i < len(data) - 2:
-                        next_row = data[i + 1]
-                        next_next_row = data[i + 2]
-
-                        is_next_gain = any(key in next_row for key in ["ADC", "GAIN", "VALUE"])
-                        is_next_threshold = any(key in next_next_row for key in ["CAPA", "THRESHOLD"])
-
-                        if is_next_gain and is_next_threshold:
-                            # ✅ Fermer la série précédente avant d'en commencer une nouvelle
-                            if collecting and current_series:
-                                self.series_data.append(current_series)
-                                series_titles.append(self.extract_timestamp(current_series[0]))
-                            
-                            # ✅ Réinitialiser la série et collecter la calibration
-                            current_series = [row, next_row, next_next_row]
-                            collecting = True
-                            continue  
-
-                    if collecting:
-                        current_series.append(row)  
+            index = lire_index(filename)
+            if not index["taille"]:
+                return
+            self.global_headers = index["entete"] or []
 
-                # ✅ Ajouter la dernière série détectée
-                if collecting and current_series:
-                    self.series_data.append(current_series)
-                    series_titles.append(self.extract_timestamp(current_series[0]))
+            self.series_dropdown.addItem("Fichier entier")
+            self.series_data.append(serie_fichier(filename, index))
 
-                for i, title in enumerate(series_titles):
-                    self.series_dropdown.addItem(f"Série {i+1} : {title}")
+            for i, serie in enumerate(index["series"]):
+                self.series_dropdown.addItem(f"Série {i+1} : {titre_serie(serie)} ({serie['trames']} trames)")
+                self.series_dropdown.setItemData(i + 1, ", ".join(serie["canaux_actifs"]), Qt.ToolTipRole)
+                self.series_data.append(serie)
 
-                self.load_selected_series(0)
+            self.series_dropdown.setCurrentIndex(1 if index["series"] else 0)
+            self.load_selected_series(self.series_dropdown.currentIndex())
 
         except Exception as e:
             self.label.setText(f"🚨 Erreur : {e}")
-
-
-
-
-    def extract_timestamp(self, row):
-        """Extrait la date et l'heure du premier timestamp et les formate en 'JJ/MM HHhMM'."""
-        try:
-            timestamp = row[0]  # Le timestamp est dans la première colonne
-            dt = datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S,%f")  # Convertir en objet datetime
-            return dt.strftime("%d/%m %Hh%M")  # Format : 24/04 19h35
-        except Exception:
-            return "??/?? ??:??"  # Si problème, affiche un placeholder
-
-
-
-
-
-        
-        
+        finally:
+            self.series_dropdown.blockSignals(False)
 
     def load_selected_series(self, index):
         """Affiche la série de données sélectionnée dans la table en utilisant les en-têtes globales."""
         if not self.series_data or index < 0 or index >= len(self.series_data):
             return
 
-        series = self.series_data[index]
+        # Seules les lignes de la série sont lues
+        data_rows = lire_lignes_serie(self.current_file, self.series_data[index])
         
-        if not series:
+        if not data_rows:
             return
 
         # Utiliser les en-têtes globales
-        headers = self.global_headers  
-        data_rows = series  # Garde toutes les lignes (pas d'en-têtes à retirer ici)
+        headers = self.global_headers or [str(i) for i in range(max(len(row) for row in data_rows))]
 
         self.tableWidget.clear()
         self.tableWidget.setRowCount(len(data_rows))
@@ -265,34 +222,16 @@ class CSVViewer(QWidget):
             return
 
         try:
-            df = pd.read_csv(self.current_file, on_bad_lines='skip')
+            index = max(self.series_dropdown.currentIndex(), 0)
+            # "Fichier entier" : tout le fichier ; sinon seule la série choisie est lue
+            enregistrement = charger(self.current_file, self.series_data[index] if index else None)
+            df_filtre = enregistrement.dataframe()  # Trames des capteurs actifs, calibration et réponses écartées
+            colonnes_a_garder = enregistrement.colonnes_actives()
 
-            if df.empty:
+            if df_filtre.empty:
                 QMessageBox.warning(self, "Erreur", "Le fichier CSV est vide ou corrompu.")
                 return
-
-            if 'Timestamp' in df.columns:
-                df['Timestamp'] = pd.to_datetime(df['Timestamp'], format='%Y-%m-%d %H:%M:%S,%f', errors='coerce')
-                df = df.dropna()
-
-
-            colonnes_a_garder = []
-            for col in df.columns[1:17]:
-                premiere_valeur = df[col].iloc[0]
-                if premiere_valeur != 1000 and any(df[col] != 3299):
-                    colonnes_a_garder.append(col)
-                    
-            df_filtre = df[['Timestamp'] + colonnes_a_garder]
-            
-            #Supprimer les valeurs de calibration
-            index_fin_calibration = 0
-            if df.isna().any().any():  # Vérifie s'il y a des NaN
-                index_fin_calibration = df.dropna().index[0]  # Premier index non-NaN
-                df_filtre = df_filtre.iloc[index_fin_calibration:]
-
-
-            
-
+            temps = df_filtre['Timestamp'] if 'Timestamp' in df_filtre else df_filtre.index  # Fichier nettoyé : n° de trame
 
             # Effacer le graphique précédent
             self.canvas.figure.clear()
@@ -300,11 +239,11 @@ class CSVViewer(QWidget):
             # Tracer le nouveau graphique
             ax = self.canvas.figure.add_subplot(111)
             for col in colonnes_a_garder:
-                ax.plot(df_filtre['Timestamp'], df_filtre[col], label=col)
+                ax.plot(temps, df_filtre[col], label=col)
 
             ax.set_xlabel("Temps")
             ax.set_ylabel("Valeurs")
-            ax.set_title(f"Évolution des valeurs - {os.path.basename(self.current_file)}")
+            ax.set_title(f"Évolution des valeurs - {os.path.basename(self.current_file)} - {self.series_dropdown.currentText()}")
             ax.legend()
             ax.grid(True)
             
@@ -319,6 +258,46 @@ class CSVViewer(QWidget):
             print(self, "Erreur", f"Une erreur est survenue : {e}")
 
 
+    def predict_letter(self):
+        """Envoie le fichier (ou la série choisie) au service de prédiction et affiche la lettre prédite.
+
+        Sans service (ou s'il ne répond plus), un fichier brut est prédit sur place par l'ANN exporté en NumPy
+        (ANN/modele_lettres.npz).
+        """
+        if not getattr(self, "current_file", None):
+            QMessageBox.warning(self, "Avertissement", "Aucun fichier CSV sélectionné.")
+            return
+        try:
+            index = max(self.series_dropdown.currentIndex(), 0)
+            enregistrement = charger(self.current_file, self.series_data[index] if index else None)
+            modele = "lstm" if enregistrement.nettoye else "ann"
+            resultat = None
+            if service_disponible(modele):
+                try:
+                    # Série choisie : ses trames et sa calibration sont envoyées telles quelles
+                    if index and not enregistrement.nettoye:
+                        resultat = predire(modele, trames=np.hstack([enregistrement.analogique, enregistrement.presence]),
+                                           calibration=enregistrement.calibration)
+                    else:
+                        resultat = predire(modele, fichier=self.current_file)
+                except ServiceIndisponible as e:
+                    print(f"⚠️ {e} : prédiction locale")
+            if resultat is None:
+                if modele == "lstm" or not os.path.exists(os.path.join(DOSSIER_ANN, FICHIER_NUMPY)):
+                    QMessageBox.warning(self, "Service de prédiction",
+                                        "Le service de prédiction n'est pas lancé :\n"
+                                        "python Commun/service_prediction.py --ann ANN --lstm LSTM")
+                    return
+                if getattr(self, "modele_ann", None) is None:
+                    self.modele_ann = ModeleANN(DOSSIER_ANN)  # Lu depuis le .npz, gardé pour les prédictions suivantes
+                resultat = self.modele_ann.predire_lot([self.modele_ann.entree(enregistrement)])[0]
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(self, "Service de prédiction", f"Prédiction impossible : {e}")
+            return
+        probabilites = "\n".join(f"{c} : {p * 100:.2f}%" for c, p in zip(resultat["classes"], resultat["probabilites"]))
+        QMessageBox.information(self, "Prédiction",
+                                f"🧠 Lettre prédite ({modele.upper()}) : {resultat['lettre']}\n\n{probabilites}")
+
     def toggle_graph_view(self):
         """Bascule entre l'affichage du tableau et du graphe."""
         self.show_graph = not self.show_graph
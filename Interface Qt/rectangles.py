@@ -1,11 +1,16 @@
 import sys
-import csv
 import os
+import numpy as np
 from PySide6.QtWidgets import *
 from PySide6.QtGui import QBrush, QColor, QPen, QFont, QKeySequence, QShortcut
 from PySide6.QtCore import Qt, QTimer
 from Code_commande import FullscreenWindow
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Commun"))
+from chargement import charger
+from index_series import lire_index, serie_fichier, titre_serie
+from trames import ordre_electrodes
+
 
 class Rectangles(QWidget):
     def __init__(self, parent=None):
@@ -81,8 +86,7 @@ class Rectangles(QWidget):
 
         self.populate_suggestions()
         
-        """self.series_data = {}  # Stocke les différentes séries de données
-        self.global_headers = []  # Stockera les en-têtes globales
+        self.series_data = []  # Entrées de l'index du fichier : chaque série est lue à la demande
 
         # Menu déroulant pour naviguer dans les séries du CSV
         
@@ -91,13 +95,11 @@ class Rectangles(QWidget):
         self.layout.addWidget(self.label_series, alignment=Qt.AlignCenter)
         
         self.series_dropdown = QComboBox()
-        self.series_dropdown.setFixedSize(200, 30)
+        self.series_dropdown.setFixedSize(280, 30)
         self.series_dropdown.setStyleSheet("border-radius: 5px; padding: 3px;")
         #self.series_dropdown.setToolTip("Sélectionnez une série de données dans le fichier CSV.")
-        #self.series_dropdown.currentIndexChanged.connect(self.load_selected_series)
+        self.series_dropdown.currentIndexChanged.connect(self.load_selected_series)
         self.layout.addWidget(self.series_dropdown, alignment=Qt.AlignCenter)
-        
-        """
 
         # 🎨 Scène graphique
         self.scene = QGraphicsScene()
@@ -229,9 +231,31 @@ class Rectangles(QWidget):
             
             
     def load_csv(self, csv_file):
-        """Charge les données et met à jour l'affichage."""
+        """Liste les séries du fichier d'après son index et affiche la première."""
         self.csv_file = csv_file
-        self.headers, self.data_rows, self.presence_rows = self.load_calibration_data(csv_file)
+        self.series_dropdown.blockSignals(True)  # Ne rien charger pendant le remplissage de la liste
+        self.series_dropdown.clear()
+        self.series_data = []
+        try:
+            index = lire_index(csv_file)
+            for i, serie in enumerate(index["series"]):
+                self.series_dropdown.addItem(f"Série {i+1} : {titre_serie(serie)} ({serie['trames']} trames)")
+                self.series_data.append(serie)
+            if not self.series_data:  # Aucune ligne de calibration reconnue : tout le fichier
+                self.series_dropdown.addItem("Fichier entier")
+                self.series_data.append(serie_fichier(csv_file, index))
+        except Exception as e:
+            print(f"⚠️ Erreur de lecture : {e}")
+            return
+        finally:
+            self.series_dropdown.blockSignals(False)
+        self.load_selected_series(0)
+
+    def load_selected_series(self, index):
+        """Charge la série choisie (seules ses lignes sont lues) et met à jour l'affichage."""
+        if index < 0 or index >= len(self.series_data):
+            return
+        self.headers, self.data_rows, self.presence_rows = self.load_calibration_data(self.csv_file, self.series_data[index])
 
         if self.headers:
             self.scene.clear()
@@ -249,76 +273,20 @@ class Rectangles(QWidget):
         else:
             print("⚠️ Erreur de lecture : les données n'ont pas été chargées correctement.")
     
-    def load_calibration_data(self, csv_file):
-        """Charge les données CSV et filtre les capteurs avec calibration à 1000."""
+    def load_calibration_data(self, csv_file, serie):
+        """Charge une série du CSV et garde les capteurs actifs, dans l'ordre physique des électrodes (5 à 8 inversées)."""
         try:
-            with open(csv_file, newline='', encoding='utf-8') as file:
-                reader = csv.reader(file)
-                rows = [row for row in reader if row]
-
-                if len(rows) < 2:
-                    return None, None, None
-
-                headers = rows[0][1:34]
-                base_values = rows[1][1:17]
-                # 🔄 Réorganisation des colonnes 5 à 9
-                # Ordre souhaité : 1, 2, 3, 4, 5, 9, 8, 7, 6, 10, 11, 12, 13, 14, 15, 16, 17
-
-                # 1. Conserver les colonnes 1 à 4
-                reorganized_values = base_values[:4]
-                reorganized_headers = headers[:4]
-                # 2. Inverser les colonnes 5 à 9
-                reorganized_values += base_values[4:8][::-1]
-                reorganized_headers += headers[4:8][::-1]
-                # 3. Ajouter le reste normalement
-                reorganized_values += base_values[8:]
-                reorganized_headers += headers[8:]
-                
-                base_values = reorganized_values
-                headers = reorganized_headers
-                
-                presence_rows = [list(map(int, row[17:34])) for row in rows[1:] if all(cell.isdigit() for cell in row[17:34])]
-
-                filtered_headers = []
-                valid_indices = []
-
-                for i, value in enumerate(base_values):
-                    if int(value) != 1000:
-                        filtered_headers.append(headers[i])
-                        valid_indices.append(i)
-
-                data_rows = []
-                filtered_presence_rows = []
-
-                for row in rows[1:]:
-                    try:
-                        # 🔹 Extraction des valeurs numériques et de présence
-                        numeric_row = [int(row[i + 1]) for i in valid_indices]
-                        presence_row = [int(row[i + 17]) for i in valid_indices]
-
-                        # 🔄 Réorganisation des colonnes 5 à 9
-                        # Ordre souhaité : 1, 2, 3, 4, 5, 9, 8, 7, 6, 10, ...
-                        # 1. Conserver les colonnes 1 à 4
-                        reorganized_numeric = numeric_row[:4]
-                        reorganized_presence = presence_row[:4]
-
-                        # 2. Inverser les colonnes 5 à 9
-                        reorganized_numeric += numeric_row[4:8][::-1]
-                        reorganized_presence += presence_row[4:8][::-1]
-
-                        # 3. Ajouter le reste normalement
-                        reorganized_numeric += numeric_row[8:]
-                        reorganized_presence += presence_row[8:]
-
-                        # 🔄 Ajout des lignes réorganisées aux listes
-                        data_rows.append(reorganized_numeric)
-                        filtered_presence_rows.append(reorganized_presence)
-
-                    except ValueError:
-                        continue
+            enregistrement = charger(csv_file, serie)
+            if enregistrement.nettoye or not len(enregistrement):
+                return None, None, None
 
+            # Capteurs actifs : calibration différente de 1000 et signal différent de 3299
+            actifs = ordre_electrodes(enregistrement.actifs)
+            filtered_headers = ordre_electrodes(np.array(enregistrement.capteurs))[actifs].tolist()
+            data_rows = ordre_electrodes(enregistrement.analogique)[:, actifs].tolist()
+            filtered_presence_rows = ordre_electrodes(enregistrement.presence)[:, actifs].tolist()
 
-                return filtered_headers, data_rows, filtered_presence_rows
+            return filtered_headers, data_rows, filtered_presence_rows
         except Exception as e:
             print(f"⚠️ Erreur de lecture : {e}")
             return None, None, None
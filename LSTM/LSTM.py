@@ -1,21 +1,34 @@
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 import pandas as pd
 import os
+import sys
 import tensorflow as tf
 from tensorflow.keras.models import Sequential, load_model
 from tensorflow.keras.layers import LSTM, Dense, Dropout, Input
 from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau
 from sklearn.model_selection import train_test_split
-from tensorflow.keras.utils import to_categorical
 import joblib
 from PyQt5.QtWidgets import QApplication, QFileDialog, QMessageBox
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Commun"))
+from chargement import charger
+from fenetres import fenetres_jeu
+from flux_tf import flux_fenetres
+from service_prediction import ServiceIndisponible, predire, service_disponible
+from quantification import (BITS_LSTM, FICHIER_LSTM as FICHIER_INT8, QUANTIFIE, modele_quantifie, quantifier,
+                            representatif_lstm)
+from jeu_donnees import compiler
+from lstm_continu import FICHIER as FICHIER_CONTINU, exporter
+
 # 📂 Dossiers à adapter
 train_folder = "Lettres"
 SEQ_LENGTH = 50
+PAS = 1  # Décalage (en trames) entre deux séquences d'entraînement
 NB_FEATURES = 8
 BATCH_SIZE = 256
 EPOCHS = 100
+WORKERS = None  # Processus de lecture des CSV (None : tous les cœurs)
 
 # 🔤 Mapping classes → lettres
 lettres = sorted(os.listdir(train_folder))
@@ -25,24 +38,13 @@ joblib.dump(classe_to_lettre, "lettres.pkl")
 #print("✅ Mapping classe → lettre :", classe_to_lettre)
 
 # 🔄 Charger et séquencer les données
-def charger_donnees(folder):
-    X_data, Y_data = [], []
-    for lettre in lettres:
-        dossier_lettre = os.path.join(folder, lettre)
-        for fichier in os.listdir(dossier_lettre):
-            if fichier.endswith(".csv"):
-                path = os.path.join(dossier_lettre, fichier)
-                df = pd.read_csv(path, header=0).dropna(how='all')
-                data = df.to_numpy()
-
-                # Séquences glissantes
-                if len(data) >= SEQ_LENGTH:
-                    for i in range(len(data) - SEQ_LENGTH + 1):
-                        seq = data[i:i+SEQ_LENGTH]
-                        if seq.shape == (SEQ_LENGTH, NB_FEATURES):
-                            X_data.append(seq)
-                            Y_data.append(lettre_to_classe[lettre])
-    return np.array(X_data, dtype=np.float32), np.array(Y_data, dtype=np.int32)
+def charger_donnees(folder, workers=WORKERS, pas=PAS):
+    # Jeu compilé du dossier (Lettres.jeu.npy) : seuls les CSV nouveaux ou modifiés sont relus
+    jeu = compiler(folder, workers=workers)
+    if jeu.table["colonnes"] != NB_FEATURES:
+        raise ValueError(f"Le dossier {folder} a {jeu.table['colonnes']} colonnes, le LSTM en attend {NB_FEATURES}.")
+    # Séquences glissantes : vues sur le jeu projeté, copiées lot par lot dans le flux tf.data (flux_tf.py)
+    return fenetres_jeu(jeu, SEQ_LENGTH, lettre_to_classe, pas)
 
 
 # 📊 Export Excel
@@ -54,9 +56,9 @@ def exporter_resultats_excel(history):
 # 🧠 Entraînement modèle
 def entrainer_modele():
     print("🔄 Chargement des données...")
-    X, Y = charger_donnees(train_folder)
-    Y_cat = to_categorical(Y, num_classes=len(classe_to_lettre))
-    X_train, X_test, Y_train, Y_test = train_test_split(X, Y_cat, test_size=0.2, random_state=42)
+    fenetres = charger_donnees(train_folder)
+    # Même découpage qu'avant (il ne dépend que du nombre de séquences), fait sur les indices
+    indices_train, indices_test = train_test_split(np.arange(len(fenetres)), test_size=0.2, random_state=42)
 
     model = Sequential([
         Input(shape=(SEQ_LENGTH, NB_FEATURES)),
@@ -73,14 +75,19 @@ def entrainer_modele():
 
     print("🚀 Entraînement...")
     history = model.fit(
-        X_train, Y_train,
-        validation_data=(X_test, Y_test),
+        flux_fenetres(fenetres, indices_train, len(classe_to_lettre), BATCH_SIZE),
+        validation_data=flux_fenetres(fenetres, indices_test, len(classe_to_lettre), BATCH_SIZE, melanger=False),
         epochs=EPOCHS,
-        batch_size=BATCH_SIZE,
         callbacks=callbacks
     )
     model.save("model_lstm.keras")
     print("✅ Modèle sauvegardé → model_lstm.keras")
+    if os.path.exists(FICHIER_INT8):
+        # Modèle quantifié de l'ancien modèle : recréé pour le nouveau (sinon il est refusé à la prédiction)
+        quantifier(model, representatif_lstm(train_folder, SEQ_LENGTH), FICHIER_INT8, BITS_LSTM, "model_lstm.keras")
+        print(f"✅ Modèle quantifié recréé → {FICHIER_INT8}")
+    # Poids pour la reconnaissance trame par trame en NumPy (Commun/lstm_continu.py)
+    exporter(model, [classe_to_lettre[i] for i in range(len(classe_to_lettre))], FICHIER_CONTINU)
     exporter_resultats_excel(history.history)
     afficher_message("✅ Entraînement terminé et modèle sauvegardé.")
 
@@ -117,41 +124,52 @@ def exporter_prediction_excel(fichier_csv, moyenne, lettre_pred):
 
 # 🔮 Prédiction CSV (filtrage confiance > 90%)
 def predire_csv(csv_path):
-    modele = load_model("model_lstm.keras")
-    classe_to_lettre = joblib.load("lettres.pkl")
-
-    df = pd.read_csv(csv_path, header=0).dropna(how='all')
-    data = df.to_numpy()
-
-    # Padding si nécessaire
-    if data.shape[0] < SEQ_LENGTH:
-        pad = np.zeros((SEQ_LENGTH - data.shape[0], NB_FEATURES))
-        data = np.vstack([data, pad])
-
-    # Génération des séquences
-    sequences = [data[i:i+SEQ_LENGTH] for i in range(len(data) - SEQ_LENGTH + 1)]
-    if not sequences:
-        sequences = [data[:SEQ_LENGTH]]
-    sequences = np.array(sequences).astype(np.float32)
-
-    # Prédiction pour chaque séquence
-    predictions = modele.predict(sequences)
-
-    # 🔍 Filtrage : garder uniquement les séquences avec une confiance > 90%
-    predictions_filtrees = []
-    for pred in predictions:
-        confiance_max = np.max(pred)
-        if confiance_max >= 0.98:
-            predictions_filtrees.append(pred)
-
-    if predictions_filtrees:
-        moyenne = np.mean(predictions_filtrees, axis=0)
-        classe_pred = np.argmax(moyenne)
-        lettre_pred = classe_to_lettre.get(classe_pred, f"Inconnue ({classe_pred})")
+    resultat = None
+    if service_disponible("lstm"):
+        # Service de prédiction lancé (Commun/service_prediction.py) : modèle déjà chargé
+        try:
+            resultat = predire("lstm", fichier=csv_path)
+        except ServiceIndisponible as e:
+            print(f"⚠️ {e} : prédiction locale")
+    if resultat is not None:
+        moyenne, lettre_pred = np.array(resultat["probabilites"]), resultat["lettre"]
+        if not resultat["confiantes"]:
+            print("⚠️ Aucune séquence avec confiance > 90% détectée.")
     else:
-        print("⚠️ Aucune séquence avec confiance > 90% détectée.")
-        moyenne = np.zeros(len(classe_to_lettre))
-        lettre_pred = "Inconnue"
+        # Modèle quantifié (Commun/quantification.py) seulement si demandé et à jour, sinon le modèle Keras
+        modele = modele_quantifie(FICHIER_INT8, "model_lstm.keras") if QUANTIFIE else None
+        if modele is None:
+            modele = load_model("model_lstm.keras")
+        classe_to_lettre = joblib.load("lettres.pkl")
+
+        data = charger(csv_path).analogique
+
+        # Padding si nécessaire
+        if data.shape[0] < SEQ_LENGTH:
+            pad = np.zeros((SEQ_LENGTH - data.shape[0], NB_FEATURES))
+            data = np.vstack([data, pad])
+
+        # Génération des séquences (vue glissante, une seule copie en float32)
+        sequences = sliding_window_view(data, SEQ_LENGTH, axis=0).transpose(0, 2, 1).astype(np.float32)
+
+        # Prédiction pour chaque séquence
+        predictions = modele.predict(sequences)
+
+        # 🔍 Filtrage : garder uniquement les séquences avec une confiance > 90%
+        predictions_filtrees = []
+        for pred in predictions:
+            confiance_max = np.max(pred)
+            if confiance_max >= 0.98:
+                predictions_filtrees.append(pred)
+
+        if predictions_filtrees:
+            moyenne = np.mean(predictions_filtrees, axis=0)
+            classe_pred = np.argmax(moyenne)
+            lettre_pred = classe_to_lettre.get(classe_pred, f"Inconnue ({classe_pred})")
+        else:
+            print("⚠️ Aucune séquence avec confiance > 90% détectée.")
+            moyenne = np.zeros(len(classe_to_lettre))
+            lettre_pred = "Inconnue"
 
     print(f"🔍 Lettre prédite : {lettre_pred}")
     afficher_message(f"🔮 Lettre prédite : {lettre_pred}")
@@ -1,58 +1,112 @@
-import pandas as pd
+"""Nettoyage des enregistrements pour le LSTM : arborescence source (CSV bruts) -> arborescence nettoyée.
+
+Chaque CSV de la source est réécrit au même chemin relatif dans la destination, avec seulement les
+8 premières colonnes capteurs actives, normalisées par leur maximum (sans les valeurs 3299, 1000 et 0).
+Le manifeste de la destination (manifeste_nettoyage.json) garde l'empreinte de chaque source et les
+paramètres du nettoyage : un fichier déjà nettoyé avec les mêmes paramètres n'est pas refait, et les
+sorties dont la source a disparu sont supprimées. Les fichiers sont nettoyés sur plusieurs processus.
+
+    python nettoyage_csv.py ../Outils/Test ../Outils/Test_nettoyé [--workers 4] [--forcer]
+"""
+import argparse
+import json
 import os
-
-# Définir les chemins des dossiers
-input_folder = ""
-output_folder = ""
-
-# Créer le dossier de sortie s'il n'existe pas
-os.makedirs(output_folder, exist_ok=True)
-
-# Lister tous les fichiers CSV du dossier d'entrée
-csv_files = [f for f in os.listdir(input_folder) if f.endswith(".csv")]
-
-# Boucle sur chaque fichier CSV
-for file in csv_files:
-    file_path = os.path.join(input_folder, file)
-
-    # Charger le fichier CSV
-    df = pd.read_csv(file_path)
-
-    # Convertir en numérique et supprimer les lignes non valides
-    df_cleaned = df.apply(pd.to_numeric, errors='coerce')
-    df_cleaned = df_cleaned.dropna(how='all', axis=1)
-    df_cleaned = df_cleaned.dropna(how='any')
-
-    # Supprimer la colonne Timestamp si elle existe
-    if 'Timestamp' in df_cleaned.columns:
-        df_cleaned = df_cleaned.drop(columns=['Timestamp'])
-
-    # Étape 1 : Identifier les colonnes actives en utilisant la ligne de calibration
-    colonnes_a_garder = []
-    for col in df_cleaned.columns:
-        premiere_valeur = df_cleaned[col].iloc[0]  # Prendre la valeur de calibration
-        if premiere_valeur != 1000 and any(df_cleaned[col] != 3299):  # Capteur actif
-            colonnes_a_garder.append(col)
-
-    # Garder uniquement les colonnes actives
-    df_filtered = df_cleaned[colonnes_a_garder]
-
-    # Étape 2 : Ne garder que les 8 premières colonnes après le filtrage
-    df_filtered = df_filtered.iloc[:, :8]  # Sélectionne uniquement les 8 premières colonnes
-
-    # Étape 3 : Exclure les valeurs 3299, 1000 et 0 pour la normalisation
-    valid_values = df_filtered[(df_filtered != 3299) & (df_filtered != 1000) & (df_filtered != 0)]
-    global_max_valid = valid_values.max().max()
-
-    # Appliquer la normalisation avec ce max
-    df_global_normalized_corrected = df_filtered / global_max_valid
-
-    # Définir le chemin du fichier de sortie
-    output_path = os.path.join(output_folder, file)
-
-    # Sauvegarde du fichier normalisé
-    df_global_normalized_corrected.to_csv(output_path, index=False)
-
-    print(f"✅ {file} traité et enregistré sous : {output_path}")
-
-print("🚀 Tous les fichiers ont été traités avec succès !")
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Commun"))
+from caracteristiques import NB_CANAUX as NB_COLONNES, VALEURS_EXCLUES, nettoyer
+from chargement import charger
+from jeu_donnees import empreinte, lire_fichiers
+
+VERSION = 1
+MANIFESTE = "manifeste_nettoyage.json"
+
+
+def nettoyer_fichier(tache):
+    """Nettoie un fichier (source, sortie, nb_colonnes) ; rend le nombre de trames écrites (appelée dans les processus)."""
+    source, sortie, nb_colonnes = tache
+    df = nettoyer(charger(source), nb_colonnes)
+    if df is None:
+        return 0
+    os.makedirs(os.path.dirname(sortie), exist_ok=True)
+    df.to_csv(sortie, index=False)
+    return len(df)
+
+
+def lister_sources(source, destination):
+    """CSV de l'arborescence source (chemins relatifs triés), sans la destination si elle est dedans."""
+    destination = os.path.abspath(destination)
+    fichiers = []
+    for dossier, sous_dossiers, noms in os.walk(source):
+        sous_dossiers[:] = sorted(d for d in sous_dossiers if os.path.abspath(os.path.join(dossier, d)) != destination)
+        fichiers += [os.path.relpath(os.path.join(dossier, nom), source) for nom in noms if nom.endswith(".csv")]
+    return sorted(fichiers)
+
+
+def _lire_manifeste(chemin):
+    try:
+        with open(chemin, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def nettoyer_dossier(source, destination, nb_colonnes=NB_COLONNES, workers=None, forcer=False):
+    """Met à jour l'arborescence nettoyée : seuls les fichiers nouveaux ou modifiés (ou tous avec forcer) sont refaits."""
+    debut = time.perf_counter()
+    chemin_manifeste = os.path.join(destination, MANIFESTE)
+    parametres = {"version": VERSION, "colonnes": nb_colonnes, "valeurs_exclues": list(VALEURS_EXCLUES)}
+    manifeste = _lire_manifeste(chemin_manifeste)
+    anciens = manifeste.get("fichiers", {}) if manifeste.get("parametres") == parametres and not forcer else {}
+
+    fichiers, taches, a_jour = {}, [], 0
+    for relatif in lister_sources(source, destination):
+        chemin, sortie = os.path.join(source, relatif), os.path.join(destination, relatif)
+        etat = os.stat(chemin)
+        entree = {"taille": etat.st_size, "mtime_ns": etat.st_mtime_ns}
+        ancien = anciens.get(relatif)
+        if ancien and (ancien["taille"], ancien["mtime_ns"]) == (entree["taille"], entree["mtime_ns"]):
+            entree["empreinte"] = ancien["empreinte"]
+        else:
+            entree["empreinte"] = empreinte(chemin)
+        if ancien and ancien["empreinte"] == entree["empreinte"] and (not ancien["trames"] or os.path.exists(sortie)):
+            entree["trames"] = ancien["trames"]
+            a_jour += 1
+        else:
+            taches.append((relatif, (chemin, sortie, nb_colonnes)))
+        fichiers[relatif] = entree
+
+    for (relatif, _), trames in zip(taches, lire_fichiers([t for _, t in taches], nettoyer_fichier, workers)):
+        fichiers[relatif]["trames"] = trames
+        if trames:
+            print(f"✅ {relatif} traité et enregistré sous : {os.path.join(destination, relatif)}")
+        else:
+            print(f"⚠️ {relatif} ignoré : aucune trame")
+
+    # Sorties dont la source a disparu (ou qui n'a plus de trames)
+    for relatif, ancien in manifeste.get("fichiers", {}).items():
+        sortie = os.path.join(destination, relatif)
+        if ancien.get("trames") and not fichiers.get(relatif, {}).get("trames") and os.path.exists(sortie):
+            os.remove(sortie)
+            print(f"🗑️ {relatif} supprimé (source absente)")
+
+    os.makedirs(destination, exist_ok=True)
+    temporaire = chemin_manifeste + ".tmp"
+    with open(temporaire, "w", encoding="utf-8") as f:
+        json.dump({"parametres": parametres, "fichiers": fichiers}, f, ensure_ascii=False, indent=1)
+    os.replace(temporaire, chemin_manifeste)
+    print(f"🚀 {len(fichiers)} fichiers : {len(taches)} nettoyés, {a_jour} déjà à jour "
+          f"({(time.perf_counter() - debut) * 1000:.0f} ms)")
+    return fichiers
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Nettoie une arborescence de CSV bruts pour le LSTM")
+    parser.add_argument("source")
+    parser.add_argument("destination")
+    parser.add_argument("--colonnes", type=int, default=NB_COLONNES, help="nombre de colonnes capteurs gardées")
+    parser.add_argument("--workers", type=int, default=None, help="processus de nettoyage (défaut : tous les cœurs)")
+    parser.add_argument("--forcer", action="store_true", help="refait tous les fichiers")
+    args = parser.parse_args()
+    nettoyer_dossier(args.source, args.destination, args.colonnes, args.workers, args.forcer)
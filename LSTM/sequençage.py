@@ -1,69 +1,79 @@
 import os
+import sys
 import numpy as np
-import pandas as pd
 import joblib
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Commun"))
+from chargement import charger
+from fenetres import Fenetres, indices_fenetres
+from jeu_donnees import lire_fichiers
+
 
 # 📌 Paramètres
 input_base_folder = "C:\\Users\\brice\\OneDrive\\Documents\\5A GPSE\\Projet nanomade\\Code alternatif\\Nettoyage csv"
 seq_length = 10  # Nombre de timestamps dans une séquence
+pas = 1  # Décalage (en trames) entre deux séquences
+workers = None  # Processus de lecture des CSV (None : tous les cœurs)
+
+
+def lire_fichier(file_path):
+    """Trames d'un CSV nettoyé, ou None s'il est vide ou illisible (appelée dans les processus de lecture)."""
+    # 🔍 Vérifier que le fichier n'est pas vide
+    if os.path.getsize(file_path) == 0:
+        print(f"⚠️ Fichier vide ignoré : {file_path}")
+        return None
+
+    try:
+        data = charger(file_path).analogique
+    except Exception as e:
+        print(f"❌ Erreur lors de la lecture du fichier {file_path} : {e}")
+        return None
+
+    # Vérifier si le fichier est bien formaté (éviter les fichiers corrompus)
+    if data.shape[1] == 0:
+        print(f"⚠️ Fichier corrompu ignoré : {file_path}")
+        return None
+    return data
+
+
+if __name__ == "__main__":
+    # 🔄 Parcourir chaque dossier de lettre (ex: A, B, C)
+    letters = sorted(os.listdir(input_base_folder))  # Ex: ["A", "B", "C"]
+    fichiers, classes = [], []
+
+    for letter_index, letter_folder in enumerate(letters):
+        letter_path = os.path.join(input_base_folder, letter_folder)
+
+        if not os.path.isdir(letter_path):
+            continue  # Ignore les fichiers, on ne garde que les dossiers
+
+        print(f"📂 Traitement du dossier {letter_folder}...")
+
+        # Lister tous les fichiers CSV du dossier
+        csv_files = [f for f in os.listdir(letter_path) if f.lower().endswith(".csv")]  # 🔹 Vérifie l'extension en minuscule
+        fichiers += [os.path.join(letter_path, file) for file in csv_files]
+        classes += [letter_index] * len(csv_files)
+
+    # Lecture sur plusieurs processus, résultats dans l'ordre des fichiers
+    lus = [(letter_index, data) for letter_index, data in zip(classes, lire_fichiers(fichiers, lire_fichier, workers))
+           if data is not None]
+
+    # Trames de tous les fichiers bout à bout ; une séquence = indice de sa première trame (pas de copie par séquence)
+    donnees = np.concatenate([data for _, data in lus]) if lus else np.zeros((0, 0))
+    lignes = [len(data) for _, data in lus]
+    debuts_fichiers = np.cumsum([0] + lignes[:-1])
+    # Comme avant, la dernière séquence de chaque fichier n'est pas prise (d'où lignes - 1)
+    debuts = indices_fenetres(debuts_fichiers, [n - 1 for n in lignes], seq_length, pas)
+    Y_data = np.array([letter_index for letter_index, _ in lus])[np.searchsorted(debuts_fichiers, debuts, side="right") - 1]
+
+    # Sauvegarde des fichiers pour le LSTM : les séquences se retrouvent avec
+    # Fenetres(np.load("donnees.npy", mmap_mode="r"), np.load("debuts.npy"), np.load("Y_train.npy"), seq_length)
+    output_folder = input_base_folder  # On enregistre dans le même dossier que les données traitées
+    np.save(os.path.join(output_folder, "donnees.npy"), donnees)
+    np.save(os.path.join(output_folder, "debuts.npy"), debuts)
+    np.save(os.path.join(output_folder, "Y_train.npy"), Y_data)
+
+    joblib.dump(letters, os.path.join(output_folder, "lettres.pkl"))
 
-# 🔄 Parcourir chaque dossier de lettre (ex: A, B, C)
-X_data, Y_data = [], []
-letters = sorted(os.listdir(input_base_folder))  # Ex: ["A", "B", "C"]
-
-for letter_index, letter_folder in enumerate(letters):
-    letter_path = os.path.join(input_base_folder, letter_folder)
-    
-    if not os.path.isdir(letter_path):
-        continue  # Ignore les fichiers, on ne garde que les dossiers
-
-    print(f"📂 Traitement du dossier {letter_folder}...")
-
-    # Parcourir tous les fichiers CSV du dossier
-    csv_files = [f for f in os.listdir(letter_path) if f.lower().endswith(".csv")]  # 🔹 Vérifie l'extension en minuscule
-    
-    for file in csv_files:
-        file_path = os.path.join(letter_path, file)
-        
-        # 🔍 Vérifier si le fichier est bien un CSV et n'est pas vide
-        if not file.lower().endswith(".csv"):
-            print(f"⚠️ Fichier ignoré (pas un CSV) : {file_path}")
-            continue
-        
-        if os.path.getsize(file_path) == 0:
-            print(f"⚠️ Fichier vide ignoré : {file_path}")
-            continue
-        
-        try:
-            # Charger les données
-            df = pd.read_csv(file_path)
-            
-            # Vérifier si le fichier est bien formaté (éviter les fichiers corrompus)
-            if df.shape[1] == 0:
-                print(f"⚠️ Fichier corrompu ignoré : {file_path}")
-                continue
-            
-            data = df.to_numpy()
-
-            # Vérifier si le fichier contient assez de données
-            if len(data) > seq_length:
-                for i in range(len(data) - seq_length):
-                    X_data.append(data[i:i+seq_length])   # Séquence de 10 timestamps
-                    Y_data.append(letter_index)  # Classe associée (0=A, 1=B, 2=C...)
-
-        except Exception as e:
-            print(f"❌ Erreur lors de la lecture du fichier {file_path} : {e}")
-
-# Convertir en tableaux NumPy
-X_data = np.array(X_data)
-Y_data = np.array(Y_data)
-
-# Sauvegarde des fichiers pour le LSTM
-output_folder = input_base_folder  # On enregistre dans le même dossier que les données traitées
-np.save(os.path.join(output_folder, "X_train.npy"), X_data)
-np.save(os.path.join(output_folder, "Y_train.npy"), Y_data)
-
-joblib.dump(letters, os.path.join(output_folder, "lettres.pkl"))
-
-print(f"✅ Séquences générées et enregistrées : {X_data.shape} pour X, {Y_data.shape} pour Y")
+    sequences = Fenetres(donnees, debuts, Y_data, seq_length)
+    print(f"✅ Séquences générées et enregistrées : {(len(sequences), *sequences.forme)} pour X, {Y_data.shape} pour Y")
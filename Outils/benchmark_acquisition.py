@@ -0,0 +1,314 @@
+"""Banc de mesure de l'acquisition : débit soutenu, coût par trame, latence et pertes de chaque lecteur.
+
+Chaque lecteur (SerialWidget.read_from_sensor de l'interface, MainWindow.read_from_sensor du prototype,
+read_from_sensor de prise_de_données_auto.py) est exécuté tel quel contre le capteur simulé, à des cadences
+croissantes. Les trames rejouées sont numérotées (colonne U_F_8, inactive sur le kit) pour mesurer la latence
+entre l'arrivée des octets dans le tampon du port et l'écriture de la ligne CSV correspondante.
+
+Mesures par lecteur et par cadence :
+    - trames/s soutenues (trames écrites / durée) ;
+    - coût CPU par trame : thread de lecture (analyse) + thread d'écriture (mise en forme CSV) ;
+    - latence arrivée -> ligne CSV (médiane, p95, p99, max) ;
+    - utilisation CPU du processus (capteur simulé compris) ;
+    - trames perdues (tampon du port plein) et lignes illisibles (trames tronquées).
+Le rapport JSON permet de comparer deux versions : --reference ancien.json signale toute baisse de débit.
+
+    python benchmark_acquisition.py --frequences 100 500 2000 --duree 3 --sortie rapport.json
+"""
+import argparse
+import contextlib
+import csv
+import datetime
+import glob
+import importlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+import types
+from collections import deque
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Commun"))
+from acquisition import ConditionArret
+from enregistreur import Enregistreur, ENTETE_CSV, LotTrames
+from format_binaire import formater_horodatages
+from lecture_serie import LecteurSerie
+from simulateur import CapteurSimule, Enregistrement
+from trames import AnalyseurTrames, NB_CANAUX
+
+RACINE = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path += [os.path.join(RACINE, "Interface Qt"), os.path.join(RACINE, "Prototype"), os.path.join(RACINE, "Outils")]
+
+COLONNE_NUMERO = NB_CANAUX - 1  # U_F_8 : capteur absent sur le kit, utilisé pour numéroter les trames
+NUMERO_MAX = 65535
+FREQUENCES = [50, 100, 200, 500, 1000, 2000, 5000, 10000, 20000]
+BAUDRATE = 430000
+
+
+def charger_trames(repertoire_source, nb_trames):
+    """Calibration et trames réelles (listes de 32 valeurs texte) des enregistrements bruts du dossier source."""
+    fichiers = [f for f in sorted(glob.glob(os.path.join(repertoire_source, "*", "*.csv"))) if "nettoy" not in f]
+    lignes, calibration = [], None
+    for fichier in fichiers:
+        enregistrement = Enregistrement(fichier)
+        calibration = calibration or enregistrement.calibration
+        lignes += [[v.decode() for v in l.split()] for l in enregistrement.lignes]
+        if len(lignes) >= nb_trames:
+            break
+    return calibration, lignes
+
+
+def creer_enregistrement_numerote(destination, calibration, lignes, nb_trames):
+    """Écrit un enregistrement CSV de `nb_trames` trames (rejouées en boucle), numérotées dans U_F_8."""
+    horodatages = formater_horodatages(np.datetime64("2025-01-01", "ns").astype(np.int64)
+                                       + np.arange(nb_trames, dtype=np.int64) * 20_000_000)
+    with open(destination, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(ENTETE_CSV)
+        writer.writerow([horodatages[0], *calibration.split()])
+        for i in range(nb_trames):
+            valeurs = list(lignes[i % len(lignes)])
+            valeurs[COLONNE_NUMERO] = str(i)
+            writer.writerow([horodatages[i], *valeurs])
+
+
+class EnregistreurChronometre(Enregistreur):
+    """Enregistreur CSV qui note l'instant d'écriture de chaque trame numérotée et le CPU du thread d'écriture."""
+
+    def __init__(self, *args, **kwargs):
+        self.ecritures = []  # (numéros des trames, instant perf_counter_ns)
+        self.cpu_ecriture = 0.0
+        super().__init__(*args, **kwargs)
+
+    def _ecrire_lot(self, lot):
+        debut = time.thread_time()
+        super()._ecrire_lot(lot)
+        instant = time.perf_counter_ns()
+        self.cpu_ecriture += time.thread_time() - debut
+        numeros = [element.trames["analogique"][:, COLONNE_NUMERO].astype(np.int64)
+                   for element in lot if isinstance(element, LotTrames)]
+        if numeros:
+            self.ecritures.append((np.concatenate(numeros), instant))
+
+
+def lecteur_interface(port, enregistreur, duree):
+    """SerialWidget.read_from_sensor (interface Qt), arrêté par le drapeau is_connected."""
+    module = importlib.import_module("Code_commande")
+    widget = types.SimpleNamespace(
+        is_connected=True, ser=port, enregistreur=enregistreur,
+        lecteur=LecteurSerie(port, AnalyseurTrames(capacite=64, reordonner=False)),
+        active_mask=None, headers=[], sensor_data=None, calibration=None,
+        output_display=types.SimpleNamespace(append=print),
+    )
+    for nom in ("update_sensor_state", "save_lot_to_csv"):
+        setattr(widget, nom, types.MethodType(getattr(module.SerialWidget, nom), widget))
+    minuteur = threading.Timer(duree, lambda: setattr(widget, "is_connected", False))
+    minuteur.start()
+    module.SerialWidget.read_from_sensor(widget)
+    return widget.lecteur
+
+
+def lecteur_prototype(port, enregistreur, duree):
+    """MainWindow.read_from_sensor (prototype), arrêté par une condition de durée."""
+    module = importlib.import_module("prototype_ia")
+    fenetre = types.SimpleNamespace(
+        ser=port, enregistreur=enregistreur, lock=threading.Lock(), num_channels_to_plot=8,
+        lecteur=LecteurSerie(port, AnalyseurTrames(capacite=64, reordonner=False)),
+        data_buffers=[deque(maxlen=250) for _ in range(8)], time_buffer=deque(maxlen=250),
+    )
+    for nom in ("save_lot_to_csv", "ajouter_au_graphe", "enregistrer_lot"):
+        setattr(fenetre, nom, types.MethodType(getattr(module.MainWindow, nom), fenetre))
+    module.MainWindow.read_from_sensor(fenetre, enregistreur.filename, ConditionArret(duree=duree))
+    return fenetre.lecteur
+
+
+def lecteur_prise_de_donnees(port, enregistreur, duree):
+    """read_from_sensor de prise_de_données_auto.py, arrêté après `duree` secondes."""
+    module = sys.modules.get("prise_de_données_auto")
+    if module is None:
+        # Le script ouvre son port à l'import : on lui donne un capteur simulé le temps de l'import
+        os.environ["NANOMADE_PORT"] = f"simulateur://{port.moteur.fichiers[0]}?frequence=1"
+        module = importlib.import_module("prise_de_données_auto")
+        module.ser.close()
+    module.ser = port
+    module.lecteur = LecteurSerie(port, module.analyseur)
+    module.read_from_sensor(enregistreur, duration=duree)
+    return module.lecteur
+
+
+LECTEURS = {
+    "interface": lecteur_interface,
+    "prototype": lecteur_prototype,
+    "prise_de_donnees": lecteur_prise_de_donnees,
+}
+
+
+def percentiles_ms(latences_ns):
+    if len(latences_ns) == 0:
+        return None
+    p50, p95, p99 = np.percentile(latences_ns, [50, 95, 99]) / 1e6
+    return {"p50": round(p50, 3), "p95": round(p95, 3), "p99": round(p99, 3), "max": round(latences_ns.max() / 1e6, 3)}
+
+
+def mesurer(nom, fonction, trames, frequence, duree, taille_tampon, repertoire):
+    """Exécute un lecteur contre le capteur simulé à `frequence` trames/s ; renvoie les mesures."""
+    nb_trames = int(min(frequence * duree, NUMERO_MAX + 1))
+    duree = nb_trames / frequence
+    source = os.path.join(repertoire, f"source_{frequence}.csv")
+    if not os.path.exists(source):
+        creer_enregistrement_numerote(source, *trames, nb_trames)
+    # Le capteur s'arrête après la dernière trame numérotée ; le lecteur a ensuite 0.5 s pour vider le port
+    port = CapteurSimule(source, frequence=frequence, boucle=False, timeout=1, taille_tampon=taille_tampon)
+    port.moteur.journal = []
+    enregistreur = EnregistreurChronometre(os.path.join(repertoire, f"{nom}_{frequence}.csv"), entete=ENTETE_CSV)
+    port.write(b"K\nR\n")
+
+    resultat = {}
+    cpu_lecture = []
+
+    def executer():
+        debut_thread = time.thread_time()
+        try:
+            resultat["lecteur"] = fonction(port, enregistreur, duree + 0.5)
+        except Exception as e:
+            resultat["erreur"] = repr(e)
+        cpu_lecture.append(time.thread_time() - debut_thread)
+
+    debut_cpu, debut = time.process_time(), time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        thread = threading.Thread(target=executer)
+        thread.start()
+        thread.join()
+        enregistreur.fermer()
+    duree_reelle = time.perf_counter() - debut
+    cpu_processus = time.process_time() - debut_cpu
+    port.close()
+    if "erreur" in resultat:
+        return {"lecteur": nom, "frequence_demandee": frequence, "erreur": resultat["erreur"]}
+
+    # Latence : instant d'écriture de la ligne - instant d'arrivée des octets de la même trame
+    journal = np.array(port.moteur.journal, dtype=np.int64).reshape(-1, 3)
+    latences, ecrites = [], []
+    for numeros, instant in enregistreur.ecritures:
+        indices = np.searchsorted(journal[:, 1], numeros, side="right")
+        valides = indices < len(journal)
+        latences.append(instant - journal[indices[valides], 2])
+        ecrites.append(numeros)
+    latences = np.concatenate(latences) if latences else np.zeros(0, dtype=np.int64)
+    ecrites = np.concatenate(ecrites) if ecrites else np.zeros(0, dtype=np.int64)
+
+    stats_port = port.statistiques()
+    lecteur = resultat["lecteur"]
+    nb_ecrites = len(np.unique(ecrites))
+    cout_lecture = cpu_lecture[0] / max(nb_ecrites, 1) * 1e6
+    cout_ecriture = enregistreur.cpu_ecriture / max(nb_ecrites, 1) * 1e6
+    return {
+        "lecteur": nom,
+        "frequence_demandee": frequence,
+        "duree_s": round(duree_reelle, 3),
+        "trames_envoyees": nb_trames,
+        "trames_emises": stats_port["trames_emises"],
+        "trames_perdues_port": stats_port["trames_perdues"],
+        "octets_perdus_port": stats_port["octets_perdus"],
+        "trames_ecrites": nb_ecrites,
+        "trames_manquantes": nb_trames - nb_ecrites,
+        "lignes_illisibles": lecteur.lignes_invalides,
+        "trames_par_s": round(nb_ecrites / duree, 1),
+        "cout_lecture_us": round(cout_lecture, 2),
+        "cout_ecriture_us": round(cout_ecriture, 2),
+        "cout_par_trame_us": round(cout_lecture + cout_ecriture, 2),
+        "latence_ms": percentiles_ms(latences),
+        "cpu_pourcent": round(100 * cpu_processus / duree_reelle, 1),
+    }
+
+
+def debit_soutenu(resultats):
+    """Plus haute cadence tenue sans perte ni ligne illisible (0 si aucune)."""
+    tenues = [r["frequence_demandee"] for r in resultats
+              if "erreur" not in r and r["trames_manquantes"] == 0 and r["lignes_illisibles"] == 0]
+    return max(tenues, default=0)
+
+
+def comparer(rapport, reference, tolerance):
+    """Affiche les écarts avec un rapport précédent ; renvoie False si un débit soutenu a baissé."""
+    correct = True
+    for nom, synthese in rapport["synthese"].items():
+        ancien = reference.get("synthese", {}).get(nom)
+        if not ancien or "debit_soutenu" not in synthese:
+            continue
+        print(f"   {nom:<18} débit soutenu {ancien['debit_soutenu']} -> {synthese['debit_soutenu']} trames/s, "
+              f"coût {ancien['cout_par_trame_us']} -> {synthese['cout_par_trame_us']} µs/trame")
+        if synthese["debit_soutenu"] < ancien["debit_soutenu"]:
+            print(f"   ❌ Régression du débit soutenu pour {nom}")
+            correct = False
+        if synthese["cout_par_trame_us"] > ancien["cout_par_trame_us"] * (1 + tolerance):
+            print(f"   ⚠️ Coût par trame en hausse de plus de {tolerance:.0%} pour {nom}")
+    return correct
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Banc de mesure de l'acquisition (capteur simulé).")
+    parser.add_argument("--lecteurs", nargs="+", choices=list(LECTEURS), default=list(LECTEURS))
+    parser.add_argument("--frequences", nargs="+", type=int, default=FREQUENCES, help="Cadences en trames/s")
+    parser.add_argument("--duree", type=float, default=3.0, help="Durée de chaque mesure (s)")
+    parser.add_argument("--tampon", type=int, default=4096, help="Taille du tampon de réception du port (octets)")
+    parser.add_argument("--source", default=os.path.join(RACINE, "Outils", "Test"), help="Enregistrements à rejouer")
+    parser.add_argument("--sortie", default="benchmark_acquisition.json", help="Rapport JSON")
+    parser.add_argument("--reference", help="Rapport précédent à comparer")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Hausse tolérée du coût par trame")
+    args = parser.parse_args()
+
+    repertoire = tempfile.mkdtemp(prefix="nanomade_bench_")
+    trames = charger_trames(args.source, int(min(max(args.frequences) * args.duree, NUMERO_MAX + 1)))
+
+    rapport = {
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "machine": platform.platform(),
+        "processeur": platform.processor() or platform.machine(),
+        "python": platform.python_version(),
+        "tampon_octets": args.tampon,
+        "duree_s": args.duree,
+        # 10 bits par octet sur la liaison série, ~130 octets par trame
+        "limite_liaison_trames_s": round(BAUDRATE / 10 / 130),
+        "resultats": [],
+        "synthese": {},
+    }
+    for nom in args.lecteurs:
+        print(f"\n📊 Lecteur : {nom}")
+        resultats = []
+        for frequence in sorted(args.frequences):
+            r = mesurer(nom, LECTEURS[nom], trames, frequence, args.duree, args.tampon, repertoire)
+            resultats.append(r)
+            if "erreur" in r:
+                print(f"   ⚠️ Indisponible : {r['erreur']}")
+                break
+            latence = r["latence_ms"] or {}
+            print(f"   {frequence:>6} trames/s demandées : {r['trames_par_s']:>8.0f} écrites/s, "
+                  f"{r['cout_par_trame_us']:>6.1f} µs/trame, latence p95 {latence.get('p95', float('nan')):.1f} ms, "
+                  f"CPU {r['cpu_pourcent']:.0f} %, perdues {r['trames_manquantes']}, illisibles {r['lignes_illisibles']}")
+        rapport["resultats"] += resultats
+        mesures = [r for r in resultats if "erreur" not in r]
+        if mesures:
+            rapport["synthese"][nom] = {
+                "debit_soutenu": debit_soutenu(mesures),
+                "cout_par_trame_us": round(float(np.median([r["cout_par_trame_us"] for r in mesures])), 2),
+            }
+        else:
+            rapport["synthese"][nom] = {"erreur": resultats[0]["erreur"]}
+
+    with open(args.sortie, "w", encoding="utf-8") as f:
+        json.dump(rapport, f, indent=2, ensure_ascii=False)
+    print(f"\n💾 Rapport écrit dans {args.sortie}")
+
+    if args.reference:
+        with open(args.reference, encoding="utf-8") as f:
+            reference = json.load(f)
+        print("\n🔎 Comparaison avec", args.reference)
+        if not comparer(rapport, reference, args.tolerance):
+            sys.exit(1)
@@ -0,0 +1,79 @@
+"""Benchmark du chargement des enregistrements : anciennes lectures (ANN, graphe.py, LSTM) contre chargement.py.
+
+Tous les CSV du dépôt (ou du dossier donné) sont lus par chaque méthode ; le temps total et le temps
+moyen par fichier sont affichés. Les vecteurs de l'ANN sont comparés pour vérifier qu'ils sont identiques.
+"""
+import glob
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Commun"))
+from chargement import charger
+from horodatage import vers_datetime
+
+
+def ancien_traiter_csv(chemin_fichier):
+    """Copie de l'ancienne lecture de l'ANN et du prototype (référence)."""
+    df = pd.read_csv(chemin_fichier, header=None, dtype=str)
+    df = df.dropna(how="all")
+    df = df.apply(pd.to_numeric, errors='coerce')
+    df.iloc[:, 0] = np.nan
+    return np.nan_to_num(df.to_numpy().flatten(), nan=0.0)
+
+
+def ancien_graphe(fichier_csv):
+    """Copie de l'ancienne lecture de Outils/graphe.py (référence)."""
+    df = pd.read_csv(fichier_csv, on_bad_lines='skip')
+    df = df.iloc[:, :17]
+    if 'Timestamp' in df.columns:
+        df['Timestamp'] = vers_datetime(df['Timestamp'])
+        df = df.dropna(subset=['Timestamp'])
+    df = df.apply(pd.to_numeric, errors='coerce')
+    colonnes_a_garder = []
+    for col in df.columns[1:17]:
+        if df[col].iloc[0] != 1000 and any(df[col] != 3299):
+            colonnes_a_garder.append(col)
+    index_fin_calibration = 0
+    for i in range(len(df) - 1, -1, -1):
+        if df.iloc[i].isna().any():
+            index_fin_calibration = i + 1
+            break
+    return df[['Timestamp'] + colonnes_a_garder].iloc[index_fin_calibration:]
+
+
+def ancien_lstm(chemin_fichier):
+    """Copie de l'ancienne lecture des fichiers nettoyés par LSTM.py (référence)."""
+    return pd.read_csv(chemin_fichier, header=0).dropna(how='all').to_numpy()
+
+
+def mesurer(nom, fonction, fichiers):
+    debut = time.perf_counter()
+    resultats = [fonction(f) for f in fichiers]
+    duree = time.perf_counter() - debut
+    print(f"{nom:<45} {duree:>8.2f} s  {duree / max(len(fichiers), 1) * 1000:>6.2f} ms/fichier")
+    return duree, resultats
+
+
+if __name__ == "__main__":
+    repertoire = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+    fichiers = sorted(glob.glob(os.path.join(repertoire, "**", "*.csv"), recursive=True))
+    nettoye = {f: charger(f).nettoye for f in fichiers}
+    bruts = [f for f in fichiers if not nettoye[f]]
+    nettoyes = [f for f in fichiers if nettoye[f]]
+    print(f"📊 {len(fichiers)} CSV ({len(bruts)} bruts, {len(nettoyes)} nettoyés) dans {os.path.abspath(repertoire)}\n")
+
+    avant_ann, vecteurs_avant = mesurer("Avant - ANN (texte puis to_numeric)", ancien_traiter_csv, bruts)
+    avant_graphe, _ = mesurer("Avant - graphe.py", ancien_graphe, bruts)
+    avant_lstm, _ = mesurer("Avant - LSTM (fichiers nettoyés)", ancien_lstm, nettoyes)
+    apres_ann, vecteurs_apres = mesurer("Après - chargement.py + vecteur ANN", lambda f: charger(f).vecteur_ann(), bruts)
+    apres_graphe, _ = mesurer("Après - chargement.py + trames actives", lambda f: charger(f).dataframe(), bruts)
+    apres_lstm, _ = mesurer("Après - chargement.py (fichiers nettoyés)", charger, nettoyes)
+
+    identiques = sum(np.array_equal(a, b) for a, b in zip(vecteurs_avant, vecteurs_apres))
+    print(f"\n✅ Vecteurs ANN identiques : {identiques}/{len(bruts)}")
+    avant, apres = avant_ann + avant_graphe + avant_lstm, apres_ann + apres_graphe + apres_lstm
+    print(f"⚡ Total : {avant:.2f} s -> {apres:.2f} s (x{avant / apres:.1f})")
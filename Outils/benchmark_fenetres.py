@@ -0,0 +1,93 @@
+"""Benchmark des séquences du LSTM : copie de toutes les fenêtres (ancien charger_donnees) contre fenetres.py.
+
+Chaque méthode tourne dans son propre processus sur le jeu compilé du dossier (LSTM/Lettres par défaut) et
+parcourt toutes les séquences par lots de 256, comme un entraînement ; le pic de mémoire (RSS) du processus,
+la durée et une somme de contrôle des lots sont affichés. Le pic de mémoire n'est mesuré que sous Linux et macOS.
+
+    python benchmark_fenetres.py [dossier] [--longueur 50] [--pas 1]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Commun"))
+from fenetres import fenetres_jeu
+from jeu_donnees import compiler
+
+TAILLE_LOT = 256
+
+
+def pic_memoire():
+    """Pic de RSS du processus en Mo (None sous Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    pic = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pic / 2 ** 20 if sys.platform == "darwin" else pic / 2 ** 10
+
+
+def avant(jeu, classes, longueur, pas):
+    """Copie de l'ancienne construction (toutes les fenêtres dans une liste, puis np.array)."""
+    X_data, Y_data = [], []
+    for lettre, data in jeu:
+        data = np.array(data, dtype=np.float64)  # L'ancienne lecture rendait des float64
+        if len(data) >= longueur:
+            for i in range(0, len(data) - longueur + 1, pas):
+                X_data.append(data[i:i + longueur])
+                Y_data.append(classes[lettre])
+    X, Y = np.array(X_data, dtype=np.float32), np.array(Y_data, dtype=np.int32)
+    return ((X[i:i + TAILLE_LOT], Y[i:i + TAILLE_LOT]) for i in range(0, len(X), TAILLE_LOT))
+
+
+def apres(jeu, classes, longueur, pas):
+    return fenetres_jeu(jeu, longueur, classes, pas).lots(TAILLE_LOT)
+
+
+def mesurer(methode, dossier, longueur, pas):
+    debut = time.perf_counter()
+    jeu = compiler(dossier, verbeux=False)
+    classes = {lettre: i for i, lettre in enumerate(sorted(set(jeu.lettres)))}
+    nombre, somme = 0, 0.0
+    for X, Y in (avant if methode == "avant" else apres)(jeu, classes, longueur, pas):
+        nombre += len(X)
+        somme += float(X.sum(dtype=np.float64)) + float(Y.sum())
+    return {"duree": time.perf_counter() - debut, "pic_mo": pic_memoire(), "sequences": nombre, "somme": somme,
+            "donnees_mo": jeu.donnees.nbytes / 2 ** 20}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mémoire et temps des séquences du LSTM, avant et après fenetres.py")
+    parser.add_argument("dossier", nargs="?",
+                        default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "LSTM", "Lettres"))
+    parser.add_argument("--longueur", type=int, default=50)
+    parser.add_argument("--pas", type=int, default=1)
+    parser.add_argument("--methode", choices=("avant", "apres"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.methode:
+        print(json.dumps(mesurer(args.methode, args.dossier, args.longueur, args.pas)))
+        sys.exit()
+
+    compiler(args.dossier)  # Le jeu est compilé une fois pour toutes avant les mesures
+    resultats = {}
+    for methode in ("avant", "apres"):
+        sortie = subprocess.run([sys.executable, __file__, args.dossier, "--longueur", str(args.longueur),
+                                 "--pas", str(args.pas), "--methode", methode],
+                                capture_output=True, text=True, check=True).stdout
+        resultats[methode] = json.loads(sortie.strip().splitlines()[-1])
+
+    print(f"\n📊 {resultats['apres']['sequences']} séquences de {args.longueur} trames (pas {args.pas}), "
+          f"jeu de {resultats['apres']['donnees_mo']:.1f} Mo")
+    for methode, nom in (("avant", "Avant - copie de toutes les séquences"), ("apres", "Après - fenêtres par lots")):
+        r = resultats[methode]
+        pic = f"{r['pic_mo']:>8.0f} Mo" if r["pic_mo"] is not None else "       ? Mo"
+        print(f"{nom:<40} {r['duree']:>6.2f} s  pic RSS {pic}")
+    identiques = resultats["avant"]["sequences"] == resultats["apres"]["sequences"] and \
+        np.isclose(resultats["avant"]["somme"], resultats["apres"]["somme"], rtol=1e-9)
+    print(f"{'✅' if identiques else '❌'} Séquences {'identiques' if identiques else 'différentes'}")
@@ -0,0 +1,130 @@
+"""Benchmark du LSTM trame par trame (Commun/lstm_continu.py) contre la prédiction par fenêtres de predire_csv.
+
+Sur une arborescence étiquetée (Outils/Test par défaut), pour chaque méthode : précision par fichier, temps total
+par fichier et délai entre la dernière trame et la lettre. Par fenêtres (Keras si TensorFlow est installé, et
+NumPy), tout le calcul se fait une fois l'enregistrement fini ; en continu, chaque trame coûte un pas de cellule
+pour les séquences en cours (p50 et p99 par trame) et la lettre est prête dès la dernière trame. Deux variantes
+montrent ce que coûte l'approximation : un seul état gardé d'une trame à l'autre, et la normalisation du flux en
+direct (maximum courant). Le .npz est exporté s'il manque.
+
+    python benchmark_lstm_continu.py [dossier du LSTM] [--test Test]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Commun"))
+from caracteristiques import donnees_lstm
+from chargement import charger
+from jeu_donnees import lister_fichiers
+from lstm_continu import FICHIER, INCONNUE, LSTMNumpy, NormalisationContinue, ReconnaissanceContinue, exporter_dossier
+
+RACINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+def fenetres(x, longueur):
+    if len(x) < longueur:
+        x = np.concatenate([x, np.zeros((longueur - len(x), x.shape[1]), np.float32)])
+    return np.lib.stride_tricks.sliding_window_view(x, longueur, axis=0).transpose(0, 2, 1)
+
+
+def lettre_fenetres(probabilites, classes, seuil):
+    confiantes = probabilites[probabilites.max(axis=1) >= seuil]
+    return classes[int(np.argmax(confiantes.mean(axis=0)))] if len(confiantes) else INCONNUE
+
+
+def par_fenetres(predire, reseau, donnees):
+    """Comme predire_csv : toutes les fenêtres du fichier, prédites d'un coup après la dernière trame."""
+    lettres, durees, probabilites = [], [], []
+    for x in donnees:
+        debut = time.perf_counter()
+        p = np.asarray(predire(fenetres(x, reseau.longueur)))
+        lettres.append(lettre_fenetres(p, reseau.classes, 0.98))
+        durees.append(time.perf_counter() - debut)
+        probabilites.append(p)
+    return lettres, durees, durees, [], probabilites
+
+
+def en_continu(reseau, donnees):
+    lettres, totaux, delais, pas, probabilites = [], [], [], [], []
+    for x in donnees:
+        reconnaissance = ReconnaissanceContinue(reseau)
+        sorties = []
+        debut = time.perf_counter()
+        for trame in x:
+            t = time.perf_counter()
+            p = reconnaissance.ajouter(trame)
+            pas.append(time.perf_counter() - t)
+            if p is not None:
+                sorties.append(p)
+        t = time.perf_counter()
+        resultat = reconnaissance.terminer()
+        fin = time.perf_counter()
+        lettres.append(resultat["lettre"])
+        totaux.append(fin - debut)
+        delais.append(fin - t + pas[-1])  # Dernière trame et lecture de l'estimation
+        probabilites.append(np.array(sorties) if sorties else np.zeros((0, len(reseau.classes))))
+    return lettres, totaux, delais, pas, probabilites
+
+
+def etat_unique(reseau, donnees):
+    """Un seul état (h, c) gardé d'une trame à l'autre : une sortie par trame à partir de la longueur des séquences."""
+    lettres = []
+    for x in donnees:
+        h, c = np.zeros((1, reseau.unites), np.float32), np.zeros((1, reseau.unites), np.float32)
+        sorties = []
+        for i, projection in enumerate(reseau.projeter(x)):
+            reseau.pas(projection[None], h, c)
+            if i + 1 >= reseau.longueur:
+                sorties.append(reseau.sortie(h)[0])
+        lettres.append(lettre_fenetres(np.array(sorties).reshape(-1, len(reseau.classes)), reseau.classes, 0.98))
+    return lettres
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="LSTM en continu contre LSTM par fenêtres")
+    parser.add_argument("dossier", nargs="?", default=os.path.join(RACINE, "LSTM"))
+    parser.add_argument("--test", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "Test"))
+    args = parser.parse_args()
+
+    if not os.path.exists(os.path.join(args.dossier, FICHIER)):
+        print(f"📦 Export : {exporter_dossier(args.dossier)}")
+    reseau = LSTMNumpy(os.path.join(args.dossier, FICHIER))
+    fichiers = lister_fichiers(args.test)
+    enregistrements = [charger(os.path.join(args.test, relatif)) for relatif, _ in fichiers]
+    attendues = [lettre.split("_")[0] for _, lettre in fichiers]
+    donnees = [donnees_lstm(e) for e in enregistrements]
+    print(f"📊 {len(fichiers)} fichiers, {sum(len(x) for x in donnees)} trames, séquences de {reseau.longueur} trames\n")
+
+    methodes = {}
+    try:
+        from tensorflow.keras.models import load_model
+        modele = load_model(os.path.join(args.dossier, "model_lstm.keras"))
+        modele.predict_on_batch(fenetres(donnees[0], reseau.longueur))  # Premier appel à part
+        methodes["Fenêtres Keras"] = par_fenetres(modele.predict_on_batch, reseau, donnees)
+    except ImportError:
+        print("⚠️ TensorFlow absent : pas de mesure Keras")
+    methodes["Fenêtres NumPy"] = par_fenetres(reseau.probabilites, reseau, donnees)
+    methodes["Continu NumPy"] = en_continu(reseau, donnees)
+
+    def precision(lettres):
+        return np.mean([l.split("_")[0] == a for l, a in zip(lettres, attendues)]) * 100
+
+    for nom, (lettres, totaux, delais, pas, _) in methodes.items():
+        ligne = (f"{nom:<15} précision {precision(lettres):5.1f} %  total {np.mean(totaux) * 1000:7.2f} ms/fichier  "
+                 f"délai après la dernière trame {np.mean(delais) * 1000:7.3f} ms")
+        if pas:
+            ligne += f"  trame p50 {np.percentile(pas, 50) * 1e6:.0f} µs, p99 {np.percentile(pas, 99) * 1e6:.0f} µs"
+        print(ligne)
+
+    reference = methodes.get("Fenêtres Keras", methodes["Fenêtres NumPy"])[4]
+    ecart = max(np.abs(p - r).max() for p, r in zip(methodes["Continu NumPy"][4], reference) if len(r) == len(p))
+    print(f"\nÉcart max des probabilités en continu / par fenêtres : {ecart:.2e}")
+    print(f"Un seul état gardé d'une trame à l'autre : précision {precision(etat_unique(reseau, donnees)):.1f} %")
+    causal = [NormalisationContinue()(e.analogique, e.presence) if not e.nettoye else x
+              for e, x in zip(enregistrements, donnees)]
+    print(f"Normalisation du flux en direct (maximum courant) : précision "
+          f"{precision(en_continu(reseau, causal)[0]):.1f} %")
@@ -0,0 +1,100 @@
+"""Benchmark de la prédiction de l'ANN : Keras (load_model) contre l'export NumPy (Commun/reseau_numpy.py).
+
+Chaque méthode tourne dans son propre processus : temps de démarrage (imports et chargement du modèle), latence
+d'une prédiction (un fichier à la fois, comme le prototype), débit par lots et pic de mémoire (RSS). L'écart
+maximal entre les probabilités des deux méthodes est aussi affiché. Le .npz est exporté s'il manque.
+
+    python benchmark_numpy.py [dossier de l'ANN] [--fichiers ../ANN/Lettres] [--nombre 200]
+"""
+import argparse
+import glob
+import json
+import os
+import subprocess
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Commun"))
+
+RACINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+def vecteurs(dossier_fichiers, nombre, extraction, taille_max):
+    from chargement import charger
+    from service_prediction import EntreeANN
+
+    entree = EntreeANN(extraction, taille_max)
+    fichiers = sorted(glob.glob(os.path.join(dossier_fichiers, "**", "*.csv"), recursive=True))[:nombre]
+    return [entree(charger(f)) for f in fichiers]
+
+
+def mesurer(methode, dossier, dossier_fichiers, nombre):
+    import numpy as np
+    from benchmark_fenetres import pic_memoire
+
+    debut = time.perf_counter()
+    if methode == "keras":
+        import joblib
+        from tensorflow.keras.models import load_model
+        modele = load_model(os.path.join(dossier, "modele_lettres.keras"))
+        scaler = joblib.load(os.path.join(dossier, "scaler.pkl"))
+        chemin = os.path.join(dossier, "caracteristiques.pkl")
+        extraction = joblib.load(chemin) if os.path.exists(chemin) else None
+        taille_max = joblib.load(os.path.join(dossier, "taille_max.pkl")) if extraction is None else None
+        un = lambda v: modele.predict(scaler.transform([v]), verbose=0)[0]  # Comme le prototype
+        lot = lambda X: np.asarray(modele.predict_on_batch(scaler.transform(X)))
+    else:
+        from reseau_numpy import FICHIER, ReseauNumpy
+        reseau = ReseauNumpy(os.path.join(dossier, FICHIER))
+        extraction, taille_max = reseau.extraction, reseau.taille_max
+        un = lambda v: reseau.predire(v)[1]
+        lot = reseau.probabilites
+    demarrage = time.perf_counter() - debut
+
+    X = vecteurs(dossier_fichiers, nombre, extraction, taille_max)
+    un(X[0])  # Premier appel à part (construction du graphe pour Keras)
+    latences = []
+    for v in X:
+        t = time.perf_counter()
+        un(v)
+        latences.append(time.perf_counter() - t)
+    t = time.perf_counter()
+    probabilites = lot(np.stack(X))
+    duree_lot = time.perf_counter() - t
+    return {"demarrage_s": demarrage, "p50_ms": float(np.percentile(latences, 50)) * 1000,
+            "p99_ms": float(np.percentile(latences, 99)) * 1000, "lot_par_s": len(X) / duree_lot,
+            "pic_mo": pic_memoire(), "probabilites": np.asarray(probabilites, dtype=np.float64).tolist()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Démarrage et latence de l'ANN : Keras contre NumPy")
+    parser.add_argument("dossier", nargs="?", default=os.path.join(RACINE, "ANN"))
+    parser.add_argument("--fichiers", default=os.path.join(RACINE, "ANN", "Lettres"))
+    parser.add_argument("--nombre", type=int, default=200)
+    parser.add_argument("--mesure", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mesure:
+        print(json.dumps(mesurer(args.mesure, args.dossier, args.fichiers, args.nombre)))
+        sys.exit()
+
+    from reseau_numpy import FICHIER, exporter_dossier
+    if not os.path.exists(os.path.join(args.dossier, FICHIER)):
+        print(f"📦 Export : {exporter_dossier(args.dossier)}")
+
+    resultats = {}
+    for methode in ("keras", "numpy"):
+        debut = time.perf_counter()
+        sortie = subprocess.run([sys.executable, __file__, args.dossier, "--fichiers", args.fichiers,
+                                 "--nombre", str(args.nombre), "--mesure", methode],
+                                capture_output=True, text=True, check=True).stdout
+        r = resultats[methode] = json.loads(sortie.strip().splitlines()[-1])
+        pic = f"{r['pic_mo']:>6.0f} Mo" if r["pic_mo"] is not None else "     ? Mo"
+        print(f"{methode.upper():<6} démarrage {r['demarrage_s']:>6.3f} s (processus {time.perf_counter() - debut:>5.1f} s)  "
+              f"prédiction p50 {r['p50_ms']:>7.3f} ms  p99 {r['p99_ms']:>7.3f} ms  "
+              f"lot {r['lot_par_s']:>9.0f} fichiers/s  pic RSS {pic}")
+
+    import numpy as np
+    keras, numpy = (np.array(resultats[m]["probabilites"]) for m in ("keras", "numpy"))
+    print(f"\nÉcart max des probabilités : {np.abs(keras - numpy).max():.2e}  "
+          f"(même lettre pour {np.mean(keras.argmax(1) == numpy.argmax(1)) * 100:.1f} % des fichiers)")
@@ -0,0 +1,45 @@
+"""Benchmark de la lecture parallèle d'un dossier Lettres (jeu_donnees.lire_fichiers), sans passer par le jeu compilé.
+
+Tous les CSV du dossier (ANN/Lettres par défaut) sont relus avec 1, 2, 4... processus, jusqu'au nombre de
+cœurs (ou avec les nombres donnés) ; les matrices sont comparées à la lecture sur un seul processus.
+
+    python benchmark_parallele.py [dossier] [--workers 1 2 4 8]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Commun"))
+from jeu_donnees import lire_fichiers, lister_fichiers
+
+
+def mesurer(chemins, workers):
+    debut = time.perf_counter()
+    matrices = [matrice for matrice, _ in lire_fichiers(chemins, workers=workers)]
+    return time.perf_counter() - debut, matrices
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Temps de lecture d'un dossier Lettres selon le nombre de processus")
+    parser.add_argument("dossier", nargs="?",
+                        default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "ANN", "Lettres"))
+    parser.add_argument("--workers", type=int, nargs="+", default=None)
+    args = parser.parse_args()
+
+    coeurs = os.cpu_count() or 1
+    nombres = args.workers or sorted({min(2 ** i, coeurs) for i in range(coeurs.bit_length() + 1)})
+    chemins = [os.path.join(args.dossier, chemin) for chemin, _ in lister_fichiers(args.dossier)]
+    print(f"📊 {len(chemins)} CSV dans {os.path.abspath(args.dossier)}, {coeurs} cœur(s)\n")
+
+    reference, matrices_reference = mesurer(chemins, 1)
+    print(f"{'1 processus':<15} {reference:>7.2f} s")
+    for workers in nombres:
+        if workers == 1:
+            continue
+        duree, matrices = mesurer(chemins, workers)
+        identiques = all(np.array_equal(a, b) for a, b in zip(matrices_reference, matrices))
+        print(f"{f'{workers} processus':<15} {duree:>7.2f} s  x{reference / duree:.2f}  "
+              f"{'✅ identique' if identiques else '❌ différent'}")
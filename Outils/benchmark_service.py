@@ -0,0 +1,91 @@
+"""Benchmark du service de prédiction (Commun/service_prediction.py, à lancer avant) : latences et débit.
+
+N clients envoient en même temps des fichiers du dossier (ANN/Lettres par défaut) au service ; les latences vues
+par les clients (p50, p95, p99), le débit et la taille moyenne des lots du service sont affichés. L'option
+--ancien mesure aussi l'ancienne prédiction de l'ANN (modèle et fichiers .pkl rechargés à chaque fichier).
+
+    python benchmark_service.py [dossier] [--modele ann] [--clients 1 4 16] [--demandes 200] [--ancien ../ANN]
+"""
+import argparse
+import glob
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Commun"))
+from service_prediction import ADRESSE, etat_service, predire, service_disponible
+
+
+def afficher(nom, latences, duree, par_lot=None):
+    latences = np.array(latences) * 1000
+    lots = f"  {par_lot:>5.1f} demandes/lot" if par_lot is not None else ""
+    print(f"{nom:<22} p50 {np.percentile(latences, 50):>8.1f} ms  p95 {np.percentile(latences, 95):>8.1f} ms  "
+          f"p99 {np.percentile(latences, 99):>8.1f} ms  {len(latences) / duree:>7.1f} demandes/s{lots}")
+
+
+def mesurer_service(modele, fichiers, nb_clients, adresse):
+    latences = []
+
+    def client(k):
+        for fichier in fichiers[k::nb_clients]:
+            debut = time.perf_counter()
+            predire(modele, fichier=fichier, adresse=adresse)
+            latences.append(time.perf_counter() - debut)
+
+    debut = time.perf_counter()
+    clients = [threading.Thread(target=client, args=(k,)) for k in range(nb_clients)]
+    for c in clients:
+        c.start()
+    for c in clients:
+        c.join()
+    return latences, time.perf_counter() - debut
+
+
+def mesurer_ancien(dossier, fichiers):
+    """Ancienne prédiction de l'ANN : tout est rechargé pour chaque fichier."""
+    import joblib
+    from tensorflow.keras.models import load_model
+    from chargement import charger
+
+    latences = []
+    debut = time.perf_counter()
+    for fichier in fichiers:
+        t = time.perf_counter()
+        modele = load_model(os.path.join(dossier, "modele_lettres.keras"))
+        scaler = joblib.load(os.path.join(dossier, "scaler.pkl"))
+        joblib.load(os.path.join(dossier, "label_encoder.pkl"))
+        extraction = joblib.load(os.path.join(dossier, "caracteristiques.pkl"))
+        modele.predict(scaler.transform([extraction.vecteur(charger(fichier))]), verbose=0)
+        latences.append(time.perf_counter() - t)
+    return latences, time.perf_counter() - debut
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Latences et débit du service de prédiction")
+    parser.add_argument("dossier", nargs="?",
+                        default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "ANN", "Lettres"))
+    parser.add_argument("--modele", default="ann", choices=("ann", "lstm"))
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--demandes", type=int, default=200)
+    parser.add_argument("--adresse", default=ADRESSE)
+    parser.add_argument("--ancien", help="dossier des fichiers de l'ANN pour mesurer l'ancienne prédiction")
+    args = parser.parse_args()
+
+    if not service_disponible(args.modele, args.adresse):
+        sys.exit(f"❌ Service de prédiction ({args.modele}) introuvable sur {args.adresse}")
+    fichiers = sorted(glob.glob(os.path.join(args.dossier, "**", "*.csv"), recursive=True))
+    fichiers = (fichiers * (args.demandes // max(len(fichiers), 1) + 1))[:args.demandes]
+    print(f"📊 {len(fichiers)} demandes {args.modele.upper()} vers {args.adresse}\n")
+
+    for nb_clients in args.clients:
+        avant = etat_service(args.adresse)["modeles"][args.modele]
+        latences, duree = mesurer_service(args.modele, fichiers, nb_clients, args.adresse)
+        apres = etat_service(args.adresse)["modeles"][args.modele]
+        par_lot = (apres["demandes"] - avant["demandes"]) / max(apres["lots"] - avant["lots"], 1)
+        afficher(f"Service, {nb_clients} client(s)", latences, duree, par_lot)
+    if args.ancien:
+        latences, duree = mesurer_ancien(args.ancien, fichiers[:20])
+        afficher("Ancien (rechargement)", latences, duree)
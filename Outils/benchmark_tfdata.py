@@ -0,0 +1,94 @@
+"""Benchmark de l'entrée des entraînements : tableaux complets en mémoire (ancien chemin) contre flux tf.data (flux_tf.py).
+
+Pour l'ANN (ANN/Lettres) et le LSTM (LSTM/Lettres), chaque méthode tourne dans son propre processus et
+parcourt une époque entière, mélangée et découpée en lots comme dans model.fit ; les exemples/s (chargement
+compris) et le pic de mémoire (RSS, Linux et macOS) sont affichés.
+
+    python benchmark_tfdata.py [--ann dossier] [--lstm dossier]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Commun"))
+from benchmark_fenetres import pic_memoire
+from caracteristiques import Caracteristiques
+from fenetres import fenetres_jeu
+from jeu_donnees import compiler
+
+RACINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+SEQ_LENGTH = 50
+
+
+def ann(dossier, methode):
+    import tensorflow as tf
+    from flux_tf import flux_ann
+
+    jeu = compiler(dossier, verbeux=False, extraction=Caracteristiques())
+    X = jeu.donnees.reshape(len(jeu), -1)
+    lettres = sorted(set(jeu.lettres))
+    y = np.array([lettres.index(lettre) for lettre in jeu.lettres])
+    if methode == "avant":
+        X = np.array(X)
+        X = (X - X.mean(axis=0)) / np.where(X.std(axis=0) > 0, X.std(axis=0), 1)
+        flux = tf.data.Dataset.from_tensor_slices((X, tf.one_hot(y, len(lettres)))).shuffle(len(X)).batch(16)
+        return flux.prefetch(tf.data.AUTOTUNE)
+    # Moyenne et écart type par lots, comme StandardScaler.partial_fit
+    somme, carres = np.zeros(X.shape[1]), np.zeros(X.shape[1])
+    for debut in range(0, len(X), 256):
+        lot = X[debut:debut + 256].astype(np.float64)
+        somme += lot.sum(axis=0)
+        carres += (lot ** 2).sum(axis=0)
+    moyenne = somme / len(X)
+    ecart = np.sqrt(np.maximum(carres / len(X) - moyenne ** 2, 0))
+    return flux_ann(X, np.arange(len(X)), y, moyenne, np.where(ecart > 0, ecart, 1), len(lettres))
+
+
+def lstm(dossier, methode):
+    import tensorflow as tf
+    from flux_tf import flux_fenetres
+
+    jeu = compiler(dossier, verbeux=False)
+    classes = {lettre: i for i, lettre in enumerate(sorted(set(jeu.lettres)))}
+    fenetres = fenetres_jeu(jeu, SEQ_LENGTH, classes)
+    if methode == "avant":
+        X, y = fenetres.lot(np.arange(len(fenetres)))  # Toutes les séquences copiées, comme l'ancien charger_donnees
+        flux = tf.data.Dataset.from_tensor_slices((X, tf.one_hot(y, len(classes)))).shuffle(len(X)).batch(256)
+        return flux.prefetch(tf.data.AUTOTUNE)
+    return flux_fenetres(fenetres, np.arange(len(fenetres)), len(classes))
+
+
+def mesurer(reseau, dossier, methode):
+    debut = time.perf_counter()
+    flux = (ann if reseau == "ann" else lstm)(dossier, methode)
+    exemples = sum(int(X.shape[0]) for X, _ in flux)
+    duree = time.perf_counter() - debut
+    return {"exemples": exemples, "duree": duree, "par_s": exemples / duree, "pic_mo": pic_memoire()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exemples/s et mémoire de l'entrée des entraînements")
+    parser.add_argument("--ann", default=os.path.join(RACINE, "ANN", "Lettres"))
+    parser.add_argument("--lstm", default=os.path.join(RACINE, "LSTM", "Lettres"))
+    parser.add_argument("--mesure", nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mesure:
+        print(json.dumps(mesurer(*args.mesure)))
+        sys.exit()
+
+    for reseau, dossier in (("ann", args.ann), ("lstm", args.lstm)):
+        # Le jeu est compilé une fois pour toutes avant les mesures
+        compiler(dossier, extraction=Caracteristiques() if reseau == "ann" else None)
+        for methode, nom in (("avant", "tableaux en mémoire"), ("apres", "flux tf.data")):
+            sortie = subprocess.run([sys.executable, __file__, "--mesure", reseau, dossier, methode],
+                                    capture_output=True, text=True, check=True).stdout
+            r = json.loads(sortie.strip().splitlines()[-1])
+            pic = f"{r['pic_mo']:>7.0f} Mo" if r["pic_mo"] is not None else "      ? Mo"
+            print(f"{reseau.upper():<5} {nom:<22} {r['exemples']:>7} exemples  {r['duree']:>6.2f} s  "
+                  f"{r['par_s']:>9.0f} exemples/s  pic RSS {pic}")
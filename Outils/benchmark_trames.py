@@ -0,0 +1,99 @@
+"""Microbenchmark de l'analyse des trames : anciennes analyses (interface, prototype) contre l'analyseur commun.
+
+Les lignes brutes sont reconstituées à partir des enregistrements du dossier Test,
+puis analysées par chaque méthode. Le résultat est affiché en trames par seconde.
+"""
+import csv
+import glob
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Commun"))
+from trames import AnalyseurTrames
+
+
+def charger_lignes(repertoire):
+    """Reconstitue les lignes envoyées par le capteur à partir des CSV enregistrés."""
+    lignes = []
+    for fichier in sorted(glob.glob(os.path.join(repertoire, "*", "*.csv"))):
+        with open(fichier, newline='', encoding='utf-8') as f:
+            for row in list(csv.reader(f))[1:]:
+                valeurs = [v for v in row[1:] if v]
+                if len(valeurs) == 32:
+                    lignes.append(" ".join(valeurs))
+    return lignes
+
+
+def ancienne_analyse_interface(data):
+    """Copie de l'ancienne analyse de SerialWidget.read_from_sensor (référence)."""
+    headers = [
+        "MF1", "MF2", "MF3", "MF4", "MF8", "MF7", "MF6", "MF5",
+        "UF1", "UF2", "UF3", "UF4", "UF5", "UF6", "UF7", "UF8"
+    ]
+    active_headers = []
+    values = data.split()
+    if len(values) > 17:
+        values = values[:17]
+    values = [int(v) if v.isdigit() else 1000 for v in values]
+    presence_values = data.split()[16:33]
+    presence_values = [int(v) if v in ('0', '1') else 0 for v in presence_values]
+    reorganized_values = []
+    presence_reorganized_values = []
+    for i in range(0, len(values), 4):
+        group = values[i:i+4]
+        presence_group = presence_values[i:i+4]
+        if i == 4:
+            group.reverse()
+            presence_group.reverse()
+        reorganized_values.extend(group)
+        presence_reorganized_values.extend(presence_group)
+    sensor_data = []
+    sensor_presence = {}
+    for h, v, p in zip(headers, reorganized_values, presence_reorganized_values):
+        if v not in (1000, 3299):
+            sensor_data.append(f"{h}: {v}")
+            sensor_presence[h] = p
+            active_headers.append(h)
+    # create_rectangles redécoupait ensuite chaque chaîne "clé: valeur"
+    for sensor_info in sensor_data:
+        key, value = sensor_info.split(": ")
+        value = int(value)
+    return sensor_data, sensor_presence
+
+
+def ancienne_analyse_prototype(data):
+    """Copie de l'ancienne analyse du prototype (conversion en float jeton par jeton)."""
+    values = data.split()
+    return [float(v) for v in values[:8]]
+
+
+def mesurer(nom, fonction, nb_trames):
+    debut = time.perf_counter()
+    fonction()
+    duree = time.perf_counter() - debut
+    print(f"{nom:<45} {nb_trames / duree:>12,.0f} trames/s")
+    return nb_trames / duree
+
+
+if __name__ == "__main__":
+    repertoire = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(os.path.abspath(__file__)), "Test")
+    lignes = charger_lignes(repertoire)
+    lignes_octets = [l.encode() for l in lignes]
+    n = len(lignes)
+    print(f"📊 {n} trames issues de {repertoire}\n")
+
+    analyseur = AnalyseurTrames(capacite=1)
+    analyseur_lot = AnalyseurTrames(capacite=256)
+    taille_lot = 256
+
+    def par_lots(source):
+        for i in range(0, n, taille_lot):
+            analyseur_lot.analyser(source[i:i + taille_lot])
+
+    avant = mesurer("Avant - interface (ligne par ligne)", lambda: [ancienne_analyse_interface(l) for l in lignes], n)
+    mesurer("Avant - prototype (ligne par ligne)", lambda: [ancienne_analyse_prototype(l) for l in lignes], n)
+    mesurer("Après - analyseur commun (ligne par ligne)", lambda: [analyseur.analyser_ligne(l) for l in lignes], n)
+    apres = mesurer(f"Après - analyseur commun (lots de {taille_lot}, str)", lambda: par_lots(lignes), n)
+    mesurer(f"Après - analyseur commun (lots de {taille_lot}, bytes)", lambda: par_lots(lignes_octets), n)
+    print(f"\n⚡ Gain (lots / ancienne analyse de l'interface) : x{apres / avant:.1f}")
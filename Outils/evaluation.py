@@ -0,0 +1,181 @@
+"""Évaluation en lot des modèles sur une arborescence étiquetée (un sous-dossier par lettre, comme Outils/Test).
+
+Tous les fichiers sont lus et préparés pour chaque modèle sur plusieurs processus, puis chaque modèle (ANN, LSTM)
+les prédit en un seul appel. Les résultats sont gardés dans un cache, par empreinte du fichier et version du modèle
+(empreinte de ses fichiers) : seuls les fichiers nouveaux ou modifiés sont prédits, ou tous après un entraînement.
+Le dossier de sortie (<dossier>.evaluation par défaut) contient, pour chaque modèle :
+    probabilites_<modele>.csv   une ligne par fichier : lettre attendue, lettre prédite, probabilité de chaque classe
+    confusion_<modele>.csv      matrice de confusion (lignes : lettre attendue, colonnes : lettre prédite)
+
+    python evaluation.py Test [--ann ../ANN] [--lstm ../LSTM] [--workers 4] [--sortie dossier] [--forcer]
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Commun"))
+from chargement import charger
+from jeu_donnees import empreinte, lire_fichiers, lister_fichiers
+from service_prediction import ModeleANN, ModeleLSTM
+
+VERSION = 1
+RACINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+MODELES = {"ann": ModeleANN, "lstm": ModeleLSTM}
+CACHE = "cache.json"
+INCONNUE = "Inconnue"
+
+
+def lettre_de(nom):
+    """Lettre d'un nom de dossier ou de classe (A, A_, A_nettoyé -> A)."""
+    return nom.split("_")[0]
+
+
+def version_modele(dossier, classe):
+    """Empreinte des fichiers du modèle présents dans `dossier` (change à chaque entraînement)."""
+    h = hashlib.sha1(f"{VERSION}:{classe.__name__}".encode())
+    for nom in classe.fichiers:
+        chemin = os.path.join(dossier, nom)
+        if os.path.exists(chemin):
+            h.update(f"{nom}:{empreinte(chemin)}".encode())
+    return h.hexdigest()
+
+
+def preparer(tache):
+    """Entrées des modèles pour un fichier (chemin, {modèle: entrée}), ou None s'il est illisible (appelée dans les processus)."""
+    chemin, entrees = tache
+    try:
+        enregistrement = charger(chemin)
+    except (OSError, ValueError):
+        return None
+    if not len(enregistrement):
+        return None
+    return {nom: np.ascontiguousarray(entree(enregistrement), dtype=np.float32) for nom, entree in entrees.items()}
+
+
+def _lire_cache(chemin):
+    try:
+        with open(chemin, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def matrice_confusion(attendues, predites):
+    """Matrice de confusion (DataFrame) : toutes les lettres attendues en lignes, en colonnes aussi (plus Inconnue)."""
+    lettres = sorted(set(attendues) | set(predites) - {INCONNUE})
+    colonnes = lettres + ([INCONNUE] if INCONNUE in predites else [])
+    matrice = pd.crosstab(pd.Series(attendues, name="attendue"), pd.Series(predites, name="prédite"))
+    return matrice.reindex(index=lettres, columns=colonnes, fill_value=0)
+
+
+def evaluer(racine, dossiers, sortie=None, workers=None, forcer=False):
+    """Évalue les modèles {nom: dossier} sur l'arborescence ; rend {nom: probabilités par fichier (DataFrame)}."""
+    debut = time.perf_counter()
+    sortie = sortie or os.path.normpath(racine) + ".evaluation"
+    fichiers = lister_fichiers(racine)
+    chemins = [os.path.join(racine, relatif) for relatif, _ in fichiers]
+    empreintes = [empreinte(chemin) for chemin in chemins]
+    print(f"📂 {len(fichiers)} fichiers dans {racine}")
+
+    # Résultats déjà connus : même fichier, même version du modèle
+    chemin_cache = os.path.join(sortie, CACHE)
+    cache = {} if forcer else _lire_cache(chemin_cache)
+    versions, resultats, manquants = {}, {}, {}
+    for nom, dossier in dossiers.items():
+        versions[nom] = version_modele(dossier, MODELES[nom])
+        anciens = cache.get(nom, {})
+        resultats[nom] = anciens.get("resultats", {}) if anciens.get("version") == versions[nom] else {}
+        manquants[nom] = [i for i, e in enumerate(empreintes) if e not in resultats[nom]]
+
+    # Les modèles ne sont chargés que s'il reste des fichiers à prédire
+    modeles = {}
+    for nom, indices in manquants.items():
+        if indices:
+            t = time.perf_counter()
+            modeles[nom] = MODELES[nom](dossiers[nom])
+            print(f"🧠 {nom.upper()} chargé ({(time.perf_counter() - t) * 1000:.0f} ms), "
+                  f"{len(indices)} fichiers à prédire, {len(fichiers) - len(indices)} en cache")
+        else:
+            print(f"♻️ {nom.upper()} : {len(fichiers)} fichiers en cache")
+
+    # Lecture et préparation en parallèle : chaque fichier une seule fois, pour tous les modèles qui en ont besoin
+    besoins = {nom: set(indices) for nom, indices in manquants.items()}
+    a_lire = sorted(set().union(*besoins.values()))
+    taches = [(chemins[i], {nom: modeles[nom].entree for nom in modeles if i in besoins[nom]}) for i in a_lire]
+    t = time.perf_counter()
+    entrees = dict(zip(a_lire, lire_fichiers(taches, preparer, workers)))
+    if a_lire:
+        print(f"⚙️ {len(a_lire)} fichiers préparés ({(time.perf_counter() - t) * 1000:.0f} ms)")
+
+    # Un seul appel par modèle pour tous ses fichiers manquants
+    for nom, modele in modeles.items():
+        indices = [i for i in manquants[nom] if entrees[i] is not None]
+        for i in besoins[nom] - set(indices):
+            print(f"⚠️ {fichiers[i][0]} ignoré : fichier illisible ou vide")
+        if not indices:
+            continue
+        t = time.perf_counter()
+        for i, resultat in zip(indices, modele.predire_lot([entrees[i][nom] for i in indices])):
+            resultats[nom][empreintes[i]] = resultat
+        print(f"🚀 {nom.upper()} : {len(indices)} fichiers prédits en un lot ({(time.perf_counter() - t) * 1000:.0f} ms)")
+
+    os.makedirs(sortie, exist_ok=True)
+    temporaire = chemin_cache + ".tmp"
+    with open(temporaire, "w", encoding="utf-8") as f:
+        json.dump({nom: {"version": versions[nom], "resultats": resultats[nom]} for nom in dossiers}, f)
+    os.replace(temporaire, chemin_cache)
+
+    tableaux = {}
+    for nom in dossiers:
+        lignes = []
+        for (relatif, dossier), e in zip(fichiers, empreintes):
+            resultat = resultats[nom].get(e)
+            if resultat is None:
+                continue
+            ligne = {"fichier": relatif, "attendue": lettre_de(dossier), "prédite": lettre_de(resultat["lettre"])}
+            ligne["correcte"] = ligne["attendue"] == ligne["prédite"]
+            ligne.update({f"p_{lettre_de(c)}": p for c, p in zip(resultat["classes"], resultat["probabilites"])})
+            ligne.update({k: resultat[k] for k in ("sequences", "confiantes") if k in resultat})
+            lignes.append(ligne)
+        tableau = pd.DataFrame(lignes)
+        tableaux[nom] = tableau
+        if tableau.empty:
+            print(f"⚠️ {nom.upper()} : aucun fichier évalué")
+            continue
+        confusion = matrice_confusion(list(tableau["attendue"]), list(tableau["prédite"]))
+        tableau.to_csv(os.path.join(sortie, f"probabilites_{nom}.csv"), index=False)
+        confusion.to_csv(os.path.join(sortie, f"confusion_{nom}.csv"))
+        print(f"\n📊 {nom.upper()} : {tableau['correcte'].mean() * 100:.1f} % de bonnes prédictions "
+              f"({tableau['correcte'].sum()}/{len(tableau)})\n{confusion.to_string()}")
+
+    print(f"\n✅ Résultats dans {sortie} ({(time.perf_counter() - debut) * 1000:.0f} ms)")
+    return tableaux
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Évalue l'ANN et le LSTM sur une arborescence étiquetée")
+    parser.add_argument("dossier", help="un sous-dossier par lettre (CSV bruts ou nettoyés)")
+    parser.add_argument("--ann", default=os.path.join(RACINE, "ANN"), help="dossier des fichiers de l'ANN")
+    parser.add_argument("--lstm", default=os.path.join(RACINE, "LSTM"), help="dossier des fichiers du LSTM")
+    parser.add_argument("--modeles", nargs="+", default=list(MODELES), choices=list(MODELES))
+    parser.add_argument("--sortie", help="dossier des résultats (défaut : <dossier>.evaluation)")
+    parser.add_argument("--workers", type=int, default=None, help="processus de lecture (défaut : tous les cœurs)")
+    parser.add_argument("--forcer", action="store_true", help="ignore le cache")
+    args = parser.parse_args()
+
+    dossiers = {}
+    for nom in args.modeles:
+        dossier = getattr(args, nom)
+        if MODELES[nom].disponible(dossier):
+            dossiers[nom] = dossier
+        else:
+            print(f"⚠️ {nom.upper()} ignoré : aucun modèle entraîné dans {dossier}")
+    if not dossiers:
+        sys.exit("❌ Aucun modèle à évaluer")
+    evaluer(args.dossier, dossiers, args.sortie, args.workers, args.forcer)
@@ -1,18 +1,36 @@
-import serial
+import argparse
 import threading
-import csv
 import os
+import sys
 import datetime
 import time
 import tkinter as tk
 from tkinter import filedialog
 
-# Configuration du port série (remplace "COM9" par le bon port)
-ser = serial.Serial("COM9", baudrate=430000, timeout=1)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Commun"))
+from enregistreur import Enregistreur, ENTETE_CSV
+from trames import AnalyseurTrames, AUTRE
+from lecture_serie import LecteurSerie
+from simulateur import ouvrir_port
+from calibration import CacheCalibration, arreter_flux, demarrer_session, resume_calibration
+from acquisition import ConditionArret, acquerir, resume_session
+from segmentation import SegmenteurGestes
+from horodatage import etaler
+
+# Configuration du port série (remplace "COM9" par le bon port, ou NANOMADE_PORT=simulateur:// sans le kit)
+ser = ouvrir_port(os.environ.get("NANOMADE_PORT", "COM9"), baudrate=430000, timeout=1)
 
 # Définir 'i' comme une variable globale
 i = 0
 
+# Analyseur de trames partagé avec l'interface et le prototype, alimenté par blocs
+analyseur = AnalyseurTrames(capacite=64, reordonner=False)
+lecteur = LecteurSerie(ser, analyseur)
+
+# Calibration réutilisée d'une session à l'autre tant que la ligne de base ne dérive pas de plus de
+# `tolerance` unités ADC, et refaite au moins toutes les `sessions_max` sessions (tolerance=None : à chaque session)
+cache_calibration = CacheCalibration(tolerance=15, sessions_max=50)
+
 def choose_save_directory():
     """Ouvre une boîte de dialogue pour choisir le répertoire où enregistrer les fichiers CSV."""
     root = tk.Tk()
@@ -20,96 +38,136 @@ def choose_save_directory():
     directory = filedialog.askdirectory(title="Choisir le répertoire pour enregistrer les fichiers")
     return directory
 
-def create_csv_file(directory):
-    """Crée un fichier CSV unique basé sur le timestamp actuel dans le répertoire choisi."""
+def create_csv_file(directory, numero=None):
+    """Crée un fichier CSV unique basé sur le timestamp actuel (et le numéro du geste) et ouvre son enregistreur."""
     if not directory:  # Si l'utilisateur annule, on ne continue pas
         print("⚠️ Aucun répertoire choisi. Arrêt du programme.")
         exit()
 
     timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = os.path.join(directory, f"sensor_data_{timestamp}.csv")
+    suffixe = "" if numero is None else f"_{numero:04d}"  # Plusieurs gestes peuvent tomber dans la même seconde
+    filename = os.path.join(directory, f"sensor_data_{timestamp}{suffixe}.csv")
     
-    # Créer le fichier CSV et écrire l'en-tête
-    with open(filename, mode='w', newline='') as file:
-        writer = csv.writer(file)
-        writer.writerow([ 
-            "Timestamp", "M_F_1", "M_F_2", "M_F_3", "M_F_4", "M_F_5", "M_F_6", "M_F_7", "M_F_8",
-            "U_F_1", "U_F_2", "U_F_3", "U_F_4", "U_F_5", "U_F_6", "U_F_7", "U_F_8",
-            "M_C_1", "M_C_2", "M_C_3", "M_C_4", "M_C_5", "M_C_6", "M_C_7", "M_C_8",
-            "U_C_1", "U_C_2", "U_C_3", "U_C_4", "U_C_5", "U_C_6", "U_C_7", "U_C_8"
-        ])
-    return filename
-
-def save_to_csv(filename, data):
-    """Enregistre les données dans le fichier CSV avec le bon format."""
+    # Créer le fichier CSV avec son en-tête ; l'écriture se fait ensuite dans un thread dédié
+    return Enregistreur(filename, entete=ENTETE_CSV)
+
+def save_to_csv(enregistreur, trames, reponses):
+    """Transmet un bloc de trames analysées à l'enregistreur (mise au format 33 colonnes dans le thread d'écriture)."""
     try:
-        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S,%f")[:-3]
-        values = data.split()
-        
-        # S'assurer que chaque ligne a bien 33 colonnes
-        while len(values) < 32:
-            values.append("")
-        
-        row = [timestamp] + values[:32]  # Limiter à 32 colonnes au cas où
-        
-        with open(filename, mode='a', newline='') as file:
-            writer = csv.writer(file)
-            writer.writerow(row)
+        timestamp = time.monotonic_ns()  # Mis en forme à l'écriture (ancre murale de la session)
+        enregistreur.ajouter_lot(timestamp, trames, reponses)
     except Exception as e:
         print(f"⚠️ Erreur lors de l'enregistrement : {e}")
 
-def send_calibration_commands():
-    """Envoie les commandes de calibration au capteur."""
-    for command in ["K\n", "GD\n", "CC\n"]:
-        ser.write(command.encode())
-        time.sleep(1)  # Petite pause pour éviter d'envoyer trop vite
-    
-    # Envoyer la commande pour démarrer la prise de mesures
-    ser.write("R\n".encode())
-    time.sleep(0.5)
+def send_calibration_commands(enregistreur):
+    """Calibre le capteur (ou réutilise la calibration en cache), enregistre le bloc de calibration et démarre la mesure."""
+    resultat = demarrer_session(ser, lecteur, cache_calibration, enregistreur)
+    print(resume_calibration(resultat))
+    return resultat
     
-def discard_last_line():
-    """Lis et ignore la dernière ligne envoyée après la commande 'S\n'."""
+def read_from_sensor(enregistreur, duration=5, condition=None, trames_initiales=0):
+    """Lit et enregistre les données du capteur jusqu'à la condition d'arrêt (par défaut 'duration' secondes).
+
+    trames_initiales : trames de la ligne de base déjà écrites par send_calibration_commands.
+    """
+    if condition is None:
+        condition = ConditionArret(duree=duration)
+    nb_invalides = analyseur.lignes_invalides
+
+    def traiter(trames, reponses):
+        for _, _, texte in reponses:
+            print(f"💬 Capteur: {texte}")
+        # Les lignes illisibles (trames tronquées...) ne sont pas enregistrées
+        reponses = [r for r in reponses if r[1] != AUTRE]
+        if len(trames) or reponses:
+            save_to_csv(enregistreur, trames, reponses)
+
     try:
-        data = ser.readline().decode().strip()
-        print(f"⚠️ Ignorée : {data}")  # Affiche la ligne ignorée pour debug
+        bilan = acquerir(lecteur, condition, traiter, trames_initiales)
     except Exception as e:
-        print(f"⚠️ Erreur lors de la lecture de la dernière ligne à ignorer : {e}")
-
-def read_from_sensor(filename, duration=5):
-    """Lit et enregistre les données du capteur pendant 'duration' secondes."""
-    start_time = time.time()
-    while time.time() - start_time < duration:
-        try:
-            data = ser.readline().decode().strip()
-            if data:
-                print(f"💬 Capteur: {data}")
-                save_to_csv(filename, data)
-        except Exception as e:
-            print(f"⚠️ Erreur de lecture: {e}")
-            break
-    
-    # Envoyer la commande pour arrêter la prise de mesures
-    ser.write("S\n".encode())
-    time.sleep(0.5)
-    discard_last_line()
+        print(f"⚠️ Erreur de lecture: {e}")
+        bilan = condition.bilan()
+
+    # Arrêter la prise de mesures et ignorer les données restantes (dont la dernière ligne incomplète)
+    print(f"⚠️ Ignorés : {arreter_flux(ser, lecteur)} octets")
 
-def main():
-    """Boucle principale qui enchaîne les sessions de 10s."""
+    stats = lecteur.statistiques()
+    print(resume_session(bilan))
+    print(f"📊 {(bilan['trames'] - bilan['initiales']) / max(bilan['duree_ms'] / 1000, 1e-3):.0f} trames/s, "
+          f"{analyseur.lignes_invalides - nb_invalides} lignes illisibles ignorées "
+          f"({stats['octets_par_s'] / 1024:.1f} Ko/s depuis le démarrage).")
+
+    # Fin de session : on vide la file et on ferme le fichier
+    enregistreur.fermer()
+    stats = enregistreur.statistiques()
+    print(f"💾 {stats['lignes_ecrites']} lignes écrites ({stats['lignes_par_s']:.0f} lignes/s).")
+
+def save_gesture(directory, geste, numero):
+    """Écrit un geste segmenté dans son propre fichier : bloc de calibration en cache, puis trames avec marges.
+
+    Chaque morceau porte l'horodatage de chacune de ses trames (étalé à la lecture du bloc, voir record_continuous)."""
+    enregistreur = create_csv_file(directory, numero)
+    cache_calibration.enregistrer(enregistreur, next(int(h[0]) for h, trames in geste if len(trames)))
+    for horodatages, trames in geste:
+        enregistreur.ajouter_lot(horodatages, trames)
+    enregistreur.fermer()
+    return sum(len(trames) for _, trames in geste)
+
+def record_continuous(directory):
+    """Mode continu : le capteur reste en mesure et seuls les gestes détectés sont écrits, un fichier par geste."""
+    resultat = demarrer_session(ser, lecteur, cache_calibration)
+    print(resume_calibration(resultat))
+    if cache_calibration.resultat is None:
+        print("⚠️ Calibration incomplète, enregistrement continu impossible.")
+        return
+    segmenteur = SegmenteurGestes(cache_calibration.base)
+    trames_lues = trames_ecrites = 0
+    dernier = None  # Horodatage du bloc précédent
+    debut = time.monotonic()
+    print("✍️ Enregistrement continu : un fichier par geste (Ctrl+C pour arrêter).")
+    try:
+        while True:
+            trames, _ = lecteur.lire()
+            trames_lues += len(trames)
+            # Un horodatage par trame : les morceaux d'un même bloc, écrits séparément, restent ordonnés
+            t = time.monotonic_ns()
+            horodatages = etaler(t, len(trames), dernier)
+            if len(trames):
+                dernier = t
+            for geste in segmenteur.ajouter(trames, horodatages):
+                nb = save_gesture(directory, geste, segmenteur.gestes)
+                trames_ecrites += nb
+                print(f"💾 Geste {segmenteur.gestes} : {nb} trames")
+    finally:
+        print(f"⚠️ Ignorés : {arreter_flux(ser, lecteur)} octets")
+        print(f"📊 {segmenteur.gestes} geste(s) en {time.monotonic() - debut:.0f} s, {segmenteur.rejetes} parasite(s) ignoré(s), "
+              f"{trames_ecrites}/{trames_lues} trames écrites.")
+
+def main(continu=False):
+    """Boucle principale qui enchaîne les sessions de 5 s (ou l'enregistrement continu segmenté)."""
     global i  # Indique que nous utilisons la variable globale 'i'
+    enregistreur = None
     try:
         directory = choose_save_directory()  # Demande à l'utilisateur où enregistrer les fichiers
-        while True:
+        if continu:
+            record_continuous(directory)
+        while not continu:
             print(f"🔄 Session {i}")
             i += 1  # Incrémente la variable 'i'
-            csv_file = create_csv_file(directory)  # Crée le fichier dans le répertoire choisi
-            send_calibration_commands()
-            read_from_sensor(csv_file, duration=5)
+            enregistreur = create_csv_file(directory)  # Crée le fichier dans le répertoire choisi
+            resultat = send_calibration_commands(enregistreur)
+            read_from_sensor(enregistreur, duration=5, trames_initiales=resultat["trames_ecrites"])
     except KeyboardInterrupt:
         print("\n🛑 Arrêt du programme.")
+        print(f"♻️ {cache_calibration.reutilisations} session(s) sur calibration en cache, "
+              f"{cache_calibration.calibrations} calibration(s).")
     finally:
+        if enregistreur:
+            enregistreur.fermer()  # Sans effet si la session est déjà close
         ser.close()
         print("🔌 Connexion série fermée.")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Prise de données automatique : sessions de 5 s, ou gestes segmentés en continu.")
+    parser.add_argument("--continu", action="store_true", help="Garder le capteur en mesure et écrire un fichier par geste détecté")
+    main(continu=parser.parse_args().continu)
@@ -0,0 +1,144 @@
+"""Rapport de quantification : modèles entiers (Commun/quantification.py) contre les modèles Keras float32.
+
+Pour l'ANN et le LSTM : taille du fichier, latence d'un exemple (p50, p99), débit par lots (exemples/s) et
+précision par fichier sur une arborescence étiquetée (Outils/Test par défaut ; pour le LSTM, moyenne des séquences
+d'au moins 98 % de confiance comme predire_csv). La part des fichiers où les deux modèles prédisent la même lettre
+est aussi donnée. Les modèles quantifiés sont créés s'ils manquent ou ne viennent pas des modèles Keras actuels
+(réentraînés depuis). Le rapport est écrit en Markdown et en JSON.
+
+    python rapport_quantification.py [--ann ../ANN] [--lstm ../LSTM] [--test Test] [--sortie rapport_quantification]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Commun"))
+from chargement import charger
+from jeu_donnees import lister_fichiers
+from quantification import (BITS_LSTM, FICHIER_ANN, FICHIER_LSTM, NB_EXEMPLES, ModeleTFLite, a_jour, quantifier,
+                            representatif_ann, representatif_lstm)
+from service_prediction import SEUIL_CONFIANCE, EntreeANN, EntreeLSTM
+
+RACINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+NB_REPETITIONS = 200
+TAILLE_LOT = 256
+
+
+def latences(modele, exemples, repetitions=NB_REPETITIONS):
+    """Latences (ms) d'un exemple à la fois."""
+    modele.predict_on_batch(exemples[:1])  # Premier appel à part (préparation)
+    mesures = []
+    for i in range(repetitions):
+        debut = time.perf_counter()
+        modele.predict_on_batch(exemples[i % len(exemples)][None])
+        mesures.append(time.perf_counter() - debut)
+    return np.array(mesures) * 1000
+
+
+def debit(modele, exemples, taille_lot=TAILLE_LOT):
+    """Exemples/s par lots de taille_lot ; rend aussi les probabilités de tous les exemples."""
+    debut = time.perf_counter()
+    probabilites = np.concatenate([np.asarray(modele.predict_on_batch(exemples[i:i + taille_lot]), dtype=np.float32)
+                                   for i in range(0, len(exemples), taille_lot)])
+    return len(exemples) / (time.perf_counter() - debut), probabilites
+
+
+def lettres_lstm(probabilites, decoupage):
+    """Classe prédite par fichier (moyenne des séquences confiantes), -1 si aucune séquence n'est confiante."""
+    predites = []
+    for p in np.split(probabilites, decoupage):
+        confiantes = p[p.max(axis=1) >= SEUIL_CONFIANCE]
+        predites.append(int(np.argmax(confiantes.mean(axis=0))) if len(confiantes) else -1)
+    return np.array(predites)
+
+
+def evaluer(nom, modeles, exemples, attendues, decoupage=None):
+    """Mesures de chaque modèle {"float32": (modèle, chemin), "quantifie": ...} sur les mêmes exemples."""
+    resultats, predites = {}, {}
+    for version, (modele, chemin) in modeles.items():
+        mesures = latences(modele, exemples)
+        par_s, probabilites = debit(modele, exemples)
+        predites[version] = probabilites.argmax(axis=1) if decoupage is None else lettres_lstm(probabilites, decoupage)
+        resultats[version] = {"version": getattr(modele, "version", version), "taille_ko": os.path.getsize(chemin) / 1024,
+                              "p50_ms": float(np.percentile(mesures, 50)), "p99_ms": float(np.percentile(mesures, 99)), "exemples_par_s": par_s,
+                              "precision": float(np.mean(predites[version] == attendues))}
+    resultats["accord"] = float(np.mean(predites["float32"] == predites["quantifie"]))
+    print(f"📊 {nom} : {len(attendues)} fichiers, {len(exemples)} exemples")
+    return resultats
+
+
+def rapport_markdown(resultats, test):
+    lignes = [f"# Quantification : rapport ({test})", "",
+              "| Modèle | Version | Taille (Ko) | Latence p50 (ms) | Latence p99 (ms) | Débit (exemples/s) | Précision |",
+              "|---|---|---:|---:|---:|---:|---:|"]
+    for nom, r in resultats.items():
+        for version in ("float32", "quantifie"):
+            v = r[version]
+            lignes.append(f"| {nom} | {v['version']} | {v['taille_ko']:.0f} | {v['p50_ms']:.3f} | {v['p99_ms']:.3f} | "
+                          f"{v['exemples_par_s']:.0f} | {v['precision'] * 100:.1f} % |")
+    lignes.append("")
+    lignes += [f"- {nom} : même lettre prédite par le modèle float32 et le modèle quantifié pour "
+               f"{r['accord'] * 100:.1f} % des fichiers" for nom, r in resultats.items()]
+    return "\n".join(lignes) + "\n"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Taille, latence, débit et précision des modèles quantifiés et float32")
+    parser.add_argument("--ann", default=os.path.join(RACINE, "ANN"))
+    parser.add_argument("--lstm", default=os.path.join(RACINE, "LSTM"))
+    parser.add_argument("--test", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "Test"))
+    parser.add_argument("--exemples", type=int, default=NB_EXEMPLES, help="exemples de calibration si un modèle manque")
+    parser.add_argument("--bits-lstm", type=int, choices=(8, 16), default=BITS_LSTM, help="activations du LSTM créé")
+    parser.add_argument("--sortie", default="rapport_quantification", help="fichiers .md et .json écrits")
+    args = parser.parse_args()
+
+    import joblib
+    from tensorflow.keras.models import load_model
+
+    fichiers = lister_fichiers(args.test)
+    enregistrements = [charger(os.path.join(args.test, relatif)) for relatif, _ in fichiers]
+    lettres_test = [lettre.split("_")[0] for _, lettre in fichiers]
+    resultats = {}
+
+    if os.path.exists(os.path.join(args.ann, "modele_lettres.keras")):
+        keras, quantifie = os.path.join(args.ann, "modele_lettres.keras"), os.path.join(args.ann, FICHIER_ANN)
+        modele = load_model(keras)
+        if not a_jour(quantifie, keras):
+            quantifier(modele, representatif_ann(args.ann, os.path.join(args.ann, "Lettres"), args.exemples), quantifie,
+                       source=keras)
+        scaler = joblib.load(os.path.join(args.ann, "scaler.pkl"))
+        classes = [str(c) for c in joblib.load(os.path.join(args.ann, "label_encoder.pkl")).classes_]
+        entree = EntreeANN(joblib.load(os.path.join(args.ann, "caracteristiques.pkl")))
+        X = scaler.transform(np.stack([entree(e) for e in enregistrements])).astype(np.float32)
+        attendues = np.array([classes.index(l) if l in classes else -2 for l in lettres_test])
+        resultats["ANN"] = evaluer("ANN", {"float32": (modele, keras), "quantifie": (ModeleTFLite(quantifie), quantifie)}, X,
+                                   attendues)
+
+    if os.path.exists(os.path.join(args.lstm, "model_lstm.keras")):
+        keras, quantifie = os.path.join(args.lstm, "model_lstm.keras"), os.path.join(args.lstm, FICHIER_LSTM)
+        modele = load_model(keras)
+        longueur = modele.input_shape[1]
+        if not a_jour(quantifie, keras):
+            quantifier(modele, representatif_lstm(os.path.join(args.lstm, "Lettres"), longueur, args.exemples), quantifie,
+                       args.bits_lstm, keras)
+        classe_to_lettre = joblib.load(os.path.join(args.lstm, "lettres.pkl"))
+        classes = [str(classe_to_lettre[i]).split("_")[0] for i in range(len(classe_to_lettre))]
+        entree = EntreeLSTM(longueur)
+        sequences = [entree(e) for e in enregistrements]
+        decoupage = np.cumsum([len(s) for s in sequences])[:-1]
+        attendues = np.array([classes.index(l) if l in classes else -2 for l in lettres_test])
+        resultats["LSTM"] = evaluer("LSTM", {"float32": (modele, keras), "quantifie": (ModeleTFLite(quantifie), quantifie)},
+                                    np.concatenate(sequences).astype(np.float32), attendues, decoupage)
+
+    if not resultats:
+        sys.exit("❌ Aucun modèle Keras trouvé")
+    texte = rapport_markdown(resultats, args.test)
+    with open(args.sortie + ".md", "w", encoding="utf-8") as f:
+        f.write(texte)
+    with open(args.sortie + ".json", "w", encoding="utf-8") as f:
+        json.dump(resultats, f, indent=1)
+    print(f"\n{texte}\n✅ Rapport écrit : {args.sortie}.md, {args.sortie}.json")
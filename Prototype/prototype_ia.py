@@ -1,14 +1,10 @@
-import serial
-import csv
 import os
 import datetime
 import time
 import threading
-import pandas as pd
 import numpy as np
 import joblib
 import sys
-from tensorflow.keras.models import load_model
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
@@ -20,13 +16,26 @@ from PyQt5.QtWidgets import (
 )
 from PyQt5.QtCore import Qt
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Commun"))
+from enregistreur import Enregistreur, ENTETE_CSV
+from format_binaire import EnregistreurBinaire, binaire_vers_csv, EXTENSION as EXTENSION_BINAIRE
+from trames import AnalyseurTrames, AUTRE
+from lecture_serie import LecteurSerie
+from simulateur import ouvrir_port
+from calibration import CacheCalibration, arreter_flux, demarrer_session, resume_calibration
+from acquisition import ConditionArret, NB_TRAMES_SESSION, acquerir, resume_session
+from chargement import charger
+from service_prediction import EntreeANN, ServiceIndisponible, predire, service_disponible
+from reseau_numpy import FICHIER as FICHIER_NUMPY, ReseauNumpy
+from quantification import FICHIER_ANN as FICHIER_INT8, QUANTIFIE, modele_quantifie
+
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Interface Capteur - Graphe & Commande")
 
         # --- Variables ---
-        self.ser = serial.Serial("COM9", baudrate=430000, timeout=1)
+        self.ser = ouvrir_port(os.environ.get("NANOMADE_PORT", "COM9"), baudrate=430000, timeout=1)  # simulateur:// sans le kit
         self.i = 0
         self.lecture_continue_active = True
         self.running = True
@@ -35,6 +44,14 @@ class MainWindow(QMainWindow):
         self.data_buffers = [deque([0.0] * self.max_length, maxlen=self.max_length) for _ in range(self.num_channels_to_plot)]
         self.time_buffer = deque([0.0] * self.max_length, maxlen=self.max_length)
         self.lock = threading.Lock()
+        self.lock_serie = threading.Lock()  # Une seule lecture du port à la fois (lecture continue / acquisition)
+        self.analyseur = AnalyseurTrames(capacite=64, reordonner=False)  # Ordre des colonnes M_F_1..8 du CSV
+        self.lecteur = LecteurSerie(self.ser, self.analyseur)
+        self.enregistreur = None
+        self.format_enregistrement = "csv"  # "csv" ou "binaire" (session .nmd exportée en CSV pour la prédiction)
+        self.debut_appui = None  # Instant de l'appui sur le bouton (perf_counter)
+        # Calibration reprise d'un appui à l'autre tant que la ligne de base reste à 15 unités ADC près (None : toujours recalibrer)
+        self.cache_calibration = CacheCalibration(tolerance=15, sessions_max=50)
 
         # --- Canvas Matplotlib intégré ---
         self.fig, self.ax = plt.subplots()
@@ -52,6 +69,9 @@ class MainWindow(QMainWindow):
         self.label_proba = QLabel("Prédiction en attente...", self)
         self.label_proba.setAlignment(Qt.AlignmentFlag.AlignCenter)
         self.label_proba.setStyleSheet("font-size: 16px; font-weight: bold; color: black; padding: 10px;")
+        self.label_latence = QLabel("", self)
+        self.label_latence.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.label_latence.setStyleSheet("font-size: 12px; color: gray; padding: 5px;")
 
         # --- Layout ---
         layout = QVBoxLayout()
@@ -59,16 +79,18 @@ class MainWindow(QMainWindow):
         layout.addWidget(self.button)
         layout.addWidget(self.label_prediction)  # Ajoute le label après le bouton
         layout.addWidget(self.label_proba)
+        layout.addWidget(self.label_latence)
 
         container = QWidget()
         container.setLayout(layout)
         self.setCentralWidget(container)
 
-        # --- Chargement IA ---
-        self.modele = load_model('modele_lettres.keras')
-        self.scaler = joblib.load('scaler.pkl')
-        self.label_encoder = joblib.load('label_encoder.pkl')
-        self.taille_max = joblib.load('taille_max.pkl')
+        # --- Chargement IA (rien à charger si le service de prédiction tourne déjà) ---
+        self.service = service_disponible("ann")
+        if self.service:
+            print("🔌 Prédictions envoyées au service de prédiction.")
+        else:
+            self.charger_modele_local()
 
         # --- Threads ---
         threading.Thread(target=self.lecture_continue, daemon=True).start()
@@ -80,8 +102,8 @@ class MainWindow(QMainWindow):
 
         # --- Calibration initiale ---
         print("🔧 Calibration initiale...")
-        self.send_calibration_commands_no_save()
-        print("✅ Calibration OK.")
+        if self.send_calibration_commands_no_save()["complete"]:
+            print("✅ Calibration OK.")
 
 
     # --- Graph Init ---
@@ -116,28 +138,64 @@ class MainWindow(QMainWindow):
     def create_csv_file(self, directory):
         os.makedirs(directory, exist_ok=True)
         timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = os.path.join(directory, f"sensor_data_{timestamp}.csv")
-        with open(filename, mode='w', newline='') as file:
-            writer = csv.writer(file)
-            writer.writerow(["Timestamp", *[f"{p}_{i}" for p in ["M_F", "U_F", "M_C", "U_C"] for i in range(1, 9)]])
+        if self.format_enregistrement == "binaire":
+            filename = os.path.join(directory, f"sensor_data_{timestamp}{EXTENSION_BINAIRE}")
+            self.enregistreur = EnregistreurBinaire(filename)
+        else:
+            filename = os.path.join(directory, f"sensor_data_{timestamp}.csv")
+            self.enregistreur = Enregistreur(filename, entete=ENTETE_CSV)
         return filename
 
-    def save_to_csv(self, filename, data):
+    def save_to_csv(self, data):
+        try:
+            timestamp = time.monotonic_ns()  # Mis en forme à l'écriture (ancre murale de la session)
+            self.enregistreur.ajouter_trame(timestamp, data)
+        except Exception as e:
+            print(f"⚠️ Erreur CSV : {e}")
+
+    def save_lot_to_csv(self, trames, reponses):
         try:
-            timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S,%f")[:-3]
-            values = data.split()
-            values += [""] * (32 - len(values))
-            row = [timestamp] + values[:32]
-            with open(filename, mode='a', newline='') as file:
-                csv.writer(file).writerow(row)
+            timestamp = time.monotonic_ns()
+            self.enregistreur.ajouter_lot(timestamp, trames, reponses)
         except Exception as e:
             print(f"⚠️ Erreur CSV : {e}")
 
+    def fermer_enregistrement(self):
+        if self.enregistreur is None:
+            return
+        try:
+            self.enregistreur.fermer()
+        except Exception as e:
+            print(f"⚠️ Enregistrement incomplet ({self.enregistreur.filename}) : {e}")
+        stats = self.enregistreur.statistiques()
+        print(f"💾 {stats['lignes_ecrites']} lignes écrites ({stats['lignes_par_s']:.0f} lignes/s, "
+              f"file max restante : {stats['profondeur_file']}).")
+        self.enregistreur = None
+
+    def charger_modele_local(self):
+        """Modèle de l'ANN chargé dans l'application (pas de service, ou service arrêté en cours de route)."""
+        # Modèle quantifié int8 (Commun/quantification.py) pour les PC peu puissants, seulement si demandé et à jour
+        quantifie = modele_quantifie(FICHIER_INT8, 'modele_lettres.keras') if QUANTIFIE else None
+        if quantifie is None and os.path.exists(FICHIER_NUMPY):
+            # Modèle exporté (Commun/reseau_numpy.py) : prédiction en NumPy, sans charger TensorFlow
+            self.reseau = ReseauNumpy(FICHIER_NUMPY)
+            self.extraction, self.taille_max = self.reseau.extraction, self.reseau.taille_max
+        else:
+            self.reseau = None
+            if quantifie is not None:
+                self.modele = quantifie
+            else:
+                from tensorflow.keras.models import load_model
+                self.modele = load_model('modele_lettres.keras')
+            self.scaler = joblib.load('scaler.pkl')
+            self.label_encoder = joblib.load('label_encoder.pkl')
+            # Caractéristiques du modèle (caracteristiques.pkl) ; un modèle entraîné avant elles attend le fichier à plat
+            self.extraction = joblib.load('caracteristiques.pkl') if os.path.exists('caracteristiques.pkl') else None
+            self.taille_max = joblib.load('taille_max.pkl') if self.extraction is None else None
+
     def traiter_csv(self, chemin_fichier):
-        df = pd.read_csv(chemin_fichier, header=None, dtype=str)
-        df = df.dropna(how="all").apply(pd.to_numeric, errors='coerce')
-        vecteur = np.nan_to_num(df.to_numpy().flatten(), nan=0.0)
-        return vecteur
+        # Caractéristiques, ou fichier à plat complété jusqu'à la longueur d'entraînement (arrêt en fin de geste)
+        return EntreeANN(self.extraction, self.taille_max)(charger(chemin_fichier))
 
     def afficher_message(self, message):
         self.label_prediction.setText(message)
@@ -145,21 +203,40 @@ class MainWindow(QMainWindow):
 
     
     def predire_depuis_csv(self, fichier_csv):
-        vecteur = self.traiter_csv(fichier_csv)
-        vecteur = np.pad(vecteur, (0, max(0, self.taille_max - len(vecteur))), mode='constant')
-        vecteur_normalise = self.scaler.transform([vecteur])
-        prediction = self.modele.predict(vecteur_normalise)[0]  # Récupère directement le tableau 1D
-
-        # Trouver la classe avec la probabilité maximale
-        classe_predite = np.argmax(prediction)
-        lettre_predite = self.label_encoder.inverse_transform([classe_predite])[0]
+        if self.service:
+            try:
+                resultat = predire("ann", fichier=fichier_csv)
+            except ServiceIndisponible as e:
+                print(f"⚠️ {e} : modèle chargé en local.")
+                self.service = False
+                self.charger_modele_local()
+            except ValueError as e:
+                # Demande refusée par le service (fichier illisible...) : pas de lettre pour cette session
+                print(f"⚠️ Prédiction refusée par le service : {e}")
+                self.afficher_message("❌ Prédiction impossible")
+                self.label_proba.setText(f"⚠️ {e}")
+                return None
+        if self.service:
+            prediction, lettre_predite, classes = resultat["probabilites"], resultat["lettre"], resultat["classes"]
+        elif self.reseau is not None:
+            lettre_predite, prediction = self.reseau.predire(self.traiter_csv(fichier_csv))
+            classes = self.reseau.classes
+        else:
+            vecteur = self.traiter_csv(fichier_csv)
+            vecteur_normalise = self.scaler.transform([vecteur])
+            prediction = self.modele.predict(vecteur_normalise)[0]  # Récupère directement le tableau 1D
+
+            # Trouver la classe avec la probabilité maximale
+            classe_predite = np.argmax(prediction)
+            lettre_predite = self.label_encoder.inverse_transform([classe_predite])[0]
+            classes = self.label_encoder.classes_
 
         # Afficher la lettre prédite
         self.afficher_message(f"🧠 Lettre prédite : {lettre_predite}")
 
         # Formater les probabilités
         proba_formatees = "\n".join([
-            f"{self.label_encoder.inverse_transform([i])[0]} : {prob*100:.2f}%" 
+            f"{classes[i]} : {prob*100:.2f}%" 
             for i, prob in enumerate(prediction)
         ])
 
@@ -169,63 +246,44 @@ class MainWindow(QMainWindow):
 
     # --- Communication Capteur ---
     def send_calibration_commands(self, filename):
-        self.ser.reset_input_buffer()
-        for command in ["K\n", "GD\n", "CC\n"]:
-            print(f"➡️ Envoi commande : {command.strip()}")
-            self.ser.write(command.encode())
-            time.sleep(0.5)
-            start_time = time.time()
-            while time.time() - start_time < 1.5:
-                try:
-                    data = self.ser.readline().decode().strip()
-                    if data:
-                        print(f"💬 Calibration: {data}")
-                        self.save_to_csv(filename, data)
-                except Exception as e:
-                    print(f"⚠️ Erreur lecture calibration : {e}")
-                    break
-        self.ser.write("R\n".encode())
-        time.sleep(0.5)
+        """Calibration K, GD, CC (ou calibration en cache si la ligne de base n'a pas dérivé), enregistrée, puis démarrage (R)."""
+        resultat = demarrer_session(self.ser, self.lecteur, self.cache_calibration, self.enregistreur)
+        for commande, reponse in resultat["reponses"].items():
+            print(f"💬 Calibration {commande} : {reponse}")
+        print(resume_calibration(resultat))
+        return resultat
 
     def send_calibration_commands_no_save(self):
-        for command in ["K\n", "GD\n", "CC\n"]:
-            self.ser.write(command.encode())
-            time.sleep(0.1)
-            try:
-                data = self.ser.readline().decode().strip()
-                if data:
-                    print(f"💬 Calibration: {data}")
-            except Exception as e:
-                print(f"⚠️ Erreur lecture calibration: {e}")
-        self.ser.write("R\n".encode())
-        time.sleep(0.5)
-
-    def discard_last_line(self):
-        try:
-            data = self.ser.readline().decode().strip()
-            print(f"⚠️ Ignorée : {data}")
-        except Exception as e:
-            print(f"⚠️ Erreur lecture (ignorée) : {e}")
+        """Calibration sans enregistrement ; la lecture continue est suspendue pendant l'échange."""
+        with self.lock_serie:
+            resultat = demarrer_session(self.ser, self.lecteur, self.cache_calibration)
+        print(resume_calibration(resultat))
+        return resultat
+
+    def ajouter_au_graphe(self, trames, reponses=()):
+        """Ajoute les voies tracées d'un bloc de trames analysées aux buffers du graphe."""
+        for _, nature, texte in reponses:
+            if nature == AUTRE:
+                print(f"⚠️ Valeurs non valides : {texte}")
+        if not len(trames):
+            return
+        with self.lock:
+            current_time = time.time()
+            for valeurs in trames["analogique"][:, :self.num_channels_to_plot].tolist():
+                for j, valeur in enumerate(valeurs):
+                    self.data_buffers[j].append(float(valeur))
+                self.time_buffer.append(current_time)
 
     def lecture_continue(self):
         compteur = 0
         while self.running:  # Utilise le flag pour s’arrêter proprement
             if self.lecture_continue_active:
                 try:
-                    data = self.ser.readline().decode().strip()
-                    if data:
-                        print(f"📡 {data}")
-                        values = data.split()
-                        if len(values) >= self.num_channels_to_plot:
-                            try:
-                                float_values = [float(v) for v in values[:self.num_channels_to_plot]]
-                                with self.lock:
-                                    current_time = time.time()
-                                    for j in range(self.num_channels_to_plot):
-                                        self.data_buffers[j].append(float_values[j])
-                                    self.time_buffer.append(current_time)
-                            except ValueError:
-                                print(f"⚠️ Valeurs non valides : {values}")
+                    with self.lock_serie:
+                        if not self.lecture_continue_active:
+                            continue
+                        trames, reponses = self.lecteur.lire()
+                        self.ajouter_au_graphe(trames, reponses)
                 except Exception as e:
                     print(f"⚠️ Lecture continue : {e}")
             else:
@@ -233,71 +291,83 @@ class MainWindow(QMainWindow):
 
             compteur += 1
             if compteur >= 100:
-                print("🟢 Thread actif.")
+                print(f"🟢 Thread actif ({self.lecteur.statistiques()['trames_par_s']:.0f} trames/s).")
                 compteur = 0
 
 
-    def read_from_sensor(self, filename, max_size_kb=38):
+    def enregistrer_lot(self, trames, reponses):
+        self.save_lot_to_csv(trames, reponses)
+        self.ajouter_au_graphe(trames, reponses)
+
+    def read_from_sensor(self, filename, condition=None, trames_initiales=0):
+        """Enregistre jusqu'à la condition d'arrêt (par défaut la longueur des enregistrements d'entraînement).
+
+        trames_initiales : trames de la ligne de base déjà écrites par send_calibration_commands.
+        """
+        if condition is None:
+            condition = ConditionArret(nb_trames=NB_TRAMES_SESSION)
+        bilan = None
         try:
-            while True:
-                if os.path.exists(filename):
-                    file_size_kb = os.path.getsize(filename) / 1024
-                    if file_size_kb >= max_size_kb:
-                        print(f"📁 Fichier atteint {file_size_kb:.2f} Ko. Arrêt acquisition.")
-                        break
-                data = self.ser.readline().decode().strip()
-                if data:
-                    self.save_to_csv(filename, data)
-                    values = data.split()
-                    with self.lock:
-                        current_time = time.time()
-                        try:
-                            float_values = [float(v) for v in values[:self.num_channels_to_plot]]
-                            for j in range(self.num_channels_to_plot):
-                                self.data_buffers[j].append(float_values[j])
-                            self.time_buffer.append(current_time)
-                        except ValueError:
-                            print(f"⚠️ Valeurs non valides : {values}")
+            bilan = acquerir(self.lecteur, condition, self.enregistrer_lot, trames_initiales)
+            print(resume_session(bilan))
         except Exception as e:
             print(f"⚠️ Erreur de lecture: {e}")
         finally:
-            self.ser.write("S\n".encode())
-            time.sleep(0.5)
-            self.discard_last_line()
+            print(f"⚠️ Ignorés : {arreter_flux(self.ser, self.lecteur)} octets en attente "
+                  f"({self.lecteur.lignes_invalides} ligne(s) illisible(s) depuis le démarrage).")
+        return bilan
+
+    def afficher_latence(self, bilan, fin_geste):
+        """Affiche le délai entre l'appui sur le bouton et la lettre prédite, et sa décomposition."""
+        maintenant = time.perf_counter()
+        texte = f"⏱️ Bouton → lettre : {(maintenant - self.debut_appui) * 1000:.0f} ms"
+        if bilan is not None:
+            texte += (f" (acquisition {bilan['duree_ms']:.0f} ms, {bilan['trames']} trames, arrêt : {bilan['raison']} ; "
+                      f"prédiction {(maintenant - fin_geste) * 1000:.0f} ms)")
+        self.label_latence.setText(texte)
+        print(texte)
 
     def start_acquisition_sequence(self):
         print(f"\n🔴 Début acquisition (session {self.i})...")
         self.i += 1
-        self.ser.write("S\n".encode())
-        time.sleep(2)
         self.lecture_continue_active = False
-        self.discard_last_line()
-        self.ser.reset_input_buffer()
-
-        csv_file = self.create_csv_file("enregistrements")
-        self.send_calibration_commands(csv_file)
-        self.read_from_sensor(csv_file, max_size_kb=38)
-        lettre = self.predire_depuis_csv(csv_file)
-
-        self.ser.write("S\n".encode())
-        time.sleep(0.5)
-        self.discard_last_line()
-
-        print("⏳ Reprise lecture continue dans 1 sec...\n")
-        time.sleep(1)
-        self.ser.reset_input_buffer()
-        self.ser.write("R\n".encode())
-        self.lecture_continue_active = True
+        try:
+            with self.lock_serie:  # Attendre la fin d'une éventuelle lecture continue en cours
+                print(f"⏹️ Capteur arrêté ({arreter_flux(self.ser, self.lecteur)} octets ignorés).")
+
+            csv_file = self.create_csv_file("enregistrements")
+            calibration = self.send_calibration_commands(csv_file)
+            # Arrêt dès la fin du geste (retour à la ligne de base et doigt levé pendant 0,7 s, pour ne pas couper
+            # entre les traits d'une lettre comme H), au plus la longueur habituelle
+            condition = ConditionArret(nb_trames=NB_TRAMES_SESSION, activite=True, presence=True, trames_calmes=35,
+                                       ligne_base=self.cache_calibration.base)
+            bilan = self.read_from_sensor(csv_file, condition, calibration["trames_ecrites"])
+            fin_geste = time.perf_counter()
+            self.fermer_enregistrement()
+            if csv_file.endswith(EXTENSION_BINAIRE):
+                session = csv_file
+                csv_file = os.path.splitext(session)[0] + ".csv"
+                binaire_vers_csv(session, csv_file)
+            lettre = self.predire_depuis_csv(csv_file)
+            self.afficher_latence(bilan, fin_geste)
+        finally:
+            # Même si la session ou la prédiction échoue : sinon le graphe reste figé jusqu'au redémarrage.
+            # Le flux est déjà arrêté et vidé par read_from_sensor (arreter_flux) : reprise sans pause fixe
+            self.lecteur.vider()
+            self.ser.write("R\n".encode())
+            self.lecture_continue_active = True
 
     def start_command(self):
+        self.debut_appui = time.perf_counter()
         threading.Thread(target=self.start_acquisition_sequence, daemon=True).start()
 
     def closeEvent(self, event):
         print("🛑 Fermeture de l'application...")
         self.running = False  # Stopper le thread proprement
+        self.fermer_enregistrement()
         try:
             self.ser.write("S\n".encode())
-            time.sleep(0.5)
+            self.ser.flush()  # S transmis avant de fermer le port, sans pause fixe
             self.ser.close()
             print("🔌 Port série fermé correctement.")
         except Exception as e:
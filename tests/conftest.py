@@ -0,0 +1,6 @@
+"""Tests des modules partagés (Commun) : ils s'importent comme dans les scripts, depuis le dossier Commun."""
+import os
+import sys
+
+RACINE = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.append(os.path.join(RACINE, "Commun"))
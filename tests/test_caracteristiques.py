@@ -0,0 +1,42 @@
+"""Entrées des réseaux : nettoyage du LSTM identique à l'ancien script pandas, caractéristiques de l'ANN."""
+import numpy as np
+import pandas as pd
+
+from caracteristiques import Caracteristiques, nettoyer, reechantillonner
+from chargement import charger
+from simulateur import ENREGISTREMENTS_DEFAUT, lister_enregistrements
+
+FICHIERS = lister_enregistrements(ENREGISTREMENTS_DEFAUT)[::8] + lister_enregistrements("ANN/Lettres")[::40]
+
+
+def nettoyer_pandas(fichier):
+    """Nettoyage de l'ancien LSTM/nettoyage_csv.py, fichier par fichier."""
+    df = pd.read_csv(fichier)
+    df = df.apply(pd.to_numeric, errors="coerce").dropna(how="all", axis=1).dropna(how="any")
+    df = df.drop(columns=[c for c in ["Timestamp"] if c in df.columns])
+    colonnes = [c for c in df.columns if df[c].iloc[0] != 1000 and any(df[c] != 3299)]
+    df = df[colonnes].iloc[:, :8]
+    valides = df[(df != 3299) & (df != 1000) & (df != 0)]
+    return df / valides.max().max()
+
+
+def test_nettoyer_identique_a_l_ancien_script():
+    for fichier in FICHIERS:
+        attendu = nettoyer_pandas(fichier)
+        df = nettoyer(charger(fichier))
+        assert list(df.columns) == list(attendu.columns), fichier
+        np.testing.assert_allclose(df.to_numpy(), attendu.to_numpy(), err_msg=fichier)
+
+
+def test_reechantillonner_garde_les_extremites():
+    signal = np.arange(20, dtype=np.float32).reshape(10, 2)
+    sortie = reechantillonner(signal, 4)
+    np.testing.assert_allclose(sortie, [[0, 1], [6, 7], [12, 13], [18, 19]])
+
+
+def test_caracteristiques_de_taille_fixe():
+    extraction = Caracteristiques()
+    for fichier in FICHIERS:
+        matrice, _ = extraction(fichier)
+        assert matrice.shape == (extraction.nb_pas, 2 * extraction.nb_canaux)
+        assert np.isfinite(matrice).all()
@@ -0,0 +1,83 @@
+"""Enregistreur CSV : sessions rejouées par le capteur simulé, index des séries écrit à la fermeture."""
+import json
+import time
+
+import pytest
+
+from acquisition import ConditionArret, acquerir
+from calibration import CacheCalibration, arreter_flux, demarrer_session
+from enregistreur import ENTETE_CSV, Enregistreur
+from index_series import chemin_index, construire_index, lire_index
+from lecture_serie import LecteurSerie
+from simulateur import ENREGISTREMENTS_DEFAUT, ouvrir_port
+from trames import AnalyseurTrames
+
+NB_TRAMES = 100
+
+
+def enregistrer_sessions(fichier, nb_sessions=2, nb_trames=NB_TRAMES):
+    """Sessions du capteur simulé écrites dans `fichier` comme par l'outil de prise de données."""
+    ser = ouvrir_port(f"simulateur://{ENREGISTREMENTS_DEFAUT}?vitesse=20", timeout=1)
+    lecteur = LecteurSerie(ser, AnalyseurTrames(capacite=64, reordonner=False))
+    cache = CacheCalibration(tolerance=None)
+    try:
+        for _ in range(nb_sessions):
+            enregistreur = Enregistreur(fichier, entete=ENTETE_CSV)
+            resultat = demarrer_session(ser, lecteur, cache, enregistreur)
+            acquerir(lecteur, ConditionArret(nb_trames=nb_trames),
+                     lambda trames, reponses: enregistreur.ajouter_lot(time.monotonic_ns(), trames, reponses),
+                     resultat["trames_ecrites"])
+            arreter_flux(ser, lecteur)
+            enregistreur.fermer()
+    finally:
+        ser.close()
+
+
+@pytest.fixture(scope="module")
+def session(tmp_path_factory):
+    fichier = str(tmp_path_factory.mktemp("sessions") / "session.csv")
+    enregistrer_sessions(fichier)
+    with open(chemin_index(fichier), encoding="utf-8") as f:
+        return fichier, json.load(f)
+
+
+def test_horodatages_de_l_index_en_heure_murale(session):
+    _, index = session
+    assert len(index["series"]) == 2
+    for serie in index["series"]:
+        assert serie["trames"] == NB_TRAMES
+        assert serie["debut_ns"] <= serie["fin_ns"] < serie["debut_ns"] + 60 * 10 ** 9
+
+
+def test_index_tenu_a_l_ecriture_identique_au_balayage(session):
+    fichier, index = session
+    assert lire_index(fichier) == index  # Index en cache encore valide : pas de nouveau balayage
+    balayage = construire_index(fichier)
+    assert balayage["lignes"] == index["lignes"]
+    assert balayage["series"] == index["series"]
+
+
+def test_lignes_ecrites_sans_l_en_tete(tmp_path):
+    fichier = str(tmp_path / "lignes.csv")
+    enregistreur = Enregistreur(fichier, entete=ENTETE_CSV)
+    for _ in range(3):
+        enregistreur.ajouter_trame(time.monotonic_ns(), " ".join(["100"] * 32))
+    enregistreur.fermer()
+    assert enregistreur.statistiques()["lignes_ecrites"] == 3
+    with open(fichier, encoding="utf-8") as f:
+        assert len(f.readlines()) == 4
+
+
+def test_erreur_d_ecriture_relancee(tmp_path, monkeypatch):
+    def echouer(self, lignes):
+        raise OSError("disque plein")
+
+    enregistreur = Enregistreur(str(tmp_path / "erreur.csv"), entete=ENTETE_CSV)
+    monkeypatch.setattr(Enregistreur, "_ecrire_lignes", echouer)
+    enregistreur.ajouter_trame(time.monotonic_ns(), " ".join(["100"] * 32))
+    enregistreur.thread.join(timeout=5)  # Le thread d'écriture s'arrête sur l'erreur
+    with pytest.raises(OSError):
+        enregistreur.ajouter_trame(time.monotonic_ns(), " ".join(["100"] * 32))
+    assert enregistreur.file_attente.empty()
+    with pytest.raises(OSError):
+        enregistreur.fermer()
@@ -0,0 +1,53 @@
+"""Fenêtres glissantes : mêmes séquences que des copies fenêtre par fenêtre, sans déborder d'un fichier à l'autre."""
+import numpy as np
+
+from fenetres import Fenetres, indices_fenetres
+
+LONGUEUR = 10
+
+
+def corpus():
+    """Trois fichiers mis bout à bout (le deuxième trop court pour une fenêtre)."""
+    lignes = [35, 7, 22]
+    debuts = np.concatenate([[0], np.cumsum(lignes)[:-1]])
+    donnees = np.random.default_rng(0).random((sum(lignes), 8)).astype(np.float32)
+    return donnees, debuts, lignes
+
+
+def fenetres_copiees(donnees, debuts, lignes, longueur, pas):
+    """Séquences copiées une à une, comme le faisait LSTM.py avant les vues."""
+    fenetres, classes = [], []
+    for classe, (debut, n) in enumerate(zip(debuts, lignes)):
+        for i in range(0, n - longueur + 1, pas):
+            fenetres.append(donnees[debut + i:debut + i + longueur].copy())
+            classes.append(classe)
+    return np.array(fenetres), np.array(classes)
+
+
+def test_fenetres_identiques_aux_copies():
+    donnees, debuts, lignes = corpus()
+    for pas in (1, 3):
+        indices = indices_fenetres(debuts, lignes, LONGUEUR, pas)
+        fichier = np.searchsorted(debuts, indices, side="right") - 1
+        fenetres = Fenetres(donnees, indices, fichier, LONGUEUR)
+        attendues, classes = fenetres_copiees(donnees, debuts, lignes, LONGUEUR, pas)
+        x, y = fenetres.lot(np.arange(len(fenetres)))
+        np.testing.assert_array_equal(x, attendues)
+        np.testing.assert_array_equal(y, classes)
+        assert fenetres.forme == (LONGUEUR, 8)
+
+
+def test_lots_melanges_couvrent_toutes_les_fenetres():
+    donnees, debuts, lignes = corpus()
+    indices = indices_fenetres(debuts, lignes, LONGUEUR)
+    fenetres = Fenetres(donnees, indices, np.zeros(len(indices)), LONGUEUR)
+    lots = list(fenetres.lots(8, melanger=True, graine=1))
+    assert [len(x) for x, _ in lots[:-1]] == [8] * (len(lots) - 1)
+    x = np.concatenate([x for x, _ in lots])
+    attendues, _ = fenetres_copiees(donnees, debuts, lignes, LONGUEUR, 1)
+    assert sorted(map(bytes, x)) == sorted(map(bytes, attendues))
+
+
+def test_donnees_plus_courtes_qu_une_fenetre():
+    fenetres = Fenetres(np.zeros((3, 8), np.float32), [], [], LONGUEUR)
+    assert len(fenetres) == 0 and list(fenetres.lots(4)) == []
@@ -0,0 +1,50 @@
+"""Sessions binaires .nmd : lecture après une interruption et conversion depuis/vers le CSV historique."""
+import os
+import shutil
+
+import numpy as np
+
+from chargement import charger
+from format_binaire import DTYPE_TRAME, EcrivainBinaire, binaire_vers_csv, csv_vers_binaire, lire_session
+from simulateur import ENREGISTREMENTS_DEFAUT, lister_enregistrements
+
+CALIBRATION = " ".join(["512"] * 8 + ["1000"] * 8)
+
+
+def trames(n, debut=0):
+    bloc = np.zeros(n, dtype=DTYPE_TRAME)
+    bloc["t_ns"] = np.arange(debut, debut + n) * 18_230_000
+    bloc["analogique"] = np.arange(debut, debut + n)[:, None] % 1000
+    return bloc
+
+
+def test_session_interrompue_lisible_au_dernier_vidage(tmp_path):
+    fichier = str(tmp_path / "session.nmd")
+    ecrivain = EcrivainBinaire(fichier)
+    ecrivain.ecrire_reponse(0, CALIBRATION)
+    ecrivain.ecrire_trames(trames(100))
+    ecrivain.vider()
+    ecrivain.ecrire_trames(trames(50, 100))  # Pas encore vidées : perdues si le programme s'arrête ici
+    ecrivain.fichier.flush()
+
+    copie = str(tmp_path / "interrompue.nmd")
+    shutil.copy(fichier, copie)
+    session = lire_session(copie, mmap=False)
+    assert len(session) == 100
+    assert session.meta["nb_trames"] == 100 and session.series[0]["calibration"] == CALIBRATION
+
+    ecrivain.fermer()
+    session = lire_session(fichier, mmap=False)
+    assert len(session) == 150
+    np.testing.assert_array_equal(session.analogique, np.concatenate([trames(100), trames(50, 100)])["analogique"])
+
+
+def test_aller_retour_csv(tmp_path):
+    source = next(f for f in lister_enregistrements(ENREGISTREMENTS_DEFAUT) if f.endswith(".csv"))
+    binaire, retour = str(tmp_path / "session.nmd"), str(tmp_path / "retour.csv")
+    csv_vers_binaire(source, binaire)
+    binaire_vers_csv(binaire, retour)
+    avant, apres = charger(source), charger(retour)
+    np.testing.assert_array_equal(avant.analogique, apres.analogique)
+    np.testing.assert_array_equal(avant.presence, apres.presence)
+    assert os.path.getsize(binaire) < os.path.getsize(source)
@@ -0,0 +1,22 @@
+"""LSTM trame par trame : normalisation du flux du capteur."""
+import numpy as np
+
+from lstm_continu import NormalisationContinue
+from trames import NB_CANAUX, VALEUR_INACTIVE
+
+
+def geste(pic, n=40):
+    analogique = np.full((n, NB_CANAUX), VALEUR_INACTIVE, dtype=np.uint16)
+    analogique[:, :8] = 200
+    analogique[n // 2, :8] = pic
+    return analogique, np.zeros((n, NB_CANAUX), dtype=np.uint8)
+
+
+def test_maximum_repris_a_chaque_geste():
+    normalisation = NormalisationContinue()
+    normalisation(*geste(3000))
+    assert normalisation(*geste(500)).max() < 0.2  # Sans remise à zéro, écrasé par l'appui précédent
+    normalisation.reinitialiser()
+    x = normalisation(*geste(500))
+    assert x.max() == 1.0
+    np.testing.assert_allclose(x[-1], NormalisationContinue()(*geste(500))[-1])
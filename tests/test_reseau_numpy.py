@@ -0,0 +1,38 @@
+"""ANN en NumPy : mêmes probabilités que le modèle Keras exporté."""
+import json
+
+import numpy as np
+import pytest
+
+from caracteristiques import Caracteristiques
+from reseau_numpy import VERSION, ReseauNumpy, exporter
+
+
+def test_probabilites_identiques_a_keras(tmp_path):
+    keras = pytest.importorskip("tensorflow").keras
+    preprocessing = pytest.importorskip("sklearn.preprocessing")
+    extraction = Caracteristiques(nb_pas=4, nb_canaux=2)
+    rng = np.random.default_rng(0)
+    x = rng.normal(1500, 200, (64, extraction.taille))
+    scaler = preprocessing.StandardScaler().fit(x)
+    keras.utils.set_random_seed(0)
+    modele = keras.Sequential([keras.Input((extraction.taille,)), keras.layers.Dense(12, activation="relu"),
+                               keras.layers.Dropout(0.3), keras.layers.Dense(8, activation="tanh"),
+                               keras.layers.Dense(3, activation="softmax")])
+    chemin = str(tmp_path / "modele_lettres.npz")
+    exporter(modele, scaler, ["A", "B", "C"], chemin, extraction)
+
+    reseau = ReseauNumpy(chemin)
+    attendu = modele.predict(scaler.transform(x), verbose=0)
+    np.testing.assert_allclose(reseau.probabilites(x), attendu, rtol=1e-5, atol=1e-6)
+    assert reseau.predire(x[0])[0] == "ABC"[int(np.argmax(attendu[0]))]
+    assert reseau.extraction.parametres == extraction.parametres
+
+
+def test_version_inconnue_refusee(tmp_path):
+    chemin = str(tmp_path / "modele_lettres.npz")
+    meta = {"version": VERSION + 1, "activations": ["softmax"], "taille_max": 2}
+    np.savez(chemin, meta=np.array(json.dumps(meta)), classes=np.array(["A", "B"]), moyenne=np.zeros(2),
+             ecart=np.ones(2), poids_0=np.eye(2, dtype=np.float32), biais_0=np.zeros(2, np.float32))
+    with pytest.raises(ValueError):
+        ReseauNumpy(chemin)
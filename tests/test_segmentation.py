@@ -0,0 +1,67 @@
+"""Segmentation des gestes d'un flux continu : bornes du tracé, gestes rendus par morceaux avec un horodatage par trame."""
+import csv
+
+import numpy as np
+
+from enregistreur import ENTETE_CSV, Enregistreur
+from horodatage import PERIODE_TRAME_NS, etaler
+from segmentation import MARGE_AVANT, SEUIL_HAUT, TRAMES_CALMES, SegmenteurGestes, bornes_geste
+from trames import DTYPE_MESURE, NB_CANAUX, VALEUR_INACTIVE
+
+BASE = np.array([200] * 8 + [VALEUR_INACTIVE] * (NB_CANAUX - 8))
+
+
+def flux(repos=60, duree=40, amplitude=300):
+    """Repos, appui (montée puis descente) sur les canaux actifs, puis repos."""
+    trames = np.zeros(2 * repos + duree, dtype=DTYPE_MESURE)
+    trames["analogique"] = BASE
+    trames["analogique"][repos:repos + duree, :8] += (amplitude * np.sin(np.linspace(0, np.pi, duree))).astype(np.uint16)[:, None]
+    return trames
+
+
+def test_horodatages_croissants_dans_un_geste_ecrit(tmp_path):
+    segmenteur = SegmenteurGestes(BASE)
+    trames = flux()
+    gestes = []
+    dernier = None
+    for i, debut in enumerate(range(0, len(trames), 7)):  # Blocs de 7 trames lus toutes les 120 ms
+        bloc = trames[debut:debut + 7]
+        t = (i + 1) * 120_000_000
+        gestes += segmenteur.ajouter(bloc, etaler(t, len(bloc), dernier))
+        dernier = t
+    assert len(gestes) == 1
+    assert len(gestes[0]) > 2  # Plusieurs morceaux, dont certains issus du même bloc
+
+    fichier = str(tmp_path / "geste.csv")
+    enregistreur = Enregistreur(fichier, entete=ENTETE_CSV)
+    for horodatages, morceau in gestes[0]:
+        enregistreur.ajouter_lot(horodatages, morceau)
+    enregistreur.fermer()
+    with open(fichier, newline="", encoding="utf-8") as f:
+        horodatages = np.array([int(ligne[0]) for ligne in list(csv.reader(f))[1:]])
+    assert len(horodatages) == sum(len(morceau) for _, morceau in gestes[0])
+    assert (np.diff(horodatages) > 0).all()
+    assert np.diff(horodatages).max() <= PERIODE_TRAME_NS
+
+
+def test_bornes_geste_avec_marges():
+    trames = flux()
+    depassements = np.flatnonzero(np.abs(trames["analogique"][:, :8].astype(int) - 200).max(axis=1) > SEUIL_HAUT)
+    debut, fin = bornes_geste(trames["analogique"].astype(np.float64))
+    assert debut == depassements[0] - MARGE_AVANT
+    assert depassements[-1] < fin <= depassements[-1] + TRAMES_CALMES + 1
+
+
+def test_bornes_geste_sans_geste():
+    assert bornes_geste(flux(amplitude=0)["analogique"].astype(np.float64)) is None
+
+
+def test_bornes_geste_comme_le_flux_par_blocs():
+    trames = flux()
+    segmenteur = SegmenteurGestes()  # Ligne de base mesurée sur les premières trames, comme bornes_geste
+    gestes = []
+    for debut in range(0, len(trames), 7):
+        gestes += segmenteur.ajouter(trames[debut:debut + 7], 0)
+    assert len(gestes) == 1
+    debut, fin = bornes_geste(trames["analogique"])
+    assert sum(len(morceau) for _, morceau in gestes[0]) == fin - debut
@@ -0,0 +1,34 @@
+"""Capteur simulé : ligne de base gardée d'une session à l'autre tant qu'il n'est pas recalibré."""
+import numpy as np
+
+from acquisition import ConditionArret, acquerir
+from calibration import TOLERANCE_DERIVE, CacheCalibration, arreter_flux, demarrer_session
+from lecture_serie import LecteurSerie
+from simulateur import ENREGISTREMENTS_DEFAUT, Enregistrement, lister_enregistrements, ouvrir_port
+from trames import AnalyseurTrames
+
+
+def test_enregistrement_recentre_sur_la_ligne_de_base():
+    premier, second = (Enregistrement(f) for f in lister_enregistrements(ENREGISTREMENTS_DEFAUT)[:2])
+    recentre = second.recentrer(premier.ligne_de_base())
+    assert len(recentre) == len(second)
+    np.testing.assert_allclose(recentre.ligne_de_base(), premier.ligne_de_base(), atol=0.5)
+    assert second.lignes[0] != recentre.lignes[0]  # L'enregistrement en cache n'est pas modifié
+
+
+def test_calibration_en_cache_reutilisee():
+    ser = ouvrir_port(f"simulateur://{ENREGISTREMENTS_DEFAUT}?vitesse=20", timeout=1)
+    lecteur = LecteurSerie(ser, AnalyseurTrames(capacite=64, reordonner=False))
+    cache = CacheCalibration(tolerance=TOLERANCE_DERIVE)
+    resultats = []
+    try:
+        for _ in range(3):
+            resultats.append(demarrer_session(ser, lecteur, cache))
+            acquerir(lecteur, ConditionArret(nb_trames=100), lambda trames, reponses: None)
+            arreter_flux(ser, lecteur)
+    finally:
+        ser.close()
+    assert [r["reutilisee"] for r in resultats] == [False, True, True]
+    assert all(r["derive"] <= TOLERANCE_DERIVE for r in resultats[1:])
+    assert cache.calibrations == 1
+    assert ser.moteur.commandes.count("K") == 1
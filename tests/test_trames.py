@@ -0,0 +1,54 @@
+"""Analyse des lignes du capteur : lot entier, ligne par ligne et lignes illisibles donnent les mêmes trames."""
+import numpy as np
+
+from simulateur import ENREGISTREMENTS_DEFAUT, Enregistrement, lister_enregistrements
+from trames import AUTRE, CALIBRATION, GAIN, NB_CANAUX, PERMUTATION_ELECTRODES, AnalyseurTrames, type_ligne
+
+
+def lignes_enregistrement():
+    """Trames brutes (bytes terminées par \\r\\n) et calibration d'un enregistrement de test."""
+    enregistrement = Enregistrement(lister_enregistrements(ENREGISTREMENTS_DEFAUT)[0])
+    return enregistrement.lignes, enregistrement.calibration
+
+
+def valeurs(lignes):
+    return np.array([[int(v) for v in ligne.split()] for ligne in lignes])
+
+
+def test_lot_identique_aux_valeurs_lues():
+    lignes, _ = lignes_enregistrement()
+    trames, reponses = AnalyseurTrames(capacite=16, reordonner=False).analyser(lignes)
+    attendu = valeurs(lignes)
+    assert reponses == []
+    np.testing.assert_array_equal(trames["analogique"], attendu[:, :NB_CANAUX])
+    np.testing.assert_array_equal(trames["presence"], attendu[:, NB_CANAUX:] != 0)
+
+
+def test_reponses_et_lignes_illisibles_a_leur_place():
+    lignes, calibration = lignes_enregistrement()
+    lignes = list(lignes[:20])
+    lot = [calibration.encode(), b"ADC GAIN VALUE = 8", *lignes[:10], lignes[10][:30], *lignes[10:]]
+    analyseur = AnalyseurTrames(reordonner=False)
+    trames, reponses = analyseur.analyser(lot)
+    np.testing.assert_array_equal(trames["analogique"], valeurs(lignes)[:, :NB_CANAUX])
+    assert [(indice, nature) for indice, nature, _ in reponses] == [(0, CALIBRATION), (0, GAIN), (10, AUTRE)]
+    assert analyseur.lignes_invalides == 1
+
+    un_par_un = AnalyseurTrames(reordonner=False)
+    separees = [un_par_un.analyser_ligne(ligne)[0].copy() for ligne in lot]
+    np.testing.assert_array_equal(np.concatenate(separees), trames)
+
+
+def test_ordre_des_electrodes():
+    lignes, _ = lignes_enregistrement()
+    brutes = AnalyseurTrames(reordonner=False).analyser(lignes)[0].copy()
+    ordonnees = AnalyseurTrames(reordonner=True).analyser(lignes)[0]
+    np.testing.assert_array_equal(ordonnees["analogique"], brutes["analogique"][:, PERMUTATION_ELECTRODES])
+
+
+def test_deux_trames_fusionnees_illisibles():
+    lignes, _ = lignes_enregistrement()
+    fusion = lignes[0].strip() + b" " + lignes[1]
+    assert type_ligne(fusion) == AUTRE
+    trames, reponses = AnalyseurTrames(reordonner=False).analyser([fusion, lignes[2]])
+    assert len(trames) == 1 and reponses[0][:2] == (0, AUTRE)